@@ -18,3 +18,40 @@ GOOGLE_CLOUD_API_KEY = get_env_var("GOOGLE_CLOUD_API_KEY_PATH")
 NEO4J_URI = get_env_var("NEO4J_URI")
 NEO4J_USER = get_env_var("NEO4J_USER")
 NEO4J_PASSWORD = get_env_var("NEO4J_PASSWORD")
+
+# Where Robeau reads its graph from: "neo4j" (live database), "json" (exported neo4j_all_data.json) or "compiled"
+# (transition table built from the export by scripts/graph_compiler.py)
+ROBEAU_GRAPH_BACKEND = get_env_var("ROBEAU_GRAPH_BACKEND", "neo4j")
+# Max entries of the connection cache in front of the graph backend, 0 disables it
+ROBEAU_CONNECTION_CACHE_SIZE = int(get_env_var("ROBEAU_CONNECTION_CACHE_SIZE", "256"))
+# Hops fetched up front around each looked up node with the neo4j backend, 0 queries every hop separately
+ROBEAU_PREFETCH_DEPTH = int(get_env_var("ROBEAU_PREFETCH_DEPTH", "0"))
+# Logging preset of the graph engine: "debug", "queued" or "production" (see LOG_PRESETS in logging_utils)
+ROBEAU_LOG_PRESET = get_env_var("ROBEAU_LOG_PRESET", "debug")
+# Set to 1 to write a Chrome trace (flame graph) of every utterance processed by the graph engine
+ROBEAU_TRACE = get_env_var("ROBEAU_TRACE", "0") == "1"
+# Audio output of the graph engine: "pygame" (speakers) or "null" (plays nothing, e.g. for replay benchmarks)
+ROBEAU_AUDIO_BACKEND = get_env_var("ROBEAU_AUDIO_BACKEND", "pygame")
+# How Robeau runs the graph logic network: "threads" (a thread per query) or "asyncio" (a task per query)
+ROBEAU_ENGINE_MODE = get_env_var("ROBEAU_ENGINE_MODE", "threads")
+# Seconds between snapshots of the conversation state, 0 only saves one on shutdown
+ROBEAU_SNAPSHOT_INTERVAL = float(get_env_var("ROBEAU_SNAPSHOT_INTERVAL", "15"))
+# Snapshots older than this many seconds aren't restored on startup, 0 disables snapshots
+ROBEAU_SNAPSHOT_MAX_AGE = float(get_env_var("ROBEAU_SNAPSHOT_MAX_AGE", "600"))
+# Texts encoded per forward pass when the SBERT matcher builds the embeddings of its prompts
+ROBEAU_MATCHER_BATCH_SIZE = int(get_env_var("ROBEAU_MATCHER_BATCH_SIZE", "64"))
+# Inference of the SBERT matcher: "torch" (sentence-transformers) or "onnx" (int8 model exported by
+# scripts/sbert_onnx_export.py, run by onnxruntime on the CPU)
+ROBEAU_MATCHER_BACKEND = get_env_var("ROBEAU_MATCHER_BACKEND", "torch")
+# Utterance embeddings the SBERT matcher keeps in memory, and seconds they are kept for (0 until evicted)
+ROBEAU_MATCHER_MEMO_SIZE = int(get_env_var("ROBEAU_MATCHER_MEMO_SIZE", "512"))
+ROBEAU_MATCHER_MEMO_TTL = float(get_env_var("ROBEAU_MATCHER_MEMO_TTL", "600"))
+# Word-level similarity (0 to 1) from which the SBERT matcher accepts a near exact text match without running its
+# model, above 1 disables that tier
+ROBEAU_MATCHER_FUZZY_THRESHOLD = float(
+    get_env_var("ROBEAU_MATCHER_FUZZY_THRESHOLD", "0.9")
+)
+# Labels with at least this many texts and synonyms get an approximate (IVF) index in the SBERT matcher, 0 keeps the
+# exact search everywhere. Clusters searched per query by that index, more is slower but misses fewer matches.
+ROBEAU_MATCHER_ANN_MIN_ROWS = int(get_env_var("ROBEAU_MATCHER_ANN_MIN_ROWS", "0"))
+ROBEAU_MATCHER_ANN_PROBES = int(get_env_var("ROBEAU_MATCHER_ANN_PROBES", "8"))
@@ -0,0 +1,97 @@
+import random
+from typing import Sequence
+
+
+class AliasTable:
+    """Vose's alias method: built once in O(n) from a list of weights, then draws an index in O(1) with two random
+    numbers, whatever the number of weights."""
+
+    __slots__ = ("probabilities", "aliases")
+
+    def __init__(self, weights: Sequence[float]):
+        count = len(weights)
+        total = float(sum(weights))
+        if count == 0 or total <= 0:
+            raise ValueError(f"Cannot build an alias table from weights {weights}")
+
+        scaled = [weight * count / total for weight in weights]
+        self.probabilities = [0.0] * count
+        self.aliases = [0] * count
+
+        small = [index for index, weight in enumerate(scaled) if weight < 1.0]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1.0]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        # Whatever is left is 1.0 give or take rounding errors
+        for index in large + small:
+            self.probabilities[index] = 1.0
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def sample(self, rng: random.Random) -> int:
+        index = int(rng.random() * len(self.probabilities))
+        if rng.random() < self.probabilities[index]:
+            return index
+        return self.aliases[index]
+
+
+def connection_key(connection: dict) -> tuple:
+    """What tells the members of a random pool apart, whichever copy of their connection dict is passed around"""
+    return (
+        connection["start_node"],
+        connection["relationship"],
+        connection["end_node"],
+        connection["params"].get("randomPoolId", 0),
+    )
+
+
+class RandomPool:
+    """Alias table of the weighted connections sharing a randomPoolId, built once along with the connections.
+
+    Draws only pick among the members still available (connections that are locked, or whose attempt failed, are
+    left out at draw time): members that aren't are rejected and drawn again, and after `max_rejections` draws the
+    pick falls back on a linear weighted choice among the available members. So does a draw among connections the
+    pool doesn't know.
+    """
+
+    __slots__ = ("members", "weights", "table", "positions")
+
+    max_rejections = 8
+
+    def __init__(self, members: Sequence[dict], weights: Sequence[float]):
+        self.members = tuple(members)
+        self.weights = tuple(weights)
+        self.table = AliasTable(self.weights)
+        self.positions: dict[tuple, list[int]] = {}
+        for index, member in enumerate(self.members):
+            self.positions.setdefault(connection_key(member), []).append(index)
+
+    def sample(self, rng: random.Random, available: Sequence[dict]) -> dict:
+        if len(available) == len(self.members):
+            return self.members[self.table.sample(rng)]
+
+        allowed: set[int] = set()
+        for member in available:
+            positions = self.positions.get(connection_key(member))
+            if positions is None:
+                return self.choose_linearly(rng, available)
+            allowed.update(positions)
+
+        for _ in range(self.max_rejections):
+            index = self.table.sample(rng)
+            if index in allowed:
+                return self.members[index]
+
+        return self.choose_linearly(rng, available)
+
+    @staticmethod
+    def choose_linearly(rng: random.Random, available: Sequence[dict]) -> dict:
+        weights = [member["params"]["randomWeight"] for member in available]
+        return rng.choices(available, weights=weights)[0]
@@ -0,0 +1,112 @@
+import threading
+from logging import Logger
+from threading import Thread
+from typing import Callable, Literal, Optional
+
+from src.robeau.classes.audio_player import AudioPlayer
+
+
+class AudioLane:
+    """Execution lane of one conversation: its audio player, the events tracking what that player is doing, and the
+    thread processing its current utterance. Each conversation state has its own lane, so that several conversations
+    can talk and be interrupted independently.
+    """
+
+    def __init__(self, audio_player: AudioPlayer, logger: Logger):
+        self.audio_player = audio_player
+        self.logger = logger
+
+        self.processing_nodes_audio = threading.Event()
+        self.audio_player_first_callback = threading.Event()
+        self.audio_started_event = threading.Event()
+        self.robeau_is_talking = threading.Event()
+        self.audio_finished_event = threading.Event()
+
+        self.node_thread: Thread | None = None
+
+        # Called, from the audio threads, with every audio player callback (start, stop, end or error)
+        self.callback_listeners: list[Callable[[str], None]] = []
+
+    def reset_events(self):
+        self.audio_finished_event.clear()
+        self.audio_started_event.clear()
+        self.audio_player_first_callback.clear()
+        self.robeau_is_talking.clear()
+
+    def is_processing(self) -> bool:
+        return self.node_thread is not None and self.node_thread.is_alive()
+
+    def interrupt(self):
+        self.audio_player.stop_audio()
+        if self.node_thread:
+            self.node_thread.join()
+
+    def notify(self, event: Literal["start", "stop", "end", "error"]):
+        for listener in self.callback_listeners:
+            listener(event)
+
+    def wait_for_audio(self, response_nodes_reached: list[str]):
+        self.logger.info("Waiting for initial callback from audio_player")
+        self.audio_player_first_callback.wait()
+        self.audio_player_first_callback.clear()
+        self.logger.info("Callback received from audio_player, proceeding")
+
+        if self.audio_started_event.is_set():
+
+            self.logger.info(
+                f"Stopping to wait for audio to play for nodes: {response_nodes_reached}, "
+                f"state of audio finished event: {self.audio_finished_event}"
+            )
+            self.audio_finished_event.wait()
+            self.reset_events()
+            self.logger.info(
+                f"Finished waiting for audio to play for nodes: {response_nodes_reached}"
+            )
+        else:
+            self.logger.info(
+                f"No audio to play for nodes: {response_nodes_reached} continuing processing"
+            )
+
+        self.processing_nodes_audio.clear()
+
+    def play(
+        self,
+        node: str,
+        multiple_activations: Optional[int] = False,
+        on_start: Optional[Callable[[], None]] = None,
+        on_stop: Optional[Callable[[], None]] = None,
+        on_error: Optional[Callable[[], None]] = None,
+    ):
+        """Plays the audio of a node, the callbacks passed are called along with the lane's own bookkeeping."""
+
+        def started():
+            self.audio_started_event.set()
+            self.audio_player_first_callback.set()
+            self.robeau_is_talking.set()
+            if on_start:
+                on_start()
+            self.notify("start")
+
+        def stopped():
+            self.audio_finished_event.set()
+            if on_stop:
+                on_stop()
+            self.notify("stop")
+
+        def ended():
+            self.audio_finished_event.set()
+            self.notify("end")
+
+        def failed():
+            self.audio_player_first_callback.set()
+            self.audio_finished_event.set()
+            if on_error:
+                on_error()
+            self.notify("error")
+
+        self.audio_player.set_callbacks(
+            on_start=started, on_stop=stopped, on_end=ended, on_error=failed
+        )
+
+        self.processing_nodes_audio.set()
+        self.audio_player.play_audio(node, multiple_activations)
@@ -8,16 +8,16 @@ from typing import Literal, Optional
 
 import pygame
 
+from src.robeau.classes.alias_table import AliasTable
 from src.robeau.core.robeau_constants import ROBEAU_DIR_PATH
 
 
 class AudioPlayer:
-    pygame.mixer.init()
-
-    def __init__(self, mappings_file, logger: Logger):
-        with open(mappings_file, "r") as file:
-            self.audio_mappings = json.load(file)["nodes"]
+    def __init__(self, mappings_file, logger: Logger, seed: Optional[int] = None):
+        self.mappings_file = mappings_file
         self.logger = logger
+        self.rng = random.Random(seed)
+        self._load_mappings()
         self.playing_threads: list[Thread] = []
         self.stop_events: list[Event] = []
         self.threads_to_join: list[Thread] = []
@@ -35,19 +35,50 @@ class AudioPlayer:
         self.current_group_start_count = 0
         self.current_group_done_count = 0
 
+    @staticmethod
+    def _init_mixer():
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+
     def set_callbacks(self, on_start=None, on_stop=None, on_end=None, on_error=None):
         self.on_start = on_start
         self.on_stop = on_stop
         self.on_end = on_end
         self.on_error = on_error
 
-    def _get_audio_files(self, response_string):
+    def _load_mappings(self):
+        with open(self.mappings_file, "r") as file:
+            self.audio_mappings = json.load(file)["nodes"]
+        self.mappings_mtime = os.stat(self.mappings_file).st_mtime
+
+        # Audio files of each response, with the alias table drawing one of them
+        self.audio_tables: dict[str, tuple[list[dict], AliasTable | None]] = {}
         for node in self.audio_mappings:
-            if node["properties"]["text"] == response_string:
-                return node.get("audio_files", [])
-        return []
+            text = node["properties"]["text"]
+            if text in self.audio_tables:
+                continue  # The first mapping of a text wins
+            audio_files = node.get("audio_files", [])
+            try:
+                table = AliasTable([file["weight"] for file in audio_files])
+            except (KeyError, ValueError):
+                table = None
+            self.audio_tables[text] = (audio_files, table)
+
+    def _refresh_mappings(self):
+        try:
+            mtime = os.stat(self.mappings_file).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self.mappings_mtime:
+            self._load_mappings()
+            self.logger.info(f"Reloaded audio mappings from {self.mappings_file}")
+
+    def _get_audio_files(self, response_string):
+        self._refresh_mappings()
+        return self.audio_tables.get(response_string, ([], None))[0]
 
     def play_audio(self, response_string: str, multiple_tracks: Optional[int] = False):
+        self._init_mixer()  # On first use, so that the player can be built without an audio device
         self.group_count = multiple_tracks if multiple_tracks else 1
         stop_event = threading.Event()
         thread_name = f"AudioThread-{response_string}-{len(self.playing_threads) + 1}"
@@ -72,7 +103,9 @@ class AudioPlayer:
                 self._thread_done(stop_event, termination_reason="error")
                 return
 
-            audio_file_relative_path = self._select_weighted_random_file(audio_files)
+            audio_file_relative_path = self._select_weighted_random_file(
+                response_string
+            )
             audio_file = os.path.join(ROBEAU_DIR_PATH, audio_file_relative_path)
 
             if not audio_file_relative_path or not os.path.exists(audio_file):
@@ -81,14 +114,7 @@ class AudioPlayer:
                 return
 
             self.logger.info(f"Starting to play audio for: <<{response_string}>>")
-
-            with self.lock:
-                self.current_group_start_count += 1
-                if self.current_group_start_count == self.group_count:
-                    self.logger.info("Calling on_start() callback.")
-                    if self.on_start:
-                        self.on_start()
-                    self.current_group_start_count = 0
+            self._track_started()
 
             sound = pygame.mixer.Sound(audio_file)
             channel = sound.play()
@@ -110,24 +136,28 @@ class AudioPlayer:
             self.logger.exception(f"Exception in _play_audio: {e}")
             self._thread_done(stop_event, termination_reason="error")
 
+    def _track_started(self):
+        with self.lock:
+            self.current_group_start_count += 1
+            if self.current_group_start_count == self.group_count:
+                self.logger.info("Calling on_start() callback.")
+                if self.on_start:
+                    self.on_start()
+                self.current_group_start_count = 0
+
     def stop_audio(self):
         self.logger.info("Stopping all audio.")
         with self.lock:
             for stop_event in self.stop_events:
                 stop_event.set()  # Signal all threads to stop
 
-    @staticmethod
-    def _select_weighted_random_file(audio_files) -> str:
-        total_weight = sum(file["weight"] for file in audio_files)
-        random_choice = random.uniform(0, total_weight)
-        current_weight = 0
-
-        for file in audio_files:
-            current_weight += file["weight"]
-            if current_weight >= random_choice:
-                return file["file"]
-
-        return "N/A"
+    def _select_weighted_random_file(self, response_string: str) -> str:
+        audio_files, table = self.audio_tables.get(response_string, ([], None))
+        if not audio_files:
+            return "N/A"
+        if table is None:  # Weights missing or all zero
+            return audio_files[0]["file"]
+        return audio_files[table.sample(self.rng)]["file"]
 
     def _thread_done(
         self, stop_event, termination_reason: Literal["stop", "end", "error"]
@@ -177,3 +207,22 @@ class AudioPlayer:
         for thread in self.threads_to_join:
             thread.join()
         self.threads_to_join.clear()
+
+
+class NullAudioPlayer(AudioPlayer):
+    """Plays nothing: every track starts and ends right away, with the same callbacks as AudioPlayer. Used to run
+    the graph engine without speakers, e.g. when replaying a conversation for benchmarking.
+    """
+
+    def __init__(self, mappings_file, logger: Logger, seed: Optional[int] = None):
+        super().__init__(mappings_file, logger, seed)
+        self.played: list[str] = []
+
+    @staticmethod
+    def _init_mixer():
+        pass
+
+    def _play_audio(self, response_string: str, stop_event):
+        self.played.append(response_string)
+        self._track_started()
+        self._thread_done(stop_event, termination_reason="end")
@@ -0,0 +1,261 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from logging import Logger
+from typing import Optional
+
+from src.robeau.classes.conversation_context import normalize_node_text
+from src.robeau.classes.graph_backends import GraphBackend
+
+_MISSING = object()
+
+
+def read_graph_version(version_file_path: str) -> int:
+    """Version stamp written by neo4j_all_data_getter whenever it detects changes in the authored graph."""
+    try:
+        with open(version_file_path, "r") as f:
+            return int(json.load(f).get("version", 0))
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_graph_version(version_file_path: str) -> int:
+    version = read_graph_version(version_file_path) + 1
+    with open(version_file_path, "w") as f:
+        json.dump({"version": version, "updated_at": time.time()}, f, indent=4)
+    return version
+
+
+class CachedGraphBackend(GraphBackend):
+    """LRU cache in front of another backend, keyed by (normalize_node_text, label set, listening context).
+
+    Every entry is stamped with the graph version it was fetched under. The version file is polled at most once
+    every `version_check_interval` seconds and a new version clears the cache and reloads the wrapped backend.
+    """
+
+    def __init__(
+        self,
+        backend: GraphBackend,
+        logger: Logger,
+        max_size: int = 256,
+        version_file_path: Optional[str] = None,
+        version_check_interval: float = 5.0,
+        stats_log_interval: int = 100,
+    ):
+        self.backend = backend
+        self.logger = logger
+        self.max_size = max_size
+        self.version_file_path = version_file_path
+        self.version_check_interval = version_check_interval
+        self.stats_log_interval = stats_log_interval
+
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[tuple, tuple[int, list[dict] | None]] = OrderedDict()
+        self.version = read_graph_version(version_file_path) if version_file_path else 0
+        self.last_version_check = time.monotonic()
+        self.version_file_mtime = self._get_version_file_mtime()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        text: str, labels: list[str], listening_context: Optional[str]
+    ) -> tuple:
+        # Texts the backends look up the same way share a key. The listening context only changes the result of
+        # Whisper lookups, so it is left out of every other key.
+        context = listening_context if "Whisper" in labels else None
+        return normalize_node_text(text), frozenset(labels), context
+
+    def _get_version_file_mtime(self) -> float | None:
+        if not self.version_file_path:
+            return None
+        try:
+            return os.stat(self.version_file_path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self.last_version_check < self.version_check_interval:
+            return
+        self.last_version_check = now
+
+        mtime = self._get_version_file_mtime()
+        if mtime == self.version_file_mtime:
+            return
+        self.version_file_mtime = mtime
+
+        version = read_graph_version(self.version_file_path)  # type: ignore
+        if version != self.version:
+            self.logger.info(
+                "Graph version changed from %s to %s, invalidating connection cache",
+                self.version,
+                version,
+            )
+            self.invalidate(version)
+            self.backend.reload()
+
+    def invalidate(self, version: Optional[int] = None):
+        with self.lock:
+            self.entries.clear()
+            self.version = version if version is not None else self.version + 1
+            self.invalidations += 1
+
+    def _lookup(self, key: tuple) -> tuple[bool, list[dict] | None, int]:
+        """Returns whether the key was a hit, the cached connections, and the version to store a miss under."""
+        with self.lock:
+            entry = self.entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] == self.version:  # type: ignore
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self._maybe_log_stats()
+                return True, entry[1], self.version  # type: ignore
+            self.misses += 1
+            return False, None, self.version
+
+    def _store(self, key: tuple, version: int, connections: list[dict] | None):
+        with self.lock:
+            # Don't store results fetched under an older graph
+            if version == self.version:
+                self.entries[key] = (version, connections)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+            self._maybe_log_stats()
+
+    def fetch(
+        self,
+        backend: GraphBackend,
+        text: str,
+        labels: list[str],
+        listening_context: Optional[str],
+    ) -> list[dict] | None:
+        """Cached connections, or those `backend` looks up on a miss (the wrapped one, or that of a conversation)"""
+        if self.version_file_path:
+            self._check_version()
+
+        key = self.make_key(text, labels, listening_context)
+        hit, connections, version = self._lookup(key)
+        if hit:
+            return connections
+
+        connections = backend.get_connections(text, labels, listening_context)
+        self._store(key, version, connections)
+        return connections
+
+    async def fetch_async(
+        self,
+        backend: GraphBackend,
+        text: str,
+        labels: list[str],
+        listening_context: Optional[str],
+    ) -> list[dict] | None:
+        if self.version_file_path:
+            self._check_version()
+
+        key = self.make_key(text, labels, listening_context)
+        hit, connections, version = self._lookup(key)
+        if hit:
+            return connections
+
+        connections = await backend.get_connections_async(
+            text, labels, listening_context
+        )
+        self._store(key, version, connections)
+        return connections
+
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        return self.fetch(self.backend, text, labels, listening_context)
+
+    async def get_connections_async(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        return await self.fetch_async(self.backend, text, labels, listening_context)
+
+    def for_conversation(self) -> GraphBackend:
+        backend = self.backend.for_conversation()
+        if backend is self.backend:
+            return self
+        return CachedConversationBackend(self, backend)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "version": self.version,
+        }
+
+    def _maybe_log_stats(self):
+        lookups = self.hits + self.misses
+        if self.stats_log_interval and lookups % self.stats_log_interval == 0:
+            self.logger.info("Connection cache stats: %s", self.stats())
+
+    def warmup(self):
+        self.backend.warmup()
+
+    async def warmup_async(self):
+        await self.backend.warmup_async()
+
+    def reload(self):
+        self.invalidate()
+        self.backend.reload()
+
+    def begin_utterance(self):
+        self.backend.begin_utterance()
+
+    def close(self):
+        self.logger.info("Connection cache stats on close: %s", self.stats())
+        self.backend.close()
+
+    async def close_async(self):
+        self.logger.info("Connection cache stats on close: %s", self.stats())
+        await self.backend.close_async()
+
+
+class CachedConversationBackend(GraphBackend):
+    """Backend of one conversation behind a shared CachedGraphBackend, for wrapped backends keeping state per
+    utterance: hits come from the shared cache, misses are looked up by the conversation's own backend.
+    """
+
+    def __init__(self, cache: CachedGraphBackend, backend: GraphBackend):
+        self.cache = cache
+        self.backend = backend
+
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        return self.cache.fetch(self.backend, text, labels, listening_context)
+
+    async def get_connections_async(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        return await self.cache.fetch_async(
+            self.backend, text, labels, listening_context
+        )
+
+    def reload(self):
+        self.cache.reload()
+
+    def begin_utterance(self):
+        self.backend.begin_utterance()
+
+    def for_conversation(self) -> GraphBackend:
+        return self.cache.for_conversation()
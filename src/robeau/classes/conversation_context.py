@@ -0,0 +1,170 @@
+from typing import Iterator, Optional
+
+
+def normalize_node_text(text: str) -> str:
+    """Also the `text_key` property neo4j_text_key_migration stores (with toLower) and indexes on every node."""
+    return text.lower()
+
+
+class ContextItem:
+    __slots__ = (
+        "type",
+        "node",
+        "labels",
+        "data",
+        "time_left",
+        "duration",
+        "start_time",
+    )
+
+    def __init__(
+        self,
+        item_type: str,
+        node: str,
+        labels: list[str],
+        data: dict,
+        duration: float | None,
+        start_time: float,
+    ):
+        self.type = item_type
+        self.node = node
+        self.labels = labels
+        self.data = data
+        self.time_left = duration
+        self.duration = duration
+        self.start_time = start_time
+
+    # Dict style access, items used to be plain dicts and are still read that way in a few places
+    def __getitem__(self, name: str):
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value):
+        setattr(self, name, value)
+
+    def get(self, name: str, default=None):
+        return getattr(self, name, default)
+
+    def as_dict(self) -> dict:
+        return {
+            "type": self.type,
+            "node": self.node,
+            "labels": self.labels,
+            "data": self.data,
+            "time_left": self.time_left,
+            "duration": self.duration,
+            "start_time": self.start_time,
+        }
+
+    def __repr__(self):
+        return str(self.as_dict())
+
+
+class ContextList:
+    """Items of one context type, in insertion order and indexed by node text.
+
+    Membership is exact, as locks, primes and definitions always compared node texts as they are. Prompt matching
+    compares texts case insensitively, and goes through `matches_text` and its count of items per normalized text.
+    """
+
+    __slots__ = ("items", "normalized")
+
+    def __init__(self):
+        self.items: dict[str, ContextItem] = {}
+        self.normalized: dict[str, int] = {}
+
+    def __iter__(self) -> Iterator[ContextItem]:
+        return iter(list(self.items.values()))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    def __repr__(self):
+        return repr(list(self.items.values()))
+
+    def contains(self, node: str) -> bool:
+        return node in self.items
+
+    def matches_text(self, text: str) -> bool:
+        return normalize_node_text(text) in self.normalized
+
+    def get(self, node: str) -> Optional[ContextItem]:
+        return self.items.get(node)
+
+    def add(self, item: ContextItem):
+        if item.node not in self.items:
+            key = normalize_node_text(item.node)
+            self.normalized[key] = self.normalized.get(key, 0) + 1
+        self.items[item.node] = item
+
+    def _forget(self, node: str):
+        key = normalize_node_text(node)
+        if self.normalized[key] > 1:
+            self.normalized[key] -= 1
+        else:
+            del self.normalized[key]
+
+    def remove(self, node: str) -> Optional[ContextItem]:
+        item = self.items.pop(node, None)
+        if item:
+            self._forget(node)
+        return item
+
+    def discard_item(self, item: ContextItem) -> bool:
+        """Removes this exact item, but not another item that replaced it for the same node since."""
+        if self.items.get(item.node) is item:
+            del self.items[item.node]
+            self._forget(item.node)
+            return True
+        return False
+
+    def clear(self):
+        self.items.clear()
+        self.normalized.clear()
+
+
+class ConversationContext:
+    """Context relationships of the conversation state, one ContextList per type."""
+
+    __slots__ = ("lists",)
+
+    def __init__(self, item_types: list[str]):
+        self.lists: dict[str, ContextList] = {
+            item_type: ContextList() for item_type in item_types
+        }
+
+    def __getitem__(self, item_type: str) -> ContextList:
+        return self.lists[item_type]
+
+    def __contains__(self, item_type: str) -> bool:
+        return item_type in self.lists
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.lists)
+
+    def __repr__(self):
+        return repr(self.lists)
+
+    def keys(self):
+        return self.lists.keys()
+
+    def values(self):
+        return self.lists.values()
+
+    def items(self):
+        return self.lists.items()
+
+    def contains(self, node: str, *item_types: str) -> bool:
+        return any(
+            node in self.lists[item_type].items
+            for item_type in (item_types or self.lists)
+        )
+
+    def matches_text(self, text: str, *item_types: str) -> bool:
+        key = normalize_node_text(text)
+        return any(
+            key in self.lists[item_type].normalized
+            for item_type in (item_types or self.lists)
+        )
@@ -0,0 +1,110 @@
+import marshal
+import os
+import struct
+import time
+from logging import Logger
+from typing import Callable
+
+SNAPSHOT_MAGIC = b"RBCS"
+# Bumped whenever the layout of ConversationState.snapshot() changes, older snapshots are then ignored
+SNAPSHOT_FORMAT = 1
+# Magic, format, wall clock time of the save
+SNAPSHOT_HEADER = struct.Struct("<4sHd")
+
+
+class ConversationSnapshotter:
+    """Saves the conversation state to a small binary file and restores it on startup, so that restarting Robeau
+    doesn't drop what it allows, expects or primes, its time-bound states or its attitude.
+
+    Remaining times are stored rather than deadlines, since readings of the monotonic clock mean nothing to another
+    process. The wall clock only measures how long Robeau was down, which is taken off the remaining times on
+    restore; items that ran out meanwhile expire right away. Snapshots older than `max_age` are ignored.
+    """
+
+    def __init__(
+        self,
+        conversation_state,  # ConversationState, not imported to avoid a cycle
+        file_path: str,
+        logger: Logger,
+        interval: float = 15.0,
+        max_age: float = 600.0,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        self.conversation_state = conversation_state
+        self.file_path = file_path
+        self.logger = logger
+        self.interval = interval
+        self.max_age = max_age
+        self.wall_clock = wall_clock
+
+    def encode(self) -> bytes:
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, self.wall_clock()
+        )
+        return header + marshal.dumps(self.conversation_state.snapshot())
+
+    @staticmethod
+    def decode(data: bytes) -> tuple[float, tuple] | None:
+        """Returns when the snapshot was saved and its content, None if it isn't a snapshot of the current format."""
+        if len(data) < SNAPSHOT_HEADER.size:
+            return None
+        magic, snapshot_format, saved_at = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or snapshot_format != SNAPSHOT_FORMAT:
+            return None
+        return saved_at, marshal.loads(data[SNAPSHOT_HEADER.size :])
+
+    def save(self) -> bool:
+        try:
+            data = self.encode()
+        except (ValueError, RuntimeError) as e:
+            # Unmarshallable node data, or the state changed size while being read
+            self.logger.error(f"Could not snapshot the conversation state: {e}")
+            return False
+
+        # Written aside then swapped in, so a crash mid-write leaves the previous snapshot intact
+        temp_file_path = f"{self.file_path}.tmp"
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(temp_file_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_file_path, self.file_path)
+        self.logger.debug(f"Saved {len(data)} bytes snapshot to {self.file_path}")
+        return True
+
+    def restore(self) -> bool:
+        start_time = time.perf_counter()
+        try:
+            with open(self.file_path, "rb") as f:
+                decoded = self.decode(f.read())
+        except FileNotFoundError:
+            return False
+        except (ValueError, EOFError, TypeError, struct.error) as e:
+            self.logger.warning(f"Ignored unreadable snapshot {self.file_path}: {e}")
+            return False
+
+        if decoded is None:
+            self.logger.warning(f"Ignored snapshot of another format: {self.file_path}")
+            return False
+
+        saved_at, snapshot = decoded
+        elapsed = max(0.0, self.wall_clock() - saved_at)
+        if elapsed > self.max_age:
+            self.logger.info(f"Ignored snapshot saved {elapsed:.0f} seconds ago")
+            return False
+
+        self.conversation_state.restore(snapshot, elapsed)
+        self.logger.info(
+            f"Restored conversation state saved {elapsed:.1f} seconds ago "
+            f"in {(time.perf_counter() - start_time) * 1e6:.0f} µs"
+        )
+        return True
+
+    def start(self):
+        """Saves every `interval` seconds from the timers of the conversation state."""
+        if self.interval > 0:
+            self.conversation_state.scheduler.schedule_in(
+                "snapshot", self.interval, self._save_periodically
+            )
+
+    def _save_periodically(self):
+        self.save()
+        self.start()
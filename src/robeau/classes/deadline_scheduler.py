@@ -0,0 +1,171 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from logging import Logger
+from typing import Callable, Hashable, Optional
+
+
+class DeadlineScheduler:
+    """Runs callbacks at their deadline from a single thread sleeping until the earliest one.
+
+    Deadlines are kept in a min-heap. Scheduling a key that is already pending replaces its deadline, the stale heap
+    entry is skipped when it comes up. How late each callback fired compared to its deadline is recorded so that
+    expiry latency can be reported.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        clock: Callable[[], float] = time.monotonic,
+        pause_poll_interval: float = 0.1,
+    ):
+        self.logger = logger
+        self.clock = clock
+        self.pause_poll_interval = pause_poll_interval
+
+        self.heap: list[tuple[float, int, Hashable]] = []
+        self.pending: dict[Hashable, tuple[float, int, Callable[[], None]]] = {}
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.stopped = False
+
+        # Set when running on an asyncio loop (see run_async)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.wakeup: Optional[asyncio.Event] = None
+
+        self.latencies: deque[float] = deque(maxlen=1000)
+        self.fired = 0
+
+    def schedule(self, key: Hashable, deadline: float, callback: Callable[[], None]):
+        with self.condition:
+            entry_id = next(self.sequence)
+            self.pending[key] = (deadline, entry_id, callback)
+            heapq.heappush(self.heap, (deadline, entry_id, key))
+            if self.heap[0][1] == entry_id:  # New earliest deadline, wake the runner
+                self._wake_runner()
+
+    def schedule_in(self, key: Hashable, delay: float, callback: Callable[[], None]):
+        self.schedule(key, self.clock() + delay, callback)
+
+    def cancel(self, key: Hashable):
+        with self.condition:
+            self.pending.pop(key, None)
+
+    def is_scheduled(self, key: Hashable) -> bool:
+        return key in self.pending
+
+    def next_deadline(self) -> Optional[float]:
+        with self.condition:
+            self._drop_stale_entries()
+            return self.heap[0][0] if self.heap else None
+
+    def _drop_stale_entries(self):
+        while self.heap:
+            deadline, entry_id, key = self.heap[0]
+            pending = self.pending.get(key)
+            if pending and pending[1] == entry_id:
+                return
+            heapq.heappop(self.heap)
+
+    def _pop_due(self, now: float) -> list[tuple[float, Callable[[], None]]]:
+        due = []
+        self._drop_stale_entries()
+        while self.heap and self.heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self.heap)
+            _, _, callback = self.pending.pop(key)
+            due.append((deadline, callback))
+            self._drop_stale_entries()
+        return due
+
+    def run_due(self) -> int:
+        """Runs every callback whose deadline has passed, returns how many ran."""
+        with self.condition:
+            now = self.clock()
+            due = self._pop_due(now)
+
+        for deadline, callback in due:
+            self.latencies.append(max(0.0, now - deadline))
+            self.fired += 1
+            try:
+                callback()
+            except Exception as e:
+                self.logger.exception(f"Scheduled callback failed: {e}")
+
+        return len(due)
+
+    def run(self, pause_event: Optional[threading.Event] = None):
+        while True:
+            with self.condition:
+                if self.stopped:
+                    return
+
+                self._drop_stale_entries()
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+
+                timeout = self.heap[0][0] - self.clock()
+                if timeout > 0:
+                    self.condition.wait(timeout)
+                    continue
+
+                if pause_event is not None and pause_event.is_set():
+                    # Expirations are held while the user is typing or talking
+                    self.condition.wait(self.pause_poll_interval)
+                    continue
+
+            self.run_due()
+
+    async def run_async(self, pause_event: Optional[threading.Event] = None):
+        """Same as run(), as a task of the running loop: callbacks then run on the loop thread."""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+        while not self.stopped:
+            # Cleared before reading the heap so that a deadline scheduled meanwhile still wakes this up
+            self.wakeup.clear()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else deadline - self.clock()
+
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if pause_event is not None and pause_event.is_set():
+                # Expirations are held while the user is typing or talking
+                await asyncio.sleep(self.pause_poll_interval)
+                continue
+
+            self.run_due()
+
+    def _wake_runner(self):
+        self.condition.notify()
+        if self.loop and self.wakeup and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self._wake_runner()
+
+    def latency_stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"fired": self.fired}
+
+        def percentile(fraction: float) -> float:
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        return {
+            "fired": self.fired,
+            "mean": sum(latencies) / len(latencies),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "max": latencies[-1],
+        }
@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from logging import Logger
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.robeau.classes.conversation_context import normalize_node_text
+
+# Bumped whenever the layout of the cache files changes, older caches are then rebuilt
+EMBEDDING_CACHE_FORMAT = 1
+
+
+def normalize_cached_text(text: str) -> str:
+    return " ".join(normalize_node_text(text).split())
+
+
+def model_slug(model_name: str) -> str:
+    """Model name usable in a file name, e.g. sentence-transformers_all-MiniLM-L6-v2"""
+    return model_name.replace("/", "_").replace("\\", "_")
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha1(normalize_cached_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Content addressed embeddings of one model, keyed by the hash of the normalized text they were computed from.
+
+    Embeddings are rows of a float32 file memory-mapped on load (`<prefix>.<model>.embeddings.f32`), the index file
+    next to it (`<prefix>.<model>.embeddings.json`) maps text hashes to rows. New rows are appended to the data file
+    before the index is swapped in, so an interrupted save loses at most the new rows.
+    """
+
+    def __init__(
+        self,
+        file_prefix: str,
+        model_name: str,
+        logger: Optional[Logger] = None,
+    ):
+        slug = model_slug(model_name)
+        self.data_file_path = f"{file_prefix}.{slug}.embeddings.f32"
+        self.index_file_path = f"{file_prefix}.{slug}.embeddings.json"
+        # Approximate nearest neighbours indexes built from these embeddings, see SBERTMatcher
+        self.ann_file_path = f"{file_prefix}.{slug}.ivf.npz"
+        self.model_name = model_name
+        self.logger = logger
+
+        self.dimension: int | None = None
+        self.rows: dict[str, int] = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.pending: dict[str, np.ndarray] = {}
+        self._load()
+
+    @classmethod
+    def for_file(
+        cls, file_path: str, model_name: str, logger: Optional[Logger] = None
+    ) -> "EmbeddingCache":
+        """Cache stored next to a prompts file, e.g. robeau_prompts.all-MiniLM-L6-v2.embeddings.f32"""
+        return cls(os.path.splitext(file_path)[0], model_name, logger)
+
+    def __len__(self):
+        return len(self.rows) + len(self.pending)
+
+    def _log(self, message: str):
+        if self.logger:
+            self.logger.info(message)
+        else:
+            print(message)
+
+    def _load(self):
+        try:
+            with open(self.index_file_path, "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            self._log(f"Ignored unreadable embedding cache index: {e}")
+            return
+
+        if (
+            index.get("format") != EMBEDDING_CACHE_FORMAT
+            or index.get("model") != self.model_name
+        ):
+            self._log("Ignored embedding cache of another format or model")
+            return
+
+        dimension = index["dimension"]
+        keys = index["keys"]
+        row_size = dimension * np.dtype(np.float32).itemsize
+        try:
+            stored_rows = os.path.getsize(self.data_file_path) // row_size
+        except FileNotFoundError:
+            stored_rows = 0
+        if stored_rows < len(keys):
+            self._log(
+                f"Ignored embedding cache with {stored_rows} rows for {len(keys)} keys"
+            )
+            return
+
+        self.dimension = dimension
+        self.rows = {key: row for row, key in enumerate(keys)}
+        if keys:
+            self.matrix = np.memmap(
+                self.data_file_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(len(keys), dimension),
+            )
+
+    def get(self, text: str) -> np.ndarray | None:
+        key = hash_text(text)
+        row = self.rows.get(key)
+        if row is not None:
+            # Copied, a view would keep the file mapped (and unwritable on Windows) for as long as it lives
+            return np.array(self.matrix[row])
+        return self.pending.get(key)
+
+    def get_many(self, texts: list[str]) -> tuple[dict[str, np.ndarray], list[str]]:
+        """Cached embeddings of the texts found, and the texts missing (each once, in order)"""
+        found: dict[str, np.ndarray] = {}
+        missing: list[str] = []
+        for text in dict.fromkeys(texts):
+            embedding = self.get(text)
+            if embedding is None:
+                missing.append(text)
+            else:
+                found[text] = embedding
+        return found, missing
+
+    def add(self, text: str, embedding: np.ndarray):
+        if self.dimension is None:
+            self.dimension = len(embedding)
+        elif len(embedding) != self.dimension:
+            raise ValueError(
+                f"Embedding of size {len(embedding)} for a cache of size {self.dimension}"
+            )
+        key = hash_text(text)
+        if key not in self.rows:
+            self.pending[key] = np.asarray(embedding, dtype=np.float32)
+
+    def save(self):
+        if not self.pending:
+            return
+
+        keys = list(self.rows) + list(self.pending)
+        row_size = (self.dimension or 0) * np.dtype(np.float32).itemsize
+        # Unmapped first, Windows doesn't let a mapped file be written to. Rows are written right after the indexed
+        # ones, over whatever an interrupted save left behind them.
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        with open(self.data_file_path, "r+b" if self.rows else "wb") as f:
+            f.seek(len(self.rows) * row_size)
+            f.write(np.stack(list(self.pending.values())).tobytes())
+            f.truncate()
+
+        temp_file_path = f"{self.index_file_path}.tmp"
+        with open(temp_file_path, "w") as f:
+            json.dump(
+                {
+                    "format": EMBEDDING_CACHE_FORMAT,
+                    "model": self.model_name,
+                    "dimension": self.dimension,
+                    "keys": keys,
+                },
+                f,
+            )
+        os.replace(temp_file_path, self.index_file_path)
+        self._log(f"Saved {len(self.pending)} embeddings to the cache")
+
+        self.pending.clear()
+        self._load()
+
+    def compact(self, texts: list[str]):
+        """Rewrites the cache with only the embeddings of these texts, dropping those of removed synonyms"""
+        kept = {}
+        for text in texts:
+            embedding = self.get(text)
+            if embedding is not None:
+                kept[hash_text(text)] = embedding
+        if len(kept) == len(self):
+            return
+
+        dropped = len(self) - len(kept)
+        self.rows = {}
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.pending = kept
+        self.save()
+        self._log(f"Dropped {dropped} unused embeddings from the cache")
+
+
+class EmbeddingMemo:
+    """In-memory LRU of query embeddings keyed by normalized text, so that recurring utterances ("stop", "hey
+    robeau"...) and the same transcript checked by several handler stages skip the model. Entries expire `ttl`
+    seconds after being encoded (0 keeps them until evicted), a `max_size` of 0 disables the memo.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 512,
+        ttl: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.entries: OrderedDict[str, tuple[float, np.ndarray]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+
+    def get(self, text: str) -> np.ndarray | None:
+        key = normalize_cached_text(text)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            created_at, embedding = entry
+            if self.ttl > 0 and self.clock() - created_at > self.ttl:
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return embedding
+
+    def put(self, text: str, embedding: np.ndarray):
+        if self.max_size <= 0:
+            return
+        key = normalize_cached_text(text)
+        with self.lock:
+            self.entries[key] = (self.clock(), embedding)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,600 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from logging import Logger
+from typing import Optional
+
+from neo4j import AsyncGraphDatabase, GraphDatabase
+
+from src.robeau.classes.alias_table import RandomPool
+from src.robeau.classes.conversation_context import normalize_node_text
+from src.robeau.classes.graph_queries import (
+    COUNT_UNKEYED_QUERY,
+    QUERY_TEMPLATES,
+    UNKEYED_QUERY,
+    QueryStats,
+    select_query_template,
+    subgraph_query,
+)
+from src.robeau.core.graph_logic_network_constants import RELATIONSHIP_TYPES
+
+# Node properties that identify a node rather than describe it, kept out of the connection data
+NODE_TEXT_KEYS = ("text", "text_key")
+
+
+def build_connection(
+    start_properties: dict,
+    start_labels: list[str],
+    relationship: str,
+    params: dict,
+    end_properties: dict,
+    end_labels: list[str],
+) -> dict:
+    """Builds a connection dict, the shape every graph backend has to return."""
+    return {
+        "start_node": start_properties["text"],
+        "relationship": relationship,
+        "end_node": end_properties["text"],
+        "params": params,
+        "labels": {
+            "start": start_labels,
+            "end": end_labels,
+        },
+        "data": {
+            "start": {
+                k: v for k, v in start_properties.items() if k not in NODE_TEXT_KEYS
+            },
+            "end": {k: v for k, v in end_properties.items() if k not in NODE_TEXT_KEYS},
+        },
+    }
+
+
+def group_connections(connections) -> dict[str, tuple[dict, ...]]:
+    """Buckets connections by relationship type, with an entry (possibly empty) for every handled type."""
+    grouped: dict[str, list[dict]] = {key: [] for key in RELATIONSHIP_TYPES}
+    for connection in connections:
+        relationship = connection["relationship"]
+        if relationship in grouped:
+            grouped[relationship].append(connection)
+    return {key: tuple(group) for key, group in grouped.items()}
+
+
+def build_random_pools(
+    relationships_map: dict[str, tuple[dict, ...]]
+) -> dict[str, dict[tuple[str, int], RandomPool]]:
+    """Alias tables of the weighted connections of each relationship type, keyed by (start_node, randomPoolId).
+    Pools whose weights can't make a table are left out, the network then falls back on a plain random choice.
+    """
+    pools: dict[str, dict[tuple[str, int], RandomPool]] = {}
+    for relationship, connections in relationships_map.items():
+        members: dict[tuple[str, int], list[dict]] = defaultdict(list)
+        for connection in connections:
+            params = connection.get("params", {})
+            if params.get("randomWeight"):
+                members[
+                    (connection["start_node"], params.get("randomPoolId", 0))
+                ].append(connection)
+
+        pools[relationship] = {}
+        for key, pool_members in members.items():
+            try:
+                pools[relationship][key] = RandomPool(
+                    pool_members,
+                    [member["params"]["randomWeight"] for member in pool_members],
+                )
+            except (TypeError, ValueError):
+                continue
+    return pools
+
+
+class GroupedConnections(tuple):
+    """Immutable connections of a node, along with their relationships map and random pools built once ahead of
+    time."""
+
+    relationships_map: dict[str, tuple[dict, ...]]
+    random_pools: dict[str, dict[tuple[str, int], RandomPool]]
+
+    def __new__(cls, connections):
+        instance = super().__new__(cls, connections)
+        instance.relationships_map = group_connections(instance)
+        instance.random_pools = build_random_pools(instance.relationships_map)
+        return instance
+
+
+class GraphBackend(ABC):
+    """Source of node connections for the graph logic network."""
+
+    @abstractmethod
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        """Connections of the nodes with this text and one of these labels, None when there are none."""
+
+    async def get_connections_async(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        """Lookup for the asyncio engine, backends doing I/O override it so as not to block the loop."""
+        return self.get_connections(text, labels, listening_context)
+
+    def warmup(self):
+        """Called once before the first lookup, backends connecting to a server check the connection here."""
+
+    async def warmup_async(self):
+        self.warmup()
+
+    def reload(self):
+        """Called when the authored graph is known to have changed."""
+
+    def begin_utterance(self):
+        """Called once before processing each new user query."""
+
+    def for_conversation(self) -> "GraphBackend":
+        """Backend for one more conversation over the same graph. Backends keeping state per utterance give each
+        conversation a view of its own, so that an utterance never resets what another conversation is using;
+        the others are shared as they are."""
+        return self
+
+    def close(self):
+        pass
+
+    async def close_async(self):
+        self.close()
+
+
+def record_to_connection(record) -> dict:
+    return build_connection(
+        dict(record["x"]),
+        list(record["x"].labels),
+        record["r"].type,
+        dict(record["r"]),
+        dict(record["y"]),
+        list(record["y"].labels),
+    )
+
+
+class Neo4jGraphBackend(GraphBackend):
+    """Runs the query templates of graph_queries in managed read transactions. Each lookup gets its own session
+    from the driver connection pool, so node threads and the timers thread never share one.
+
+    Templates look nodes up by their indexed text_key. Nodes lacking an up to date one (authored after
+    neo4j_text_key_migration last ran) are counted on warmup and reload, and while there are some, lookups finding
+    nothing are tried again on toLower(text), with a warning whenever that finds the node.
+    """
+
+    def __init__(self, uri: str, user: str, password: str, logger: Logger):
+        self.logger = logger
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.query_stats = QueryStats()
+        self.unkeyed_nodes = 0
+
+    def warmup(self):
+        start_time = time.time()
+        self.driver.verify_connectivity()
+        connection_time = time.time() - start_time
+
+        print(f"Connection established in {connection_time:.3f} seconds")
+        print(self.driver.get_server_info())
+        self.check_text_keys()
+
+    def reload(self):
+        self.check_text_keys()
+
+    def check_text_keys(self):
+        self.set_unkeyed_nodes(self.run_read("count_unkeyed", COUNT_UNKEYED_QUERY, {}))
+
+    def set_unkeyed_nodes(self, records: list):
+        self.unkeyed_nodes = records[0]["unkeyed"] if records else 0
+        if self.unkeyed_nodes:
+            self.logger.warning(
+                "%s node(s) have no up to date text_key, lookups missing will also scan toLower(text) until "
+                "neo4j_text_key_migration is run",
+                self.unkeyed_nodes,
+            )
+
+    def warn_unkeyed_match(self, text: str, records: list):
+        if records:
+            self.logger.warning(
+                "Found <%s> by toLower(text) only, its node has no up to date text_key",
+                text,
+            )
+
+    @staticmethod
+    def _read_all(tx, query: str, parameters: dict) -> list:
+        return list(tx.run(query, parameters))
+
+    def run_read(self, template: str, query: str, parameters: dict) -> list:
+        with self.query_stats.timed(template):
+            with self.driver.session() as session:
+                return session.execute_read(self._read_all, query, parameters)
+
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> GroupedConnections | None:
+        selected = select_query_template(text, labels, listening_context, self.logger)
+        if not selected:
+            return None
+
+        template, parameters = selected
+        records = self.run_read(template, QUERY_TEMPLATES[template], parameters)
+        if not records and self.unkeyed_nodes:
+            records = self.run_read("unkeyed", UNKEYED_QUERY, parameters)
+            self.warn_unkeyed_match(text, records)
+
+        if not records:
+            return None
+        return GroupedConnections(record_to_connection(record) for record in records)
+
+    async def get_connections_async(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        # The sync driver blocks, AsyncNeo4jGraphBackend awaits the async one instead
+        return await asyncio.to_thread(
+            self.get_connections, text, labels, listening_context
+        )
+
+    def fetch_subgraph(
+        self,
+        text: str,
+        labels: list[str],
+        listening_context: Optional[str],
+        depth: int,
+    ) -> tuple[list[dict], list[dict], set[str]]:
+        """Fetches, in one round trip, every node reachable from the matching nodes in less than `depth` hops along
+        with all their outgoing relationships. Nodes sharing their text with a reached node (under a label lookups can
+        match) are fetched as well, so that any text lookup on the result is complete. Returns nodes and relationships in the neo4j_all_data format
+        and the text keys of the nodes whose outgoing relationships were all fetched.
+        """
+        result = self.run_read(
+            "subgraph",
+            subgraph_query(depth),
+            {
+                "text_key": normalize_node_text(text),
+                "labels": [label for label in labels if label != "Whisper"],
+                "listening_context": (
+                    listening_context if "Whisper" in labels else None
+                ),
+            },
+        )
+
+        nodes: dict[str, dict] = {}
+        relationships: dict[str, dict] = {}
+        complete_texts: set[str] = set()
+
+        for record in result:
+            complete_texts.add(normalize_node_text(record["x"]["text"]))
+            for node in (record["x"], record["y"]):
+                if node is not None and node.element_id not in nodes:
+                    nodes[node.element_id] = {
+                        "id": node.element_id,
+                        "labels": list(node.labels),
+                        "properties": dict(node),
+                    }
+            relationship = record["r"]
+            if relationship is not None:
+                relationships[relationship.element_id] = {
+                    "id": relationship.element_id,
+                    "type": relationship.type,
+                    "properties": dict(relationship),
+                    "startNodeId": record["x"].element_id,
+                    "endNodeId": record["y"].element_id,
+                }
+
+        return list(nodes.values()), list(relationships.values()), complete_texts
+
+    def close(self):
+        self.logger.info("Query template stats: %s", self.query_stats.as_dict())
+        if self.driver:
+            self.driver.close()
+
+
+class AsyncNeo4jGraphBackend(Neo4jGraphBackend):
+    """Neo4j backend for the asyncio engine, running the same query templates as Neo4jGraphBackend in managed read
+    transactions of AsyncSessions. Sync lookups (and subgraph fetches) go through the driver of Neo4jGraphBackend,
+    which only opens connections once used.
+    """
+
+    def __init__(self, uri: str, user: str, password: str, logger: Logger):
+        super().__init__(uri, user, password, logger)
+        self.async_driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+
+    async def warmup_async(self):
+        start_time = time.time()
+        await self.async_driver.verify_connectivity()
+        connection_time = time.time() - start_time
+
+        print(f"Connection established in {connection_time:.3f} seconds")
+        print(await self.async_driver.get_server_info())
+        self.set_unkeyed_nodes(
+            await self.run_read_async("count_unkeyed", COUNT_UNKEYED_QUERY, {})
+        )
+
+    async def get_connections_async(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> GroupedConnections | None:
+        selected = select_query_template(text, labels, listening_context, self.logger)
+        if not selected:
+            return None
+
+        template, parameters = selected
+        records = await self.run_read_async(
+            template, QUERY_TEMPLATES[template], parameters
+        )
+        if not records and self.unkeyed_nodes:
+            records = await self.run_read_async("unkeyed", UNKEYED_QUERY, parameters)
+            self.warn_unkeyed_match(text, records)
+
+        if not records:
+            return None
+        return GroupedConnections(record_to_connection(record) for record in records)
+
+    async def run_read_async(self, template: str, query: str, parameters: dict) -> list:
+        with self.query_stats.timed(template):
+            async with self.async_driver.session() as session:
+                return await session.execute_read(
+                    self._read_all_async, query, parameters
+                )
+
+    @staticmethod
+    async def _read_all_async(tx, query: str, parameters: dict) -> list:
+        result = await tx.run(query, parameters)
+        return [record async for record in result]
+
+    async def close_async(self):
+        await self.async_driver.close()
+        self.close()
+
+
+class InMemoryGraphBackend(GraphBackend):
+    """Answers connection lookups from an exported graph (see neo4j_all_data_getter) without any database round
+    trip. Nodes are indexed by (label, lowercased text) and their outgoing connections are built once at load time,
+    then grouped by relationship type on first lookup of each node.
+    """
+
+    def __init__(
+        self,
+        nodes: list[dict],
+        relationships: list[dict],
+        logger: Logger,
+        file_path: Optional[str] = None,
+    ):
+        self.logger = logger
+        self.file_path = file_path
+        self.nodes: dict[int, dict] = {}
+        self.text_index: dict[tuple[str, str], list[int]] = defaultdict(list)
+        self.outgoing: dict[int, list[dict]] = defaultdict(list)
+        self.relationship_ids: set[int] = set()
+        self.grouped: dict[int, GroupedConnections] = {}
+        self.add_graph(nodes, relationships)
+
+    @classmethod
+    def from_json(cls, file_path: str, logger: Logger) -> "InMemoryGraphBackend":
+        start_time = time.time()
+        with open(file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        backend = cls(data["nodes"], data["relationships"], logger, file_path)
+        load_time = time.time() - start_time
+        print(
+            f"Loaded {len(backend.nodes)} nodes and {len(data['relationships'])} relationships "
+            f"from {file_path} in {load_time:.3f} seconds"
+        )
+        return backend
+
+    def reload(self):
+        if not self.file_path:
+            return
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Build on the side so lookups running on other threads never see a half-loaded graph
+        fresh = InMemoryGraphBackend(data["nodes"], data["relationships"], self.logger)
+        (
+            self.nodes,
+            self.text_index,
+            self.outgoing,
+            self.relationship_ids,
+            self.grouped,
+        ) = (
+            fresh.nodes,
+            fresh.text_index,
+            fresh.outgoing,
+            fresh.relationship_ids,
+            fresh.grouped,
+        )
+        self.logger.info("Reloaded graph from %s", self.file_path)
+
+    def add_graph(self, nodes: list[dict], relationships: list[dict]):
+        for node in nodes:
+            if node["id"] in self.nodes:
+                continue
+            self.nodes[node["id"]] = node
+            text = node["properties"].get("text")
+            if text is None:
+                continue
+            for label in node["labels"]:
+                self.text_index[(label, normalize_node_text(text))].append(node["id"])
+
+        for relationship in relationships:
+            if relationship["id"] in self.relationship_ids:
+                continue
+            start = self.nodes.get(relationship["startNodeId"])
+            end = self.nodes.get(relationship["endNodeId"])
+            if not start or not end:
+                self.logger.warning("Skipped dangling relationship: %s", relationship)
+                continue
+            self.relationship_ids.add(relationship["id"])
+            self.grouped.pop(start["id"], None)
+            self.outgoing[start["id"]].append(
+                build_connection(
+                    start["properties"],
+                    start["labels"],
+                    relationship["type"],
+                    relationship["properties"],
+                    end["properties"],
+                    end["labels"],
+                )
+            )
+
+    def find_nodes(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[int]:
+        text_key = normalize_node_text(text)
+        node_ids: list[int] = []
+
+        for label in labels:
+            if label == "Whisper" and not listening_context:
+                self.logger.warning(
+                    "Listening context is not set for Whisper: %s", text
+                )
+                continue
+
+            for node_id in self.text_index.get((label, text_key), []):
+                if node_id in node_ids:
+                    continue
+                if (
+                    label == "Whisper"
+                    and self.nodes[node_id]["properties"].get("context")
+                    != listening_context
+                ):
+                    continue
+                node_ids.append(node_id)
+
+        return node_ids
+
+    def get_grouped_connections(self, node_id: int) -> GroupedConnections:
+        grouped = self.grouped.get(node_id)
+        if grouped is None:
+            grouped = GroupedConnections(self.outgoing.get(node_id, []))
+            self.grouped[node_id] = grouped
+        return grouped
+
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> GroupedConnections | None:
+        node_ids = self.find_nodes(text, labels, listening_context)
+
+        if len(node_ids) == 1:
+            connections = self.get_grouped_connections(node_ids[0])
+        else:
+            connections = GroupedConnections(
+                connection
+                for node_id in node_ids
+                for connection in self.get_grouped_connections(node_id)
+            )
+
+        return connections if connections else None
+
+
+class PrefetchingGraphBackend(GraphBackend):
+    """Walks a local copy of the neighbourhood of each looked up node instead of querying Neo4j on every hop.
+
+    A lookup for a text that is not in the local subgraph yet fetches everything reachable from it up to `depth`
+    hops in a single query, so a whole conversation chain usually costs one round trip per utterance. The local
+    subgraph is dropped at the start of every utterance, so each conversation gets a prefetcher of its own (see
+    for_conversation), over the same Neo4j backend.
+    """
+
+    def __init__(
+        self,
+        backend: Neo4jGraphBackend,
+        logger: Logger,
+        depth: int = 4,
+        owner: Optional["PrefetchingGraphBackend"] = None,
+    ):
+        self.backend = backend
+        self.logger = logger
+        self.depth = depth
+        self.owner = owner
+        self.lock = threading.Lock()
+        self.local = InMemoryGraphBackend([], [], logger)
+        self.complete_texts: set[str] = set()
+        self.conversations: weakref.WeakSet[PrefetchingGraphBackend] = weakref.WeakSet()
+
+        self.round_trips = 0
+        self.local_lookups = 0
+
+    def for_conversation(self) -> "PrefetchingGraphBackend":
+        if self.owner:
+            return self.owner.for_conversation()
+        prefetcher = PrefetchingGraphBackend(
+            self.backend, self.logger, self.depth, owner=self
+        )
+        self.conversations.add(prefetcher)
+        return prefetcher
+
+    def begin_utterance(self):
+        with self.lock:
+            if self.round_trips or self.local_lookups:
+                self.logger.info(
+                    "Previous utterance used %s round trip(s) and %s local lookup(s) for %s prefetched nodes",
+                    self.round_trips,
+                    self.local_lookups,
+                    len(self.local.nodes),
+                )
+            self.local = InMemoryGraphBackend([], [], self.logger)
+            self.complete_texts = set()
+            self.round_trips = 0
+            self.local_lookups = 0
+
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        text_key = normalize_node_text(text)
+
+        with self.lock:
+            local = self.local
+            if text_key in self.complete_texts:
+                self.local_lookups += 1
+                return local.get_connections(text, labels, listening_context)
+
+        start_time = time.time()
+        nodes, relationships, complete_texts = self.backend.fetch_subgraph(
+            text, labels, listening_context, self.depth
+        )
+        self.logger.info(
+            "Prefetched %s nodes and %s relationships around <%s> (depth %s) in %.3f seconds",
+            len(nodes),
+            len(relationships),
+            text,
+            self.depth,
+            time.time() - start_time,
+        )
+
+        with self.lock:
+            local.add_graph(nodes, relationships)
+            self.round_trips += 1
+            if local is self.local:
+                self.complete_texts.update(complete_texts)
+
+        connections = local.get_connections(text, labels, listening_context)
+        if connections is None and self.backend.unkeyed_nodes:
+            # The subgraph query only seeks text keys, the backend falls back on toLower(text)
+            return self.backend.get_connections(text, labels, listening_context)
+        return connections
+
+    async def get_connections_async(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[dict] | None:
+        return await asyncio.to_thread(
+            self.get_connections, text, labels, listening_context
+        )
+
+    def warmup(self):
+        self.backend.warmup()
+
+    def reload(self):
+        if self.owner:
+            self.owner.reload()
+            return
+        for prefetcher in [self, *self.conversations]:
+            prefetcher.begin_utterance()
+        self.backend.reload()
+
+    def close(self):
+        # The Neo4j backend belongs to the prefetcher the conversations were made from
+        if not self.owner:
+            self.backend.close()
@@ -0,0 +1,201 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import cache
+from logging import Logger
+from typing import Optional
+
+from src.robeau.classes.conversation_context import normalize_node_text
+from src.robeau.core.robeau_constants import ROBEAU_LABELS, SYSTEM_LABELS, USER_LABELS
+
+# Labels the connection templates can look nodes up by. Cypher can't take a label as a parameter, so the template
+# has one UNION branch per label, each only kept when its label is in the $labels parameter
+QUERYABLE_LABELS = [
+    label for label in USER_LABELS + ROBEAU_LABELS + SYSTEM_LABELS if label != "Whisper"
+]
+
+
+def _label_branch(label: str) -> str:
+    return f"""
+    MATCH (x:{label})-[r]->(y)
+    WHERE '{label}' IN $labels
+    AND x.text_key = $text_key
+    RETURN x, r, y
+    """
+
+
+WHISPER_BRANCH = """
+    MATCH (x:Whisper)-[r]->(y)
+    WHERE x.context = $listening_context
+    AND x.text_key = $text_key
+    RETURN x, r, y
+    """
+
+# The only connection queries ever sent (along with UNKEYED_QUERY), so the server plans each of them once
+QUERY_TEMPLATES = {
+    "labels": "\nUNION\n".join(_label_branch(label) for label in QUERYABLE_LABELS),
+    "whisper": WHISPER_BRANCH,
+    "labels_and_whisper": "\nUNION\n".join(
+        [_label_branch(label) for label in QUERYABLE_LABELS] + [WHISPER_BRANCH]
+    ),
+}
+
+
+def unkeyed_condition(variable: str) -> str:
+    """Cypher condition of a node lacking an up to date text_key, e.g. authored after neo4j_text_key_migration ran"""
+    return (
+        f"{variable}.text IS NOT NULL "
+        f"AND ({variable}.text_key IS NULL OR {variable}.text_key <> toLower({variable}.text))"
+    )
+
+
+COUNT_UNKEYED_QUERY = f"""
+    MATCH (n)
+    WHERE {unkeyed_condition("n")}
+    RETURN count(n) AS unkeyed
+    """
+
+# Lookup of the templates on toLower(text) instead of the index, only sent while some nodes have no text_key
+UNKEYED_QUERY = f"""
+    MATCH (x)-[r]->(y)
+    WHERE {unkeyed_condition("x")}
+    AND toLower(x.text) = $text_key
+    AND (
+        any(label IN labels(x) WHERE label IN $labels)
+        OR (x:Whisper AND x.context = $listening_context)
+    )
+    RETURN x, r, y
+    """
+
+
+def _subgraph_root_branch(label: str) -> str:
+    return f"""
+        MATCH (root:{label})
+        WHERE '{label}' IN $labels
+        AND root.text_key = $text_key
+        RETURN root
+        """
+
+
+def _subgraph_node_branch(label: str) -> str:
+    return f"""
+        WITH reached_keys
+        MATCH (x:{label})
+        WHERE x.text_key IN reached_keys
+        RETURN x
+        """
+
+
+@cache
+def subgraph_query(depth: int) -> str:
+    """Query of Neo4jGraphBackend.fetch_subgraph. Roots, and nodes sharing their text with a reached node, are
+    matched by one UNION branch per label, like the connection templates, so that each branch seeks the text_key
+    index of its label rather than scanning every node."""
+    root_branches = [_subgraph_root_branch(label) for label in QUERYABLE_LABELS] + [
+        """
+        MATCH (root:Whisper)
+        WHERE root.context = $listening_context
+        AND root.text_key = $text_key
+        RETURN root
+        """
+    ]
+    node_branches = [
+        _subgraph_node_branch(label) for label in QUERYABLE_LABELS + ["Whisper"]
+    ]
+    return f"""
+    CALL {{{"UNION".join(root_branches)}}}
+    OPTIONAL MATCH (root)-[*0..{max(depth - 1, 0)}]->(reached)
+    WITH collect(DISTINCT toLower(reached.text)) AS reached_keys
+    CALL {{{"UNION".join(node_branches)}}}
+    OPTIONAL MATCH (x)-[r]->(y)
+    RETURN x, r, y
+    """
+
+
+def select_query_template(
+    text: str, labels: list[str], listening_context: Optional[str], logger: Logger
+) -> tuple[str, dict] | None:
+    """Picks the template answering a lookup, returns its name and parameters (None when nothing can match)."""
+    other_labels = [label for label in labels if label != "Whisper"]
+    whisper = "Whisper" in labels
+
+    if whisper and not listening_context:
+        logger.warning(f"Listening context is not set for Whisper: {text}")
+        whisper = False
+
+    unknown_labels = [
+        label
+        for label in other_labels
+        if label not in QUERYABLE_LABELS and label != "None"
+    ]
+    if unknown_labels:
+        logger.warning(f"Labels {unknown_labels} have no branch in the query templates")
+
+    if not any(label in QUERYABLE_LABELS for label in other_labels):
+        other_labels = []
+
+    if other_labels and whisper:
+        name = "labels_and_whisper"
+    elif other_labels:
+        name = "labels"
+    elif whisper:
+        name = "whisper"
+    else:
+        if labels != [
+            "None"
+        ]:  # Placeholder label of nodes that can't be labelled, expected to match nothing
+            logger.warning("No queries were constructed. Check the labels or context.")
+        return None
+
+    return name, {
+        "text_key": normalize_node_text(text),
+        "labels": other_labels,
+        "listening_context": listening_context if whisper else None,
+    }
+
+
+class QueryStats:
+    """Execution times of each query template, the last `history` ones kept for percentiles."""
+
+    def __init__(self, history: int = 1000):
+        self.lock = threading.Lock()
+        self.history = history
+        self.counts: dict[str, int] = {}
+        self.totals: dict[str, float] = {}
+        self.recent: dict[str, deque[float]] = {}
+
+    def record(self, template: str, duration: float):
+        with self.lock:
+            self.counts[template] = self.counts.get(template, 0) + 1
+            self.totals[template] = self.totals.get(template, 0.0) + duration
+            self.recent.setdefault(template, deque(maxlen=self.history)).append(
+                duration
+            )
+
+    @contextmanager
+    def timed(self, template: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(template, time.perf_counter() - start_time)
+
+    def as_dict(self) -> dict[str, dict]:
+        with self.lock:
+            recent = {name: sorted(times) for name, times in self.recent.items()}
+            counts, totals = dict(self.counts), dict(self.totals)
+
+        def percentile(times: list[float], fraction: float) -> float:
+            return times[min(len(times) - 1, int(fraction * len(times)))]
+
+        return {
+            name: {
+                "count": counts[name],
+                "mean_ms": round(totals[name] / counts[name] * 1000, 3),
+                "p50_ms": round(percentile(times, 0.5) * 1000, 3),
+                "p95_ms": round(percentile(times, 0.95) * 1000, 3),
+                "max_ms": round(times[-1] * 1000, 3),
+            }
+            for name, times in recent.items()
+        }
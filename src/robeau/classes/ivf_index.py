@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+
+# Rows scored per matrix product when assigning rows to clusters, bounds the similarity matrix kept in memory
+ASSIGN_CHUNK_ROWS = 8192
+
+
+def assign_clusters(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate(
+        [
+            np.argmax(matrix[start : start + ASSIGN_CHUNK_ROWS] @ centroids.T, axis=1)
+            for start in range(0, len(matrix), ASSIGN_CHUNK_ROWS)
+        ]
+    )
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+class IVFIndex:
+    """Approximate nearest neighbours of unit rows by inverted file: rows are grouped in clusters by spherical
+    k-means, and a query is only scored against the rows of the `probes` clusters whose centroids are the closest
+    to it. Rows of cluster c are order[offsets[c]:offsets[c + 1]], indexes into the matrix the index was built from,
+    which it doesn't hold.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.order)
+
+    @classmethod
+    def build(
+        cls,
+        matrix: np.ndarray,
+        clusters: int | None = None,
+        iterations: int = 10,
+        training_rows: int = 64,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """k-means trains on at most `training_rows` rows per cluster, then every row is assigned once"""
+        rng = np.random.default_rng(seed)
+        clusters = min(len(matrix), clusters or max(1, int(np.sqrt(len(matrix)))))
+
+        sample_size = min(len(matrix), clusters * training_rows)
+        sample = matrix[np.sort(rng.choice(len(matrix), sample_size, replace=False))]
+        centroids = sample[rng.choice(len(sample), clusters, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignments = assign_clusters(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=clusters)
+            # Empty clusters restart from random rows rather than staying useless
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize_rows(sums).astype(matrix.dtype, copy=False)
+
+        assignments = assign_clusters(matrix, centroids)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(clusters + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=clusters), out=offsets[1:])
+        return cls(centroids, order, offsets)
+
+    def candidate_rows(self, query: np.ndarray, probes: int) -> np.ndarray:
+        probes = min(probes, len(self.centroids))
+        closest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        return np.concatenate(
+            [self.order[self.offsets[c] : self.offsets[c + 1]] for c in closest]
+        )
+
+    def to_arrays(self, prefix: str) -> dict[str, np.ndarray]:
+        return {
+            f"{prefix}centroids": self.centroids,
+            f"{prefix}order": self.order,
+            f"{prefix}offsets": self.offsets,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays, prefix: str) -> "IVFIndex":
+        return cls(
+            arrays[f"{prefix}centroids"],
+            arrays[f"{prefix}order"],
+            arrays[f"{prefix}offsets"],
+        )
+
+
+def save_ivf_indexes(file_path: str, indexes: dict[str, tuple[str, IVFIndex]]):
+    """Saves the index of each label with the fingerprint of what it was built from"""
+    arrays = {"labels": np.array(list(indexes))}
+    for label, (fingerprint, index) in indexes.items():
+        arrays[f"{label}/fingerprint"] = np.array(fingerprint)
+        arrays.update(index.to_arrays(f"{label}/"))
+
+    temp_file_path = f"{file_path}.tmp"
+    with open(temp_file_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temp_file_path, file_path)
+
+
+def load_ivf_indexes(file_path: str) -> dict[str, tuple[str, IVFIndex]]:
+    try:
+        with np.load(file_path) as arrays:
+            return {
+                str(label): (
+                    str(arrays[f"{label}/fingerprint"]),
+                    IVFIndex.from_arrays(arrays, f"{label}/"),
+                )
+                for label in arrays["labels"]
+            }
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return {}
@@ -0,0 +1,114 @@
+import json
+import os
+
+import numpy as np
+import onnxruntime as ort
+from tokenizers import Tokenizer
+
+from src.robeau.classes.embedding_cache import model_slug
+from src.robeau.core.robeau_constants import ROBEAU_ONNX_MODELS_DIR_PATH
+
+ONNX_MODEL_FILE_NAME = "model.onnx"
+ONNX_INT8_MODEL_FILE_NAME = "model.int8.onnx"
+ENCODER_CONFIG_FILE_NAME = "encoder_config.json"
+TOKENIZER_FILE_NAME = "tokenizer.json"
+
+
+def get_model_dir(model_name: str) -> str:
+    return os.path.join(ROBEAU_ONNX_MODELS_DIR_PATH, model_slug(model_name))
+
+
+class OnnxSentenceEncoder:
+    """Sentence transformer exported by scripts/sbert_onnx_export.py, run by onnxruntime on the CPU.
+
+    Texts go through the model's fast tokenizer, then the token embeddings output by the ONNX graph are mean pooled
+    over the attention mask, as the SentenceTransformer pooling layer does. `encode` takes the arguments of
+    SentenceTransformer.encode that SBERTMatcher uses, so either can back it; neither torch nor sentence-transformers
+    is loaded.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_file_name: str = ONNX_INT8_MODEL_FILE_NAME,
+        threads: int = 0,
+    ):
+        model_file_path = os.path.join(model_dir, model_file_name)
+        if not os.path.exists(model_file_path):
+            raise FileNotFoundError(
+                f"No ONNX model at {model_file_path}, export it with "
+                f"python -m src.robeau.scripts.sbert_onnx_export"
+            )
+
+        with open(os.path.join(model_dir, ENCODER_CONFIG_FILE_NAME), "r") as f:
+            config = json.load(f)
+        self.dimension = config["dimension"]
+
+        self.tokenizer = Tokenizer.from_file(
+            os.path.join(model_dir, TOKENIZER_FILE_NAME)
+        )
+        self.tokenizer.enable_truncation(max_length=config["max_seq_length"])
+        self.tokenizer.enable_padding(
+            pad_id=config["pad_token_id"], pad_token=config["pad_token"]
+        )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads  # 0 lets onnxruntime pick
+        self.session = ort.InferenceSession(
+            model_file_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {
+            model_input.name for model_input in self.session.get_inputs()
+        }
+
+    @classmethod
+    def from_model_name(
+        cls, model_name: str, model_file_name: str = ONNX_INT8_MODEL_FILE_NAME
+    ) -> "OnnxSentenceEncoder":
+        return cls(get_model_dir(model_name), model_file_name)
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array(
+            [encoding.attention_mask for encoding in encodings], dtype=np.int64
+        )
+        inputs = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array(
+                [encoding.type_ids for encoding in encodings], dtype=np.int64
+            ),
+        }
+        token_embeddings = self.session.run(
+            None, {name: inputs[name] for name in self.input_names}
+        )[0]
+
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        texts: str | list[str],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        text_list = [texts] if isinstance(texts, str) else texts
+
+        batches = [
+            self._encode_batch(text_list[start : start + batch_size])
+            for start in range(0, len(text_list), batch_size)
+        ]
+        embeddings = (
+            np.concatenate(batches)
+            if batches
+            else np.zeros((0, self.dimension), dtype=np.float32)
+        )
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings[0] if single else embeddings
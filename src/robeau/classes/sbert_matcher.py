@@ -1,48 +1,305 @@
+import hashlib
 import json
 import time
-from typing import Optional
+from typing import Literal, Optional
 
-import torch
-from sentence_transformers import SentenceTransformer, util
+import numpy as np
 
+from src.config.settings import (
+    ROBEAU_MATCHER_ANN_MIN_ROWS,
+    ROBEAU_MATCHER_ANN_PROBES,
+    ROBEAU_MATCHER_BACKEND,
+    ROBEAU_MATCHER_BATCH_SIZE,
+    ROBEAU_MATCHER_FUZZY_THRESHOLD,
+    ROBEAU_MATCHER_MEMO_SIZE,
+    ROBEAU_MATCHER_MEMO_TTL,
+)
+from src.robeau.classes.embedding_cache import (
+    EmbeddingCache,
+    EmbeddingMemo,
+    normalize_cached_text,
+)
+from src.robeau.classes.ivf_index import IVFIndex, load_ivf_indexes, save_ivf_indexes
+from src.robeau.classes.text_match_index import TextMatchIndex
 from src.robeau.core.robeau_constants import (
     ROBEAU_PROMPTS_JSON_FILE_PATH as ROBEAU_PROMPTS,
 )
 
 
+def load_prompt_texts(file_path: str) -> list[str]:
+    """Every main text and synonym of a prompts file, in file order"""
+    with open(file_path, "r") as f:
+        data = json.load(f)
+    return [
+        text
+        for items in data.values()
+        for item in items
+        for text in [item["text"]] + item.get("synonyms", [])
+    ]
+
+
+class LabelEmbeddings:
+    """Embeddings of every text (main texts and their synonyms) of one or more labels, as a single matrix of unit
+    rows: row i is the embedding of texts[i], which is main_texts[i] or one of its synonyms, under labels[i]. Since
+    rows are normalized, the cosine similarities of a query against all of them are one matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        main_texts: list[str],
+        texts: list[str],
+        labels: list[str],
+        parts: Optional[list["LabelEmbeddings"]] = None,
+    ):
+        self.matrix = matrix
+        self.main_texts = main_texts
+        self.texts = texts
+        self.labels = labels
+        # Embeddings this one stacks, searched apart when some have an approximate index
+        self.parts = parts or []
+        # Approximate index searching the `ann_probes` closest clusters, set on labels with many rows
+        self.ann: IVFIndex | None = None
+        self.ann_probes = 8
+
+    def __len__(self):
+        return len(self.texts)
+
+    @classmethod
+    def stack(cls, parts: list["LabelEmbeddings"]) -> "LabelEmbeddings":
+        return cls(
+            np.concatenate([part.matrix for part in parts]),
+            [text for part in parts for text in part.main_texts],
+            [text for part in parts for text in part.texts],
+            [label for part in parts for label in part.labels],
+            parts,
+        )
+
+    @property
+    def approximate(self) -> bool:
+        return self.ann is not None or any(part.approximate for part in self.parts)
+
+    def top_k(self, query: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Row indexes and similarities of the k rows closest to a normalized query, best first. Ties go to the
+        lowest row, i.e. the first label and text in file order."""
+        if self.ann is not None:
+            rows = self.ann.candidate_rows(query, self.ann_probes)
+            return self._select_top_k(self.matrix[rows] @ query, k, rows)
+
+        if self.parts and self.approximate:
+            results = []
+            offset = 0
+            for part in self.parts:
+                results += [(offset + row, sim) for row, sim in part.top_k(query, k)]
+                offset += len(part)
+            return sorted(results, key=lambda result: (-result[1], result[0]))[:k]
+
+        return self._select_top_k(self.matrix @ query, k)
+
+    def top_k_many(self, queries: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        """top_k of each row of a matrix of normalized queries, scored in one matrix product unless approximate"""
+        if self.approximate:
+            return [self.top_k(query, k) for query in queries]
+        return [
+            self._select_top_k(similarities, k)
+            for similarities in queries @ self.matrix.T
+        ]
+
+    @staticmethod
+    def _select_top_k(
+        similarities: np.ndarray, k: int, rows: Optional[np.ndarray] = None
+    ) -> list[tuple[int, float]]:
+        """`rows` are the rows the similarities are of, when not all of them"""
+        k = min(k, len(similarities))
+        if k <= 0:
+            return []
+        if k < len(similarities):
+            picks = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            picks = np.arange(len(similarities))
+        picked_rows = picks if rows is None else rows[picks]
+        ordering = np.lexsort((picked_rows, -similarities[picks]))
+        return [(int(picked_rows[i]), float(similarities[picks[i]])) for i in ordering]
+
+
 class SBERTMatcher:
     def __init__(
         self,
         model_name="all-MiniLM-L6-v2",
         file_path=None,
         similarity_threshold=0.6,
+        use_cache: bool = True,
+        batch_size: int = ROBEAU_MATCHER_BATCH_SIZE,
+        backend: Literal["torch", "onnx"] = ROBEAU_MATCHER_BACKEND,  # type: ignore
+        memo_size: int = ROBEAU_MATCHER_MEMO_SIZE,
+        memo_ttl: float = ROBEAU_MATCHER_MEMO_TTL,
+        fuzzy_threshold: float = ROBEAU_MATCHER_FUZZY_THRESHOLD,
+        ann_min_rows: int = ROBEAU_MATCHER_ANN_MIN_ROWS,
+        ann_probes: int = ROBEAU_MATCHER_ANN_PROBES,
     ):
-        self.model = SentenceTransformer(model_name)
-        if torch.cuda.is_available():
-            self.model = self.model.to("cuda")
+        self.batch_size = batch_size
+        self.ann_min_rows = ann_min_rows
+        self.ann_probes = ann_probes
+        self.memo = EmbeddingMemo(memo_size, memo_ttl)
+        self.backend = backend
+        self.model = self._load_model(model_name, backend)
+        # Embeddings of the prompts file texts, stored next to it so that restarts only encode new synonyms. The
+        # int8 model gives slightly different embeddings, which are cached apart.
+        cache_model_name = (
+            model_name if backend == "torch" else f"{model_name}.onnx-int8"
+        )
+        self.cache = (
+            EmbeddingCache.for_file(file_path, cache_model_name)
+            if file_path and use_cache
+            else None
+        )
         self.embeddings = self._load_embeddings(file_path) if file_path else {}
         self.metadata = self._load_metadata(file_path) if file_path else {}
         self.similarity_threshold = similarity_threshold
+        # Matrices of the label sets queried so far, stacked once then reused
+        self.stacked_embeddings: dict[tuple[str, ...], LabelEmbeddings] = {}
+
+        # Exact and near exact hits are matched before (and without) any model call
+        self.text_index = TextMatchIndex(fuzzy_threshold)
+        for label, label_embeddings in self.embeddings.items():
+            self.text_index.add_label(
+                label, label_embeddings.main_texts, label_embeddings.texts
+            )
+        # How many queries each tier matched, "neural" being the embedding search
+        self.tier_counts = {"exact": 0, "fuzzy": 0, "neural": 0}
+
+    @staticmethod
+    def _load_model(model_name: str, backend: Literal["torch", "onnx"]):
+        # Imported on demand: the onnx backend must not load torch, the bulk of the torch backend's memory, and the
+        # torch one doesn't need onnxruntime
+        if backend == "onnx":
+            from src.robeau.classes.onnx_sentence_encoder import OnnxSentenceEncoder
+
+            return OnnxSentenceEncoder.from_model_name(model_name)
+
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+        if torch.cuda.is_available():
+            model = model.to("cuda")
+        return model
+
+    def _encode(self, texts: str | list[str]) -> np.ndarray:
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ).astype(np.float32, copy=False)
+
+    def _encode_queries(self, queries: list[str]) -> list[np.ndarray]:
+        """Embeddings of utterances, those not memoized are encoded together"""
+        memoized = {query: self.memo.get(query) for query in queries}
+        missing = [query for query, embedding in memoized.items() if embedding is None]
+        if missing:
+            matrix = self._encode([normalize_cached_text(query) for query in missing])
+            for query, embedding in zip(missing, matrix):
+                self.memo.put(query, embedding)
+                memoized[query] = embedding
+        return [memoized[query] for query in queries]  # type: ignore
+
+    def _encode_all(self, texts: list[str]) -> np.ndarray:
+        """Encodes the texts in batches of `batch_size`, reporting the throughput"""
+        start_time = time.time()
+        matrix = self._encode(texts)
+        elapsed = time.time() - start_time
+        print(
+            f"Encoded {len(texts)} texts in batches of {self.batch_size} in {elapsed:.4f}s "
+            f"({len(texts) / max(elapsed, 1e-9):.0f} texts/s)"
+        )
+        return matrix
 
-    def _load_embeddings(self, file_path: str):
+    def _load_embeddings(self, file_path: str) -> dict[str, LabelEmbeddings]:
         with open(file_path, "r") as f:
             data = json.load(f)
 
-        embeddings: dict = {}
+        sections: dict[str, tuple[list[str], list[str]]] = {}
         for section, items in data.items():
-            embeddings[section] = []
+            main_texts, texts = [], []
             for item in items:
                 main_text = item["text"]
-                all_texts = [main_text] + item.get("synonyms", [])
-                for text in all_texts:
-                    embedding = self.model.encode(text, convert_to_tensor=True)
-                    if torch.cuda.is_available() and isinstance(
-                        embedding, torch.Tensor
-                    ):
-                        embedding = embedding.to("cuda")
-                    embeddings[section].append((main_text, text, embedding))
+                for text in [main_text] + item.get("synonyms", []):
+                    main_texts.append(main_text)
+                    texts.append(text)
+            if texts:
+                sections[section] = (main_texts, texts)
+
+        all_texts = [text for _, texts in sections.values() for text in texts]
+        text_embeddings = self._embed_texts(all_texts)
+
+        embeddings: dict[str, LabelEmbeddings] = {}
+        for section, (main_texts, texts) in sections.items():
+            matrix = np.stack([text_embeddings[text] for text in texts])
+            embeddings[section] = LabelEmbeddings(
+                matrix, main_texts, texts, [section] * len(texts)
+            )
+
+        if self.cache is not None and len(self.cache) > 2 * len(text_embeddings):
+            self.cache.compact(all_texts)
+        if self.ann_min_rows > 0:
+            self._attach_ann_indexes(embeddings)
         return embeddings
 
+    def _attach_ann_indexes(self, embeddings: dict[str, LabelEmbeddings]):
+        """Gives labels of at least `ann_min_rows` rows an IVF index, reused from next to the embedding cache when
+        it was built from the same texts"""
+        start_time = time.time()
+        ann_file_path = self.cache.ann_file_path if self.cache is not None else None
+        stored = load_ivf_indexes(ann_file_path) if ann_file_path else {}
+
+        indexes: dict[str, tuple[str, IVFIndex]] = {}
+        built = 0
+        for label, label_embeddings in embeddings.items():
+            if len(label_embeddings) < self.ann_min_rows:
+                continue
+            fingerprint = hashlib.sha1(
+                "\n".join(label_embeddings.texts).encode("utf-8")
+            ).hexdigest()
+            stored_fingerprint, index = stored.get(label, (None, None))
+            if stored_fingerprint != fingerprint or index is None:
+                index = IVFIndex.build(label_embeddings.matrix)
+                built += 1
+            label_embeddings.ann = index
+            label_embeddings.ann_probes = self.ann_probes
+            indexes[label] = (fingerprint, index)
+
+        if ann_file_path and built:
+            save_ivf_indexes(ann_file_path, indexes)
+        if indexes:
+            print(
+                f"Approximate search for {list(indexes)}, {built} index(es) built "
+                f"(exec.time: {time.time() - start_time:.4f})"
+            )
+
+    def _embed_texts(self, texts: list[str]) -> dict[str, np.ndarray]:
+        """Embeddings of each distinct text, only those missing from the cache are encoded"""
+        start_time = time.time()
+        if self.cache is None:
+            distinct_texts = list(dict.fromkeys(texts))
+            return dict(zip(distinct_texts, self._encode_all(distinct_texts)))
+
+        text_embeddings, missing = self.cache.get_many(texts)
+        if missing:
+            encoded = self._encode_all(
+                [normalize_cached_text(text) for text in missing]
+            )
+            for text, embedding in zip(missing, encoded):
+                self.cache.add(text, embedding)
+                text_embeddings[text] = embedding
+            self.cache.save()
+
+        print(
+            f"Loaded {len(text_embeddings)} embeddings, encoded {len(missing)} missing "
+            f"from the cache (exec.time: {time.time() - start_time:.4f})"
+        )
+        return text_embeddings
+
     @staticmethod
     def _load_metadata(file_path: str):
         with open(file_path, "r") as f:
@@ -59,9 +316,57 @@ class SBERTMatcher:
                 metadata[section][main_text] = meta
         return metadata
 
+    def _resolve_labels(self, labels: Optional[list]) -> tuple[str, ...]:
+        return tuple(
+            label
+            for label in (labels if labels else self.embeddings.keys())
+            if label in self.embeddings
+        )
+
+    def _get_label_embeddings(self, labels: Optional[list]) -> LabelEmbeddings | None:
+        key = self._resolve_labels(labels)
+        if not key:
+            return None
+        if len(key) == 1:
+            return self.embeddings[key[0]]
+
+        stacked = self.stacked_embeddings.get(key)
+        if stacked is None:
+            stacked = LabelEmbeddings.stack([self.embeddings[label] for label in key])
+            self.stacked_embeddings[key] = stacked
+        return stacked
+
+    def find_best_matches(
+        self,
+        message: str,
+        labels: Optional[list] = None,
+        top_k: int = 5,
+    ) -> list[tuple[str, str, str, float]]:
+        """(main text, matched text, label, similarity) of the top_k texts closest to the message, best first,
+        whatever their similarity. Always runs the embedding search, the text tiers only pick a best match.
+        """
+        label_embeddings = self._get_label_embeddings(labels)
+        if label_embeddings is None:
+            return []
+
+        input_embedding = self._encode_queries([message])[0]
+        return self._describe_rows(
+            label_embeddings, label_embeddings.top_k(input_embedding, top_k)
+        )
+
     @staticmethod
-    def _measure_similarity(embedding1, embedding2):
-        return util.pytorch_cos_sim(embedding1, embedding2).item()
+    def _describe_rows(
+        label_embeddings: LabelEmbeddings, rows: list[tuple[int, float]]
+    ) -> list[tuple[str, str, str, float]]:
+        return [
+            (
+                label_embeddings.main_texts[row],
+                label_embeddings.texts[row],
+                label_embeddings.labels[row],
+                similarity,
+            )
+            for row, similarity in rows
+        ]
 
     def check_for_best_matching_synonym(
         self,
@@ -69,36 +374,96 @@ class SBERTMatcher:
         show_details: bool = False,
         labels: Optional[list] = None,
     ) -> tuple[str | None, dict]:
+        return self.match_many([message], [labels], show_details)[0]
+
+    def match_many(
+        self,
+        queries: list[str],
+        labels: Optional[list] = None,
+        show_details: bool = False,
+    ) -> list[tuple[str | None, dict]]:
+        """check_for_best_matching_synonym of several messages. Those the exact or fuzzy text tiers don't match
+        are encoded together in one forward pass and scored with one matrix product per label set. `labels` either
+        applies to every query, or is a list holding the labels (or None for all of them) of each query.
+        """
         start_time = time.time()
-        input_embedding = self.model.encode(message, convert_to_tensor=True)
-        if torch.cuda.is_available() and isinstance(input_embedding, torch.Tensor):
-            input_embedding = input_embedding.to("cuda")
+        if labels and all(
+            isinstance(item, (list, tuple)) or item is None for item in labels
+        ):
+            query_labels = list(labels)
+        else:
+            query_labels = [labels] * len(queries)
+        if len(query_labels) != len(queries):
+            raise ValueError(
+                f"Got {len(query_labels)} label sets for {len(queries)} queries"
+            )
 
-        max_similarity = -1
-        best_match = None
-        best_synonym = None
-        text_metadata = {}
+        matches: list[list[tuple[str, str, str, float]]] = [[] for _ in queries]
+        tiers = ["neural"] * len(queries)
+        neural_indexes = []
+        for index, (query, query_label_set) in enumerate(zip(queries, query_labels)):
+            resolved_labels = self._resolve_labels(query_label_set)
+            for tier, match_text in (
+                ("exact", self.text_index.match_exact),
+                ("fuzzy", self.text_index.match_fuzzy),
+            ):
+                match = match_text(query, resolved_labels)
+                if match:
+                    matches[index] = [match]
+                    tiers[index] = tier
+                    break
+            else:
+                neural_indexes.append(index)
+        for tier in tiers:
+            self.tier_counts[tier] += 1
+
+        distinct_queries = list(dict.fromkeys(queries[i] for i in neural_indexes))
+        embeddings = dict(zip(distinct_queries, self._encode_queries(distinct_queries)))
 
-        categories = labels if labels else self.embeddings.keys()
+        # Queries scored against the same label set share one matrix product
+        groups: dict[int, tuple[LabelEmbeddings, list[int]]] = {}
+        for index in neural_indexes:
+            label_embeddings = self._get_label_embeddings(query_labels[index])
+            if label_embeddings is not None:
+                group = groups.setdefault(id(label_embeddings), (label_embeddings, []))
+                group[1].append(index)
 
-        for category in categories:
-            items = self.embeddings.get(category, [])
-            metadata_items = self.metadata.get(category, {})
-            for main_text, text, embedding in items:
-                similarity = self._measure_similarity(input_embedding, embedding)
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_match = main_text
-                    best_synonym = text
-                    text_metadata = metadata_items.get(main_text, {})
+        for label_embeddings, indexes in groups.values():
+            query_matrix = np.stack([embeddings[queries[index]] for index in indexes])
+            for index, rows in zip(
+                indexes, label_embeddings.top_k_many(query_matrix, 1)
+            ):
+                matches[index] = self._describe_rows(label_embeddings, rows)
 
-        end_time = time.time()
-        inference_time = end_time - start_time
+        inference_time = time.time() - start_time
+        return [
+            self._accept_best_match(
+                query, query_matches, tier, show_details, inference_time
+            )
+            for query, query_matches, tier in zip(queries, matches, tiers)
+        ]
+
+    def _accept_best_match(
+        self,
+        message: str,
+        matches: list[tuple[str, str, str, float]],
+        tier: str,
+        show_details: bool,
+        inference_time: float,
+    ) -> tuple[str | None, dict]:
+        max_similarity = -1.0
+        best_match = None
+        best_synonym = None
+        text_metadata = {}
+        if matches:
+            best_match, best_synonym, label, max_similarity = matches[0]
+            text_metadata = self.metadata.get(label, {}).get(best_match, {})
 
         if show_details:
             print(
                 f"Input: <{message}> has match value <{max_similarity:.3f}> from matching with <{best_synonym}> for "
-                f"original text: <{best_match}> with metadata {text_metadata} (exec.time: {inference_time:.4f})"
+                f"original text: <{best_match}> with metadata {text_metadata} ({tier} tier, "
+                f"exec.time: {inference_time:.4f})"
             )
 
         if max_similarity < self.similarity_threshold:
@@ -119,7 +484,11 @@ def main():
             show_details=True,
         )
         print(f"Best Match: {best_match}")
-        print(f"Metadata: {metadata}\n")
+        print(f"Metadata: {metadata}")
+        print(f"Memo: {matcher.memo.stats()}")
+        print(f"Tiers: {matcher.tier_counts}\n")
+        for main_text, text, label, similarity in matcher.find_best_matches(message):
+            print(f"  {similarity:.3f} <{text}> for {label} <{main_text}>")
 
 
 if __name__ == "__main__":
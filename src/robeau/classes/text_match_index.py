@@ -0,0 +1,85 @@
+import difflib
+
+from src.robeau.jsons.modules.submodules.neo4j_prompts_getter import clean_text
+
+
+class TextMatchIndex:
+    """Matches utterances to the prompt texts and synonyms of each label without any model, for SBERTMatcher to try
+    before its embedding search.
+
+    The exact tier looks the utterance up, cleaned the way neo4j_prompts_getter cleans the prompts (case and
+    punctuation), in a hash index of the cleaned texts. The fuzzy tier scores the texts sharing a word with the
+    utterance by difflib ratio of their sorted distinct words, so that word order, repeated words and small typos
+    don't matter while missing or extra words do, and keeps the best one scoring `fuzzy_threshold` or more.
+    """
+
+    def __init__(self, fuzzy_threshold: float = 0.9):
+        self.fuzzy_threshold = fuzzy_threshold
+        # label -> cleaned text -> (main text, text), the first in file order
+        self.exact: dict[str, dict[str, tuple[str, str]]] = {}
+        # label -> [(sorted distinct words, main text, text)]
+        self.entries: dict[str, list[tuple[str, str, str]]] = {}
+        # label -> word -> indexes of the entries holding it
+        self.word_entries: dict[str, dict[str, list[int]]] = {}
+
+    @staticmethod
+    def _word_key(cleaned: str) -> tuple[list[str], str]:
+        words = sorted(set(cleaned.split()))
+        return words, " ".join(words)
+
+    def add_label(self, label: str, main_texts: list[str], texts: list[str]):
+        exact = self.exact.setdefault(label, {})
+        entries = self.entries.setdefault(label, [])
+        word_entries = self.word_entries.setdefault(label, {})
+
+        for main_text, text in zip(main_texts, texts):
+            cleaned = clean_text(text)
+            exact.setdefault(cleaned, (main_text, text))
+
+            words, key = self._word_key(cleaned)
+            for word in words:
+                word_entries.setdefault(word, []).append(len(entries))
+            entries.append((key, main_text, text))
+
+    def match_exact(
+        self, message: str, labels: tuple[str, ...]
+    ) -> tuple[str, str, str, float] | None:
+        cleaned = clean_text(message)
+        for label in labels:
+            hit = self.exact.get(label, {}).get(cleaned)
+            if hit:
+                return hit[0], hit[1], label, 1.0
+        return None
+
+    def match_fuzzy(
+        self, message: str, labels: tuple[str, ...]
+    ) -> tuple[str, str, str, float] | None:
+        if self.fuzzy_threshold > 1:
+            return None
+        words, key = self._word_key(clean_text(message))
+        if not words:
+            return None
+
+        best = None
+        floor = self.fuzzy_threshold
+        sequence_matcher = difflib.SequenceMatcher(None, b=key)
+        for label in labels:
+            entries = self.entries.get(label, [])
+            word_entries = self.word_entries.get(label, {})
+            candidates = sorted(
+                {index for word in words for index in word_entries.get(word, [])}
+            )
+            for index in candidates:
+                entry_key, main_text, text = entries[index]
+                sequence_matcher.set_seq1(entry_key)
+                # Upper bounds first, ratio() is the costly one
+                if (
+                    sequence_matcher.real_quick_ratio() < floor
+                    or sequence_matcher.quick_ratio() < floor
+                ):
+                    continue
+                score = sequence_matcher.ratio()
+                if score >= floor and (best is None or score > best[3]):
+                    best = (main_text, text, label, score)
+                    floor = score
+        return best
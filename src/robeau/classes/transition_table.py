@@ -0,0 +1,451 @@
+import hashlib
+import json
+import os
+import time
+from array import array
+from collections import defaultdict
+from logging import Logger
+from typing import Optional
+
+from src.robeau.classes.graph_backends import (
+    GraphBackend,
+    GroupedConnections,
+    build_connection,
+)
+from src.robeau.classes.conversation_context import normalize_node_text
+from src.robeau.core.graph_logic_network_constants import RELATIONSHIP_TYPES
+from src.robeau.core.robeau_constants import (
+    ROBEAU_DIR_PATH,
+    ROBEAU_LABELS,
+    USER_LABELS,
+)
+
+# Bumped whenever the layout below changes, older tables are recompiled instead of loaded
+TRANSITION_TABLE_FORMAT = 1
+
+# Labels of the nodes a traversal can start from: whatever the user says, plus system inputs
+ENTRY_LABELS = USER_LABELS + ["Input"]
+VOCAL_LABELS = ROBEAU_LABELS
+
+
+def hash_file(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Interner:
+    """Gives every distinct value an index in a list, so the table stores each of them once."""
+
+    def __init__(self):
+        self.values: list = []
+        self.indexes: dict = {}
+
+    def __call__(self, value) -> int:
+        key = json.dumps(value, sort_keys=True) if isinstance(value, dict) else value
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.indexes[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def order_relationship_types(types: set[str]) -> list[str]:
+    # Types the engine handles first, in their usual order, then the logic gate ones (IS_*, THEN...)
+    return [key for key in RELATIONSHIP_TYPES if key in types] + sorted(
+        types - set(RELATIONSHIP_TYPES)
+    )
+
+
+def compile_transition_table(
+    nodes: list[dict],
+    relationships: list[dict],
+    audio_mappings: Optional[list[dict]] = None,
+    source: Optional[dict] = None,
+) -> dict:
+    """Compiles the exported graph (neo4j_all_data format) into a transition table.
+
+    Nodes get dense integer ids. Texts, labels and relationship types are interned in `strings`, node properties
+    and relationship params in `property_sets`. The outgoing edges of each relationship type are stored as CSR
+    arrays: the edges of node n are edge_targets[t][edge_offsets[t][n]:edge_offsets[t][n + 1]], with their
+    params at the same positions in edge_params[t].
+    """
+    strings = Interner()
+    property_sets = Interner()
+
+    node_ids: dict[int, int] = {}
+    node_text: list[int] = []
+    node_labels: list[list[int]] = []
+    node_properties: list[int] = []
+    text_index: dict[tuple[int, int], list[int]] = defaultdict(list)
+
+    for node in nodes:
+        if node["id"] in node_ids:
+            continue
+        properties = node["properties"]
+        text = properties.get("text")
+        if text is None:
+            continue
+
+        node_id = node_ids[node["id"]] = len(node_text)
+        node_text.append(strings(text))
+        node_labels.append([strings(label) for label in node["labels"]])
+        node_properties.append(
+            property_sets(
+                {k: v for k, v in properties.items() if k not in ("text", "text_key")}
+            )
+        )
+        text_key = strings(normalize_node_text(text))
+        for label in node["labels"]:
+            text_index[(strings(label), text_key)].append(node_id)
+
+    edges: dict[str, list[tuple[int, int, int]]] = defaultdict(list)
+    dangling: list[int] = []
+    seen_relationships: set[int] = set()
+
+    for relationship in relationships:
+        if relationship["id"] in seen_relationships:
+            continue
+        seen_relationships.add(relationship["id"])
+        start = node_ids.get(relationship["startNodeId"])
+        end = node_ids.get(relationship["endNodeId"])
+        if start is None or end is None:
+            dangling.append(relationship["id"])
+            continue
+        edges[relationship["type"]].append(
+            (start, end, property_sets(relationship["properties"]))
+        )
+
+    node_count = len(node_text)
+    edge_types, edge_offsets, edge_targets, edge_params = [], [], [], []
+
+    for relationship_type in order_relationship_types(set(edges)):
+        # Sorting by start node keeps the export order of the edges of each node
+        type_edges = sorted(edges[relationship_type], key=lambda edge: edge[0])
+        offsets = [0] * (node_count + 1)
+        for start, _, _ in type_edges:
+            offsets[start + 1] += 1
+        for index in range(node_count):
+            offsets[index + 1] += offsets[index]
+
+        edge_types.append(strings(relationship_type))
+        edge_offsets.append(offsets)
+        edge_targets.append([end for _, end, _ in type_edges])
+        edge_params.append([params for _, _, params in type_edges])
+
+    table = {
+        "format": TRANSITION_TABLE_FORMAT,
+        "source": source or {},
+        "strings": strings.values,
+        "property_sets": property_sets.values,
+        "node_source_ids": list(node_ids),
+        "node_text": node_text,
+        "node_labels": node_labels,
+        "node_properties": node_properties,
+        "text_index": [[label, key, ids] for (label, key), ids in text_index.items()],
+        "edge_types": edge_types,
+        "edge_offsets": edge_offsets,
+        "edge_targets": edge_targets,
+        "edge_params": edge_params,
+    }
+    table["diagnostics"] = diagnose(table, audio_mappings)
+    table["diagnostics"]["dangling_relationships"] = dangling
+    return table
+
+
+def find_strongly_connected_components(
+    node_count: int, successors: list[set[int]]
+) -> list[list[int]]:
+    """Tarjan's algorithm, iterative so that long chains don't hit the recursion limit."""
+    index_of = [-1] * node_count
+    low = [0] * node_count
+    on_stack = [False] * node_count
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+
+    for root in range(node_count):
+        if index_of[root] != -1:
+            continue
+        work = [(root, iter(successors[root]))]
+        index_of[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if index_of[child] == -1:
+                    index_of[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = True
+                    work.append((child, iter(successors[child])))
+                elif on_stack[child]:
+                    low[node] = min(low[node], index_of[child])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+def diagnose(table: dict, audio_mappings: Optional[list[dict]]) -> dict:
+    """Lists the unreachable nodes, the cycles and the vocal nodes without playable audio of a compiled table."""
+    strings = table["strings"]
+    node_count = len(table["node_text"])
+
+    def describe(node_id: int) -> dict:
+        return {
+            "id": table["node_source_ids"][node_id],
+            "text": strings[table["node_text"][node_id]],
+            "labels": [strings[label] for label in table["node_labels"][node_id]],
+        }
+
+    successors: list[set[int]] = [set() for _ in range(node_count)]
+    for offsets, targets in zip(table["edge_offsets"], table["edge_targets"]):
+        for node_id in range(node_count):
+            successors[node_id].update(targets[offsets[node_id] : offsets[node_id + 1]])
+
+    # Traversals look nodes up by text, so reaching a node reaches every node sharing its text as well
+    nodes_by_text: dict[str, list[int]] = defaultdict(list)
+    for node_id, text in enumerate(table["node_text"]):
+        nodes_by_text[normalize_node_text(strings[text])].append(node_id)
+
+    reached = [
+        node_id
+        for node_id in range(node_count)
+        if any(
+            strings[label] in ENTRY_LABELS for label in table["node_labels"][node_id]
+        )
+    ]
+    visited = set(reached)
+    while reached:
+        node_id = reached.pop()
+        for successor in successors[node_id]:
+            text = normalize_node_text(strings[table["node_text"][successor]])
+            for same_text in nodes_by_text[text]:
+                if same_text not in visited:
+                    visited.add(same_text)
+                    reached.append(same_text)
+
+    cycles = [
+        sorted(describe(node_id)["text"] for node_id in component)
+        for component in find_strongly_connected_components(node_count, successors)
+        if len(component) > 1 or component[0] in successors[component[0]]
+    ]
+
+    missing_audio = []
+    if audio_mappings is not None:
+        audio_files = {
+            node["properties"]["text"]: node.get("audio_files", [])
+            for node in audio_mappings
+        }
+        for node_id in range(node_count):
+            node = describe(node_id)
+            if not any(label in VOCAL_LABELS for label in node["labels"]):
+                continue
+            files = [entry["file"] for entry in audio_files.get(node["text"], [])]
+            if not files:
+                reason = "no audio mapping"
+            elif not all(files):
+                reason = "empty audio file entry"
+            elif missing := [
+                file
+                for file in files
+                if not os.path.isfile(os.path.join(ROBEAU_DIR_PATH, file))
+            ]:
+                reason = f"audio file(s) not found: {missing}"
+            else:
+                continue
+            missing_audio.append({**node, "reason": reason})
+
+    return {
+        "unreachable_nodes": [
+            describe(node_id) for node_id in range(node_count) if node_id not in visited
+        ],
+        "cycles": cycles,
+        "missing_audio": missing_audio,
+    }
+
+
+def write_transition_table(table: dict, file_path: str):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(table, f, separators=(",", ":"))
+
+
+class TransitionTableGraphBackend(GraphBackend):
+    """Serves lookups from a transition table compiled by scripts/graph_compiler.py.
+
+    Loading only turns the table arrays into typed arrays and the text index into a dict; connection dicts are
+    built the first time each node is looked up. When the table is missing, of an older format or compiled from
+    another version of the exported graph, it is recompiled from `source_file_path` in memory instead.
+    """
+
+    def __init__(self, table: dict, logger: Logger, file_path: Optional[str] = None):
+        self.logger = logger
+        self.file_path = file_path
+        self.source_file_path: Optional[str] = None
+        self.load_table(table)
+
+    def load_table(self, table: dict):
+        strings = table["strings"]
+        property_sets = table["property_sets"]
+
+        self.node_text: list[str] = [strings[index] for index in table["node_text"]]
+        self.node_labels: list[list[str]] = [
+            [strings[label] for label in labels] for labels in table["node_labels"]
+        ]
+        self.node_properties: list[dict] = [
+            property_sets[index] for index in table["node_properties"]
+        ]
+        self.text_index: dict[tuple[str, str], tuple[int, ...]] = {
+            (strings[label], strings[key]): tuple(ids)
+            for label, key, ids in table["text_index"]
+        }
+        self.edge_types: list[str] = [strings[index] for index in table["edge_types"]]
+        self.edge_offsets = [array("i", offsets) for offsets in table["edge_offsets"]]
+        self.edge_targets = [array("i", targets) for targets in table["edge_targets"]]
+        self.edge_params = [array("i", params) for params in table["edge_params"]]
+        self.property_sets: list[dict] = property_sets
+        self.grouped: dict[int, GroupedConnections] = {}
+        self.source: dict = table.get("source", {})
+
+    @classmethod
+    def from_file(
+        cls, file_path: str, source_file_path: str, logger: Logger
+    ) -> "TransitionTableGraphBackend":
+        start_time = time.time()
+        table = cls.read_table(file_path, source_file_path, logger)
+
+        backend = cls(table, logger, file_path)
+        backend.source_file_path = source_file_path
+        load_time = time.time() - start_time
+        print(
+            f"Loaded transition table of {len(backend.node_text)} nodes "
+            f"from {file_path} in {load_time * 1000:.1f} ms"
+        )
+        return backend
+
+    @staticmethod
+    def read_table(file_path: str, source_file_path: str, logger: Logger) -> dict:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                table = json.load(f)
+        except FileNotFoundError:
+            table = {}
+
+        source_hash = hash_file(source_file_path)
+        if table.get("format") != TRANSITION_TABLE_FORMAT:
+            logger.warning(f"No usable transition table at {file_path}, compiling it")
+        elif table.get("source", {}).get("sha256") != source_hash:
+            logger.warning(
+                f"Transition table is older than {source_file_path}, recompiling it"
+            )
+        else:
+            return table
+
+        with open(source_file_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return compile_transition_table(
+            data["nodes"], data["relationships"], source={"sha256": source_hash}
+        )
+
+    def reload(self):
+        if not self.file_path or not self.source_file_path:
+            return
+        table = self.read_table(self.file_path, self.source_file_path, self.logger)
+
+        # Build on the side so lookups running on other threads never see a half-loaded table
+        fresh = TransitionTableGraphBackend(table, self.logger)
+        vars(self).update(
+            {
+                key: value
+                for key, value in vars(fresh).items()
+                if key not in ("file_path", "source_file_path")
+            }
+        )
+        self.logger.info(f"Reloaded transition table from {self.file_path}")
+
+    def find_nodes(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> list[int]:
+        text_key = normalize_node_text(text)
+        node_ids: list[int] = []
+
+        for label in labels:
+            if label == "Whisper" and not listening_context:
+                self.logger.warning(f"Listening context is not set for Whisper: {text}")
+                continue
+
+            for node_id in self.text_index.get((label, text_key), ()):
+                if node_id in node_ids:
+                    continue
+                if (
+                    label == "Whisper"
+                    and self.node_properties[node_id].get("context")
+                    != listening_context
+                ):
+                    continue
+                node_ids.append(node_id)
+
+        return node_ids
+
+    def get_grouped_connections(self, node_id: int) -> GroupedConnections:
+        grouped = self.grouped.get(node_id)
+        if grouped is not None:
+            return grouped
+
+        start_properties = {"text": self.node_text[node_id]}
+        start_properties.update(self.node_properties[node_id])
+        connections = []
+
+        for type_index, relationship_type in enumerate(self.edge_types):
+            offsets = self.edge_offsets[type_index]
+            for position in range(offsets[node_id], offsets[node_id + 1]):
+                end = self.edge_targets[type_index][position]
+                end_properties = {"text": self.node_text[end]}
+                end_properties.update(self.node_properties[end])
+                connections.append(
+                    build_connection(
+                        start_properties,
+                        self.node_labels[node_id],
+                        relationship_type,
+                        self.property_sets[self.edge_params[type_index][position]],
+                        end_properties,
+                        self.node_labels[end],
+                    )
+                )
+
+        grouped = self.grouped[node_id] = GroupedConnections(connections)
+        return grouped
+
+    def get_connections(
+        self, text: str, labels: list[str], listening_context: Optional[str]
+    ) -> GroupedConnections | None:
+        node_ids = self.find_nodes(text, labels, listening_context)
+
+        if len(node_ids) == 1:
+            connections = self.get_grouped_connections(node_ids[0])
+        else:
+            connections = GroupedConnections(
+                connection
+                for node_id in node_ids
+                for connection in self.get_grouped_connections(node_id)
+            )
+
+        return connections if connections else None
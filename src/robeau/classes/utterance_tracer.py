@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from logging import Logger
+from typing import Callable, Optional
+
+from src.robeau.core.traversal_executor import Traversal
+
+
+def current_owner() -> tuple[int, Optional[asyncio.Task]]:
+    """Thread and asyncio task (if any) running the caller, which a trace belongs to"""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:  # No running event loop
+        task = None
+    return threading.get_ident(), task
+
+
+class UtteranceTrace:
+    """Spans recorded while one utterance is processed"""
+
+    def __init__(
+        self,
+        utterance: str,
+        number: int,
+        owner: tuple[int, Optional[asyncio.Task]],
+        start: float,
+    ):
+        self.utterance = utterance
+        self.number = number
+        self.owner = owner
+        self.start = start
+        self.events: list[dict] = []
+        self.stack: list[list] = []
+
+
+class UtteranceTracer:
+    """Records timed spans while utterances are processed and exports each as a Chrome trace, which speedscope
+    and chrome://tracing both open as a flame graph.
+
+    A trace belongs to the thread and asyncio task that began it, and spans are recorded in the trace of the thread
+    and task opening them, so that timer expirations, other conversations or concurrent tasks processing their own
+    utterance meanwhile each get their own trace. An utterance begun while its thread and task are already tracing
+    one is processed as part of it. Spans nest; the self time of each span (its duration minus the duration of the
+    spans inside it) is kept per phase to report p50/p95 across utterances.
+    """
+
+    def __init__(
+        self,
+        logger: Logger,
+        output_dir: str,
+        clock: Callable[[], float] = time.perf_counter,
+        history: int = 1000,
+    ):
+        self.logger = logger
+        self.output_dir = output_dir
+        self.clock = clock
+
+        self.utterance_count = 0
+        self.active: dict[tuple[int, Optional[asyncio.Task]], UtteranceTrace] = {}
+
+        self.lock = threading.Lock()
+        self.phase_self_times: dict[str, deque[float]] = defaultdict(
+            lambda: deque(maxlen=history)
+        )
+
+    def begin_utterance(self, utterance: str) -> Optional[UtteranceTrace]:
+        """Starts the trace of an utterance, or returns None if the caller is already tracing one."""
+        owner = current_owner()
+        with self.lock:
+            current = self.active.get(owner)
+            if current:
+                self.logger.info(
+                    "Traced <%s> as part of <%s>", utterance, current.utterance
+                )
+                return None
+            self.utterance_count += 1
+            trace = UtteranceTrace(utterance, self.utterance_count, owner, self.clock())
+            self.active[owner] = trace
+        return trace
+
+    def end_utterance(self, trace: UtteranceTrace) -> str:
+        """Writes the trace begun by begin_utterance, returns its path."""
+        with self.lock:
+            if self.active.get(trace.owner) is trace:
+                del self.active[trace.owner]
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        slug = re.sub(r"[^a-z0-9]+", "_", trace.utterance.lower()).strip("_")
+        file_path = os.path.join(
+            self.output_dir, f"utterance_{trace.number:04d}_{slug[:40]}.json"
+        )
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "traceEvents": trace.events,
+                    "displayTimeUnit": "ms",
+                    "otherData": {"utterance": trace.utterance},
+                },
+                f,
+            )
+
+        self.logger.info("Trace of <%s> written to %s", trace.utterance, file_path)
+        self.logger.info("Traced phases so far: %s", self.summary())
+        return file_path
+
+    @contextmanager
+    def span(self, name: str, **args):
+        trace = self.active.get(current_owner())
+        if trace is None:
+            yield
+            return
+
+        frame = [name, self.clock(), 0.0]
+        trace.stack.append(frame)
+        try:
+            yield
+        finally:
+            self._close_span(trace, frame, args)
+
+    def _close_span(self, trace: UtteranceTrace, frame: list, args: dict):
+        name, start, child_time = frame
+        duration = self.clock() - start
+        # Spans close in the order they were opened, unless a traversal was dropped halfway and its span closed
+        # later, so the frame is looked up rather than popped
+        stack = trace.stack
+        index = next(i for i in range(len(stack) - 1, -1, -1) if stack[i] is frame)
+        del stack[index]
+        if index > 0:
+            stack[index - 1][2] += duration
+
+        trace.events.append(
+            {
+                "name": name,
+                "cat": "robeau",
+                "ph": "X",
+                "ts": (start - trace.start) * 1e6,
+                "dur": duration * 1e6,
+                "pid": os.getpid(),
+                "tid": trace.owner[0],
+                "args": args,
+            }
+        )
+        with self.lock:
+            self.phase_self_times[name].append(duration - child_time)
+
+    def trace(self, name: str, traversal: Traversal, **args) -> Traversal:
+        """Wraps a traversal step, the nodes it yields are processed inside its span."""
+        with self.span(name, **args):
+            return (yield from traversal)
+
+    def summary(self) -> dict[str, dict]:
+        with self.lock:
+            phases = {
+                name: sorted(times) for name, times in self.phase_self_times.items()
+            }
+
+        def percentile(times: list[float], fraction: float) -> float:
+            return times[min(len(times) - 1, int(fraction * len(times)))]
+
+        return {
+            name: {
+                "count": len(times),
+                "p50_ms": round(percentile(times, 0.5) * 1000, 3),
+                "p95_ms": round(percentile(times, 0.95) * 1000, 3),
+                "max_ms": round(times[-1] * 1000, 3),
+            }
+            for name, times in phases.items()
+            if times
+        }
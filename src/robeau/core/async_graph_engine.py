@@ -0,0 +1,229 @@
+import asyncio
+import threading
+from typing import Literal, Optional
+
+from src.robeau.classes.graph_backends import GraphBackend
+from src.robeau.core.graph_logic_network import (
+    AudioWait,
+    ConversationState,
+    attach_snapshotter,
+    create_graph_session,
+    handle_transmission_output,
+    logger,
+    start_node_visit,
+)
+from src.robeau.core.graph_logic_network_constants import (
+    ADMIN,
+    GREETING,
+    MAX_TRAVERSAL_DEPTH,
+    MAX_TRAVERSAL_STEPS,
+    USER,
+    QuerySource,
+    transmission_output_nodes,
+)
+from src.robeau.core.traversal_executor import (
+    AsyncTraversalExecutor,
+    NodeVisit,
+    TraversalStats,
+)
+
+
+class AsyncGraphEngine:
+    """Runs the graph logic network on the asyncio loop of its caller instead of a thread per query.
+
+    Each utterance is processed by its own task, which can be awaited or cancelled. Graph lookups await the
+    backend (see establish_connection for which), audio waits await asyncio events fed by the audio player
+    callbacks, and the conversation state timers run as a task of the same loop, so that nodes reached by timers are
+    processed on it as well.
+    """
+
+    def __init__(self, session: GraphBackend, conversation_state: ConversationState):
+        self.session = session
+        self.conversation_state = conversation_state
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.current_task: Optional[asyncio.Task] = None
+        self.background_tasks: set[asyncio.Task] = set()
+        self.timers_task: Optional[asyncio.Task] = None
+
+        self.audio_first_callback = asyncio.Event()
+        self.audio_started = asyncio.Event()
+        self.audio_finished = asyncio.Event()
+
+    async def start(self, pause_event: threading.Event):
+        self.loop = asyncio.get_running_loop()
+        self.conversation_state.lane.callback_listeners.append(self._on_audio_callback)
+
+        self.conversation_state.timer_session = self.session
+        self.conversation_state.node_processor = self.spawn_node_processing
+        self.timers_task = asyncio.create_task(
+            self.conversation_state.scheduler.run_async(pause_event)
+        )
+
+    def _on_audio_callback(self, event: str):
+        # Called from the audio threads
+        if self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._set_audio_events, event)
+
+    def _set_audio_events(self, event: str):
+        if event == "start":
+            self.audio_started.set()
+            self.audio_first_callback.set()
+        elif event in ("stop", "end"):
+            self.audio_finished.set()
+        elif event == "error":
+            self.audio_first_callback.set()
+            self.audio_finished.set()
+
+    async def wait_for_audio(self, effect: AudioWait):
+        logger.info("Waiting for initial callback from audio_player")
+        await self.audio_first_callback.wait()
+        self.audio_first_callback.clear()
+        effect.lane.audio_player_first_callback.clear()
+
+        if self.audio_started.is_set():
+            await self.audio_finished.wait()
+            self.audio_started.clear()
+            self.audio_finished.clear()
+            effect.lane.reset_events()
+            logger.info(
+                "Finished waiting for audio to play for nodes: %s",
+                effect.response_nodes_reached,
+            )
+        else:
+            logger.info(
+                "No audio to play for nodes: %s continuing processing",
+                effect.response_nodes_reached,
+            )
+
+        effect.lane.processing_nodes_audio.clear()
+
+    async def process_node(
+        self,
+        session: GraphBackend,
+        node: str,
+        conversation_state: ConversationState,
+        source: QuerySource,
+        silent: Optional[bool] = False,
+        cutoff: Optional[bool] = False,
+        main_call: Optional[bool] = False,
+        initiated: Optional[bool] = False,
+        input_node: Optional[bool] = False,
+    ) -> TraversalStats:
+        executor = AsyncTraversalExecutor(
+            start_visit=start_node_visit,
+            logger=logger,
+            max_steps=MAX_TRAVERSAL_STEPS,
+            max_depth=MAX_TRAVERSAL_DEPTH,
+            async_handlers={AudioWait: self.wait_for_audio},
+        )
+
+        tracer = conversation_state.tracer
+        utterance_trace = tracer.begin_utterance(node) if tracer and main_call else None
+
+        try:
+            return await executor.run_async(
+                NodeVisit(
+                    node,
+                    source,
+                    session=session,
+                    conversation_state=conversation_state,
+                    silent=silent,
+                    cutoff=cutoff,
+                    main_call=main_call,
+                    initiated=initiated,
+                    input_node=input_node,
+                )
+            )
+        finally:
+            if tracer and utterance_trace:
+                tracer.end_utterance(utterance_trace)
+
+    def spawn_node_processing(self, *args, **kwargs) -> asyncio.Task:
+        """Same signature as process_node, used by the conversation state timers."""
+        task = asyncio.create_task(self.process_node(*args, **kwargs))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    def is_processing(self) -> bool:
+        return self.current_task is not None and not self.current_task.done()
+
+    def launch_query(
+        self,
+        user_query: str,
+        query_type: Literal["regular", "greeting", "forced"],
+        silent: bool,
+    ) -> asyncio.Task:
+        self.session.begin_utterance()
+
+        sources = {"regular": USER, "greeting": GREETING, "forced": ADMIN}
+
+        if query_type == "forced":
+            # Used for testing to trigger any node without any restrictions
+            upper_node = user_query.upper()
+            if upper_node in transmission_output_nodes:
+                logger.info(
+                    "treating node %s from forced query as a transmission output",
+                    upper_node,
+                )
+                handle_transmission_output(upper_node, self.conversation_state)
+
+        self.current_task = asyncio.create_task(
+            self.process_node(
+                self.session,
+                user_query,
+                self.conversation_state,
+                sources[query_type],
+                silent=silent,
+                main_call=True,
+            )
+        )
+        return self.current_task
+
+    async def interrupt(self):
+        """Stops the audio and waits for the current utterance to be done processing the cutoff."""
+        self.conversation_state.lane.audio_player.stop_audio()
+        if self.current_task:
+            await asyncio.gather(self.current_task, return_exceptions=True)
+
+    async def cancel(self):
+        tasks = [*self.background_tasks]
+        if self.current_task:
+            tasks.append(self.current_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def close(self):
+        await self.cancel()
+        if self.conversation_state.snapshotter:
+            self.conversation_state.snapshotter.save()
+        self.conversation_state.stop_timers()
+        if self.timers_task:
+            await asyncio.gather(self.timers_task, return_exceptions=True)
+        listeners = self.conversation_state.lane.callback_listeners
+        if self._on_audio_callback in listeners:
+            listeners.remove(self._on_audio_callback)
+        await self.session.close_async()
+
+
+async def open_graph_session_async(
+    backend_type: Literal["neo4j", "json", "compiled"] | None = None
+) -> GraphBackend:
+    session = create_graph_session(backend_type, asynchronous=True)
+    await session.warmup_async()
+    return session
+
+
+async def initialize_async(
+    pause_event: threading.Event,
+    backend_type: Literal["neo4j", "json", "compiled"] | None = None,
+) -> AsyncGraphEngine:
+    session = await open_graph_session_async(backend_type)
+    conversation_state = ConversationState(logger_instance=logger)
+    attach_snapshotter(conversation_state)
+
+    engine = AsyncGraphEngine(session, conversation_state)
+    await engine.start(pause_event)
+    return engine
@@ -1,19 +1,49 @@
+import logging
 import random
 import threading
 import time
 from collections import defaultdict
+from contextlib import nullcontext
 from logging import Logger
 from threading import Thread
-from typing import Literal, Optional
+from typing import Callable, Literal, Optional
 
 import keyboard
-from neo4j import GraphDatabase, Result, Session
 from prompt_toolkit import PromptSession
 from prompt_toolkit.patch_stdout import patch_stdout
 
-from src.config.settings import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
-from src.robeau.classes.audio_player import AudioPlayer
+from src.config.settings import (
+    NEO4J_PASSWORD,
+    NEO4J_URI,
+    NEO4J_USER,
+    ROBEAU_AUDIO_BACKEND,
+    ROBEAU_CONNECTION_CACHE_SIZE,
+    ROBEAU_GRAPH_BACKEND,
+    ROBEAU_LOG_PRESET,
+    ROBEAU_PREFETCH_DEPTH,
+    ROBEAU_SNAPSHOT_INTERVAL,
+    ROBEAU_SNAPSHOT_MAX_AGE,
+    ROBEAU_TRACE,
+)
+from src.robeau.classes.alias_table import RandomPool
+from src.robeau.classes.audio_lane import AudioLane
+from src.robeau.classes.audio_player import AudioPlayer, NullAudioPlayer
+from src.robeau.classes.connection_cache import CachedGraphBackend
+from src.robeau.classes.conversation_context import ContextItem, ConversationContext
+from src.robeau.classes.conversation_snapshot import ConversationSnapshotter
+from src.robeau.classes.deadline_scheduler import DeadlineScheduler
+from src.robeau.classes.graph_backends import (
+    AsyncNeo4jGraphBackend,
+    GraphBackend,
+    GroupedConnections,
+    InMemoryGraphBackend,
+    Neo4jGraphBackend,
+    PrefetchingGraphBackend,
+)
+from src.robeau.classes.transition_table import TransitionTableGraphBackend
+from src.robeau.classes.utterance_tracer import UtteranceTracer
 from src.robeau.core.graph_logic_network_constants import (
+    ACTIVATION_PRIORITY_ORDER,
     ADMIN,
     ANY_MATCHING_PLEA,
     ANY_MATCHING_PROMPT,
@@ -24,6 +54,8 @@ from src.robeau.core.graph_logic_network_constants import (
     EXPECTATIONS_SET,
     EXPECTATIONS_SUCCESS,
     GREETING,
+    MAX_TRAVERSAL_DEPTH,
+    MAX_TRAVERSAL_STEPS,
     NO_MATCHING_PROMPT,
     PROLONG_STUBBORN,
     RESET_EXPECTATIONS,
@@ -38,13 +70,25 @@ from src.robeau.core.graph_logic_network_constants import (
     transmission_output_nodes,
 )
 from src.robeau.core.robeau_constants import (
+    NEO4J_ALL_DATA_JSON_FILE_PATH,
+    NEO4J_GRAPH_VERSION_FILE_PATH,
     ROBEAU_RESPONSES_JSON_FILE_PATH as ROBEAU_RESPONSES,
+    ROBEAU_SNAPSHOT_FILE_PATH,
+    ROBEAU_TRACES_DIR_PATH,
+    ROBEAU_TRANSITION_TABLE_FILE_PATH,
+)
+from src.robeau.core.traversal_executor import (
+    Effect,
+    NodeVisit,
+    Traversal,
+    TraversalExecutor,
+    TraversalStats,
 )
 from src.utils.helpers import construct_script_name
-from src.utils.logging_utils import log_empty_lines, setup_logger
+from src.utils.logging_utils import log_empty_lines, setup_preset_logger
 
 SCRIPT_NAME = construct_script_name(__file__)
-logger = setup_logger(SCRIPT_NAME, "DEBUG")
+logger = setup_preset_logger(SCRIPT_NAME, ROBEAU_LOG_PRESET)  # type: ignore
 
 
 class TypingDetector:
@@ -70,9 +114,29 @@ class TypingDetector:
 
 
 class ConversationState:
-    def __init__(self, logger_instance: Logger):
+    def __init__(
+        self,
+        logger_instance: Logger,
+        clock: Callable[[], float] = time.monotonic,
+        lane: Optional[AudioLane] = None,
+        seed: Optional[int] = None,
+        tracer: Optional[UtteranceTracer] = None,
+    ):
         self.logger = logger_instance
         self.lock = threading.Lock()
+        self.clock = clock
+        self.scheduler = DeadlineScheduler(logger_instance, clock=clock)
+        self.timer_session: GraphBackend | None = None
+        # Processes nodes reached by timers, the asyncio engine swaps in one scheduling a task on its loop
+        self.node_processor: Callable[..., object] = process_node
+        # Audio player, audio events and node thread of this conversation
+        self.lane = lane or default_lane
+        # Every random choice of the conversation, seeded to make replays deterministic
+        self.rng = random.Random(seed)
+        # Traces the utterances of the conversation when ROBEAU_TRACE is set
+        self.tracer = tracer or default_tracer
+        # Called with every node visit of the conversation, e.g. to record the path it took
+        self.node_visit_listeners: list[Callable[[NodeVisit], None]] = []
 
         # interrupted state
         self.cutoff = False
@@ -95,20 +159,25 @@ class ConversationState:
         self.attitude_levels = {"rudeness": 0}
 
         # Context relationships
-        self.context: dict[str, list[dict]] = {
-            "allows": [],
-            "expects": [],
-            "initiates": [],
-            "listens": [],
-            "locks": [],
-            "permits": [],
-            "primes": [],
-            "unlocks": [],
-            "unprimes": [],
-        }
+        self.context = ConversationContext(
+            [
+                "allows",
+                "expects",
+                "initiates",
+                "listens",
+                "locks",
+                "permits",
+                "primes",
+                "unlocks",
+                "unprimes",
+            ]
+        )
 
         self.listening_context = None
 
+        # Saves and restores the state across restarts, see attach_snapshotter
+        self.snapshotter: Optional[ConversationSnapshotter] = None
+
     def _add_item(
         self,
         node: str,
@@ -117,41 +186,35 @@ class ConversationState:
         duration: float | None,
         item_type: str,
     ):
-        start_time = time.time()
+        start_time = self.clock()
         item_list = self.context[item_type]
 
-        for existing_item in item_list:
-            if existing_item["node"] == node:
-                if duration is None:  # None means infinite duration here
-                    return
-
-                # Reset duration if the item already exists
-                existing_item["duration"] = duration
-                existing_item["time_left"] = duration
-                existing_item["start_time"] = start_time
-                self.logger.info(f"Reset the time duration of {existing_item}")
+        existing_item = item_list.get(node)
+        if existing_item:
+            if duration is None:  # None means infinite duration here
                 return
 
+            # Reset duration if the item already exists
+            existing_item.duration = duration
+            existing_item.time_left = duration
+            existing_item.start_time = start_time
+            self._schedule_item_expiry(existing_item)
+            self.logger.info("Reset the time duration of %s", existing_item)
+            return
+
         if item_type == "listens":
             listening_context = node_data.get("context", None)
             if listening_context:
                 self.listening_context = listening_context
-                logger.info(f"Set listening context to {self.listening_context}")
+                logger.info("Set listening context to %s", self.listening_context)
             else:
-                self.logger.error(f"No listening context found for whisper <{node}>")
-
-        item = {
-            "type": item_type,
-            "node": node,
-            "labels": labels,
-            "data": node_data,
-            "time_left": duration,
-            "duration": duration,
-            "start_time": start_time,
-        }
+                self.logger.error("No listening context found for whisper <%s>", node)
+
+        item = ContextItem(item_type, node, labels, node_data, duration, start_time)
 
-        item_list.append(item)
-        self.logger.info(f"Added {item_type} <{node}>: {item}")
+        item_list.add(item)
+        self._schedule_item_expiry(item)
+        self.logger.info("Added %s <%s>: %s", item_type, node, item)
 
     def add_item(
         self,
@@ -176,17 +239,15 @@ class ConversationState:
         processed node won't be processed again if they are pointed to with a DELAY relationship
         """
         for item_type, node_list in self.context.items():
-            for item in node_list:
-                if item["node"] == node:
-                    self._add_item(node, labels, data, duration, item_type)
+            if node_list.contains(node):
+                self._add_item(node, labels, data, duration, item_type)
 
     def disable_item(self, node: str):
         for node_list in self.context.values():
-            for item in node_list:
-                if item["node"] == node:
-                    node_list.remove(item)
-                    self.logger.info(f"Item disabled: {item}")
-                    return
+            item = node_list.remove(node)
+            if item:
+                self.logger.info("Item disabled: %s", item)
+                return
 
     def set_state(
         self, state_name: Literal["stubborn", "unresponsive"], duration: float
@@ -195,159 +256,121 @@ class ConversationState:
         if state_obj:
             state_obj["state"] = True
             state_obj["duration"] = duration
-            state_obj["start_time"] = time.time()
+            state_obj["start_time"] = self.clock()
             state_obj["time_left"] = duration
-            self.logger.info(f"Set state {state_name} for {duration} seconds")
+            self._schedule_state_expiry(state_name)
+            self.logger.info("Set state %s for %s seconds", state_name, duration)
         else:
-            logger.error(f"Invalid state name {state_name}")
-
-    @staticmethod
-    def _update_time_left(item: dict):
-        current_time = time.time()
-        start_time = item["start_time"]
-        duration = item["duration"]
-        time_left = item["time_left"]
-
-        if time_left is not None:
-            elapsed_time = current_time - start_time
-            remaining_time = max(0, duration - elapsed_time)
-            item["time_left"] = remaining_time
-
-    def _filter_expired_items(self, items: list[dict]) -> tuple[list[dict], list[dict]]:
-        valid_items = []
-        expired_items = []
-
-        for item in items:
-            self._update_time_left(item)
-            time_left = item.get("time_left")
-
-            if time_left is None or time_left > 0:
-                valid_items.append(item)
-            else:
-                expired_items.append(item)
+            logger.error("Invalid state name %s", state_name)
+
+    def get_time_left(self, item: dict | ContextItem) -> float | None:
+        """Refreshes and returns the time left of a context item or a time-bound state."""
+        if item["time_left"] is not None:
+            elapsed_time = self.clock() - item["start_time"]
+            item["time_left"] = max(0, item["duration"] - elapsed_time)
+        return item["time_left"]
+
+    def _schedule_state_expiry(self, state_name: Literal["stubborn", "unresponsive"]):
+        state_obj = getattr(self, state_name)
+        self.scheduler.schedule(
+            ("state", state_name),
+            state_obj["start_time"] + state_obj["duration"],
+            lambda: self._expire_state(state_name),
+        )
 
-        return valid_items, expired_items
+    def _schedule_item_expiry(self, item: ContextItem):
+        if item.duration is None:
+            return
+        self.scheduler.schedule(
+            ("item", item.type, item.node),
+            item.start_time + item.duration,
+            lambda: self._expire_item(item),
+        )
 
-    def _handle_initiations(self, expired_items: list[dict], session: Session):
-        complete_initiations = [
-            item for item in expired_items if item["type"] == "initiates"
-        ]
+    def _expire_item(self, item: ContextItem):
+        if self.context[item.type].get(item.node) is not item:
+            return  # Removed since it was scheduled
+        if self.get_time_left(item):
+            return  # Its duration was reset, a new deadline is already scheduled
 
-        for initiation in complete_initiations:
-            activate_connection_or_item(initiation, self, "item")
-            process_node(
-                session, initiation["node"], self, source=ROBEAU, main_call=True
+        if item.type == "initiates":
+            activate_connection_or_item(item, self, "item")
+            self.node_processor(
+                self.timer_session, item.node, self, source=ROBEAU, main_call=True
             )
 
-    def _remove_expired(
-        self, items: list[dict], log_messages: list[str], session: Session, key: str
-    ) -> list[dict]:
-        valid_items, expired_items = self._filter_expired_items(items)
-        self._handle_initiations(expired_items, session)
-
-        for item in valid_items:
-            item_type = item.get("type")
-            node = item.get("node")
-            labels = item.get("labels", [])
-            time_left = item.get("time_left")
-
-            if time_left is not None:
-                log_messages.append(
-                    f"{item_type}: {labels}: <{node}> ({time_left:.2f}): {item}"
-                )
-
-        items_after_initiations = self.context[key]
-        valid_items = [
-            item for item in items_after_initiations if item not in expired_items
-        ]
+        self.context[item.type].discard_item(item)
+        self.logger.info(
+            "Time-bound update: %s <%s> expired (expiry latency stats: %s)",
+            item.type,
+            item.node,
+            self.scheduler.latency_stats(),
+        )
 
-        return valid_items
+    def _expire_state(self, state_name: Literal["stubborn", "unresponsive"]):
+        state_obj = getattr(self, state_name)
+        if not state_obj["state"] or self.get_time_left(state_obj):
+            return
 
-    def _update_timed_items(
-        self,
-        session: Session,
-        log_messages: list[str],
-    ):
-        for key in self.context:
-            updated_items = self._remove_expired(
-                self.context[key], log_messages, session, key
+        state_obj["state"] = False
+        logger.info(
+            "Robeau is no longer in state %s (expiry latency stats: %s)",
+            state_name,
+            self.scheduler.latency_stats(),
+        )
+        if state_name == "stubborn":
+            self.node_processor(
+                self.timer_session,
+                ROBEAU_NO_MORE_STUBBORN,
+                self,
+                SYSTEM,
+                input_node=True,
             )
-            self.context[key] = updated_items
-
-    def _update_timed_states(self, session: Session, log_messages: list[str]):
-        states_to_update = ["stubborn", "unresponsive"]
 
-        for state in states_to_update:
-            state_obj = getattr(self, state)
-            self._update_time_left(state_obj)
-            time_left = state_obj.get("time_left")
-            enabled_state = state_obj["state"]
+    def run_timers(self, session: GraphBackend, pause_event: threading.Event):
+        """Blocks, running expirations of timed items and states until stop_timers() is called."""
+        self.timer_session = session
+        self.scheduler.run(pause_event)
 
-            if not enabled_state:
-                continue
-
-            if time_left > 0:
-                log_messages.append(f"State {state}: ({time_left:.2f}): {state_obj}")
-            else:
-                state_obj["state"] = False
-                logger.info(f"Robeau is no longer in state {state} ")
-                if state == "stubborn":
-                    handle_transmission_input(session, ROBEAU_NO_MORE_STUBBORN, self)
-
-            setattr(self, state, state_obj)
-
-    def _update_attitude_levels(self, log_messages: list[str]):
-        for attitude, level in self.attitude_levels.items():
-            if level > 0 and random.randint(0, 9) == 0:
-                level -= 1
-                log_messages.append(f"{attitude}: level decreased to {level}")
-
-    def update_conversation_state(self, session: Session):
-        log_messages: list[str] = []
-
-        self._update_timed_items(session, log_messages)
-        self._update_timed_states(session, log_messages)
-        self._update_attitude_levels(log_messages)
-
-        if log_messages:
-            self.logger.info("Time-bound updates:\n" + "\n".join(log_messages))
-        else:
-            self.logger.info("No time-bound items or states to update")
+    def stop_timers(self):
+        self.scheduler.stop()
+        self.logger.info(
+            "Timers stopped, expiry latency stats: %s", self.scheduler.latency_stats()
+        )
 
     def reset_attribute(self, *attributes: str):
         reset_attributes = []
 
         for attribute in attributes:
             if attribute in self.context:
-                self.context[attribute] = []
+                self.context[attribute].clear()
                 reset_attributes.append(attribute)
             else:
-                self.logger.error(f"Invalid attribute: {attribute}")
+                self.logger.error("Invalid attribute: %s", attribute)
 
         if reset_attributes:
-            self.logger.info(f"Reset attributes: {', '.join(reset_attributes)}")
+            self.logger.info("Reset attributes: %s", ", ".join(reset_attributes))
 
-    def apply_definitions(self, session: Session, node: str):
-        process_node(
+    def apply_definitions(self, session: GraphBackend, node: str) -> Traversal[None]:
+        yield NodeVisit(
+            node,
+            ADMIN,
             session=session,
-            node=node,
-            source=ADMIN,
             conversation_state=self,
             silent=True,
         )
 
-    def revert_definitions(self, session: Session, node: str):
+    def revert_definitions(self, session: GraphBackend, node: str) -> Traversal[None]:
         definitions_to_revert = (
-            get_node_connections(
+            yield from get_node_connections(
                 session, text=node, source=ADMIN, conversation_state=self
             )
-            or []
-        )
+        ) or []
         formatted_definitions = [
             (i["start_node"], i["relationship"], i["end_node"])
             for i in definitions_to_revert
         ]
-        self.logger.info(f"Obtained definitions to revert: {formatted_definitions}")
+        self.logger.info("Obtained definitions to revert: %s", formatted_definitions)
 
         for connection in definitions_to_revert:
             relationship = connection.get("relationship", "").lower()
@@ -355,19 +378,66 @@ class ConversationState:
             self._revert_individual_definition(relationship, node)
 
     def _revert_individual_definition(self, relationship: str, node: str):
-        for definition_type, definitions_list in self.context.items():
-            initial_count = len(definitions_list)
-            definitions_list[:] = [
-                definition
-                for definition in definitions_list
-                if not (
-                    definition["type"] == relationship and definition["node"] == node
-                )
-            ]
-            if len(definitions_list) < initial_count:
-                self.logger.info(f"Removed {definition_type}: <{node}>")
+        if relationship in self.context and self.context[relationship].remove(node):
+            self.logger.info("Removed %s: <%s>", relationship, node)
+
+    def snapshot(self) -> tuple:
+        """Plain values describing the state, with the time left of each timed item instead of clock readings."""
+        items = tuple(
+            (
+                item.type,
+                item.node,
+                item.labels,
+                item.data,
+                item.duration,
+                self.get_time_left(item),
+            )
+            for item_list in self.context.values()
+            for item in item_list
+        )
+        states = tuple(
+            (name, state["state"], state["duration"], self.get_time_left(state))
+            for name, state in (
+                ("stubborn", self.stubborn),
+                ("unresponsive", self.unresponsive),
+            )
+        )
+        return items, states, dict(self.attitude_levels), self.listening_context
+
+    def restore(self, snapshot: tuple, elapsed: float = 0.0):
+        """Loads a snapshot taken `elapsed` seconds ago, timed items and states resume with what they had left."""
+        items, states, attitude_levels, listening_context = snapshot
+        now = self.clock()
+
+        for item_type, node, labels, data, duration, time_left in items:
+            if item_type not in self.context:
+                continue
+            item = ContextItem(item_type, node, labels, data, duration, now)
+            if duration is not None:
+                item.time_left = max(0.0, time_left - elapsed)
+                item.start_time = now - (duration - item.time_left)
+            self.context[item_type].add(item)
+            self._schedule_item_expiry(item)
+
+        for state_name, active, duration, time_left in states:
+            if not active:
+                continue
+            state_obj = getattr(self, state_name)
+            state_obj["state"] = True
+            state_obj["duration"] = duration
+            state_obj["time_left"] = max(0.0, time_left - elapsed)
+            state_obj["start_time"] = now - (duration - state_obj["time_left"])
+            self._schedule_state_expiry(state_name)
+
+        self.attitude_levels.update(attitude_levels)
+
+        self.listening_context = listening_context
+        self.log_conversation_state()
 
     def log_conversation_state(self):
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+
         log_message = []
 
         states = {"stubborn": self.stubborn, "unresponsive": self.unresponsive}
@@ -384,8 +454,8 @@ class ConversationState:
         context_messages = []
         for item_type, items in self.context.items():
             for item in items:
-                node = item["node"]
-                context_messages.append(f"Context {item_type}: <{node}>: {item}")
+                self.get_time_left(item)
+                context_messages.append(f"Context {item_type}: <{item.node}>: {item}")
 
         state_messages = []
         for state_name, state in states.items():
@@ -407,15 +477,46 @@ class ConversationState:
         self.logger.info("\n".join(log_message))
 
 
-audio_player = AudioPlayer(ROBEAU_RESPONSES, logger=logger)
+class ConnectionSummary:
+    """Start node, relationship and end node of a connection for log messages, only formatted if the record is
+    emitted."""
+
+    __slots__ = ("connection",)
+
+    def __init__(self, connection: dict):
+        self.connection = connection
+
+    def __str__(self):
+        return str(list(self.connection.values())[0:3])
+
+
+def create_audio_player(
+    audio_backend: Literal["pygame", "null"] = ROBEAU_AUDIO_BACKEND,  # type: ignore
+) -> AudioPlayer:
+    return (NullAudioPlayer if audio_backend == "null" else AudioPlayer)(
+        ROBEAU_RESPONSES, logger=logger
+    )
+
+
+# Lane of the conversation states created without one, i.e. of the single conversation Robeau normally holds
+default_lane = AudioLane(create_audio_player(), logger)
+
+# Tracer of the conversation states created without one
+default_tracer = (
+    UtteranceTracer(logger, ROBEAU_TRACES_DIR_PATH) if ROBEAU_TRACE else None
+)
+
 
-processing_nodes_audio = threading.Event()
-audio_player_first_callback = threading.Event()
-audio_started_event = threading.Event()
-robeau_is_talking = threading.Event()
-audio_finished_event = threading.Event()
+def traced(
+    conversation_state: ConversationState, name: str, traversal: Traversal, **args
+) -> Traversal:
+    tracer = conversation_state.tracer
+    return tracer.trace(name, traversal, **args) if tracer else traversal
 
-node_thread: Thread | None = None
+
+def trace_span(conversation_state: ConversationState, name: str, **args):
+    tracer = conversation_state.tracer
+    return tracer.span(name, **args) if tracer else nullcontext()
 
 
 def handle_transmission_output(
@@ -425,95 +526,51 @@ def handle_transmission_output(
         conversation_state.reset_attribute("expects")
 
     elif transmission_node == SET_ROBEAU_UNRESPONSIVE:
-        conversation_state.set_state("unresponsive", random.randint(5, 10))
+        conversation_state.set_state(
+            "unresponsive", conversation_state.rng.randint(5, 10)
+        )
 
     elif transmission_node == SET_ROBEAU_STUBBORN:
-        conversation_state.set_state("stubborn", random.randint(15, 20))
+        conversation_state.set_state("stubborn", conversation_state.rng.randint(15, 20))
 
     elif transmission_node == PROLONG_STUBBORN:
         stubborn = conversation_state.stubborn
-        if stubborn["state"] and stubborn["time_left"] < 10:
-            conversation_state.set_state("stubborn", random.randint(10, 15))
+        if stubborn["state"] and conversation_state.get_time_left(stubborn) < 10:
+            conversation_state.set_state(
+                "stubborn", conversation_state.rng.randint(10, 15)
+            )
         else:
             logger.info(
-                f"Did not prolong stubborn (time_left {stubborn["time_left"]:.2f} was long enough)"
+                "Did not prolong stubborn (time_left %.2f was long enough)",
+                stubborn["time_left"],
             )
     elif transmission_node == STOP_LISTENING_FOR_WHISPERS:
-        conversation_state.context["listens"] = []
+        conversation_state.context["listens"].clear()
         logger.info("Cleared the listened to whispers list")  # Keep the context set.
 
 
-def reset_audio_events():
-    audio_finished_event.clear()
-    audio_started_event.clear()
-    audio_player_first_callback.clear()
-    robeau_is_talking.clear()
-
-
-def interrupt_robeau():
-    audio_player.stop_audio()
-    if node_thread:
-        node_thread.join()
-
-
-def wait_for_audio_management(response_nodes_reached: list[str]):
-    logger.info("Waiting for initial callback from audio_player")
-    audio_player_first_callback.wait()
-    audio_player_first_callback.clear()
-    logger.info("Callback received from audio_player, proceeding")
-
-    if audio_started_event.is_set():
-
-        logger.info(
-            f"Stopping to wait for audio to play for nodes: {response_nodes_reached}, "
-            f"state of audio finished event: {audio_finished_event}"
-        )
-        audio_finished_event.wait()
-        reset_audio_events()
-        logger.info(
-            f"Finished waiting for audio to play for nodes: {response_nodes_reached}"
-        )
-    else:
-        logger.info(
-            f"No audio to play for nodes: {response_nodes_reached} continuing processing"
-        )
-
-    processing_nodes_audio.clear()
-
-
 def play_audio(
     node: str,
     conversation_state: ConversationState,
     multiple_activations: Optional[int] = False,
 ):
     def on_start():
-        audio_started_event.set()
-        audio_player_first_callback.set()
-        robeau_is_talking.set()
         conversation_state.cutoff = False
 
     def on_stop():
-        audio_finished_event.set()
         conversation_state.cutoff = True
 
-    def on_end():
-        audio_finished_event.set()
-
     def on_error():
-        audio_player_first_callback.set()
-        audio_finished_event.set()
         conversation_state.cutoff = False
 
-    audio_player.set_callbacks(
+    conversation_state.lane.play(
+        node,
+        multiple_activations,
         on_start=on_start,
         on_stop=on_stop,
-        on_end=on_end,
         on_error=on_error,
     )
 
-    processing_nodes_audio.set()
-    audio_player.play_audio(node, multiple_activations)
-
 
 def process_node_data(data: dict, conversation_state: ConversationState):
     for attitude, level in conversation_state.attitude_levels.items():
@@ -525,7 +582,9 @@ def process_node_data(data: dict, conversation_state: ConversationState):
             conversation_state.attitude_levels[attitude] = new_level
 
             logger.info(
-                f"{attitude} level increased to {conversation_state.attitude_levels[attitude]}"
+                "%s level increased to %s",
+                attitude,
+                conversation_state.attitude_levels[attitude],
             )
 
 
@@ -556,7 +615,9 @@ def activate_connection_or_item(
         play_audio(node, conversation_state, multiple_activations)
         print(node)
     else:
-        logger.info(f" <{node}> with labels {labels} is not considered an audio output")
+        logger.info(
+            " <%s> with labels %s is not considered an audio output", node, labels
+        )
         print(f"-{node}")  # - is to indicate that the node is not an audio output
 
     return node_dict
@@ -567,13 +628,15 @@ def activate_connections(
     conversation_state: ConversationState,
     connection_type: Literal["regular", "random", "logic_gate"],
 ):
-    conn_names = [
-        f"{', '.join(list(connection.values())[0:3])}" for connection in connections
-    ]
-
-    if len(conn_names) > 0:
+    if connections and logger.isEnabledFor(logging.INFO):
+        conn_names = [
+            f"{', '.join(list(connection.values())[0:3])}" for connection in connections
+        ]
         logger.info(
-            f"Activating {len(connections)} {connection_type} connection(s): {conn_names}"
+            "Activating %s %s connection(s): %s",
+            len(connections),
+            connection_type,
+            conn_names,
         )
     for connection in connections:
         activate_connection_or_item(
@@ -590,14 +653,10 @@ def additional_conditions_are_true(
 ):
     for connection in connections:
         conn, is_true, attribute = connection
-        context = conversation_state.context[attribute]
+        in_context = conversation_state.context[attribute].contains(conn["end_node"])
 
-        if is_true:
-            if not any(conn["end_node"] == item["node"] for item in context):
-                return False
-        else:
-            if any(conn["end_node"] == item["node"] for item in context):
-                return False
+        if in_context != is_true:
+            return False
     return True
 
 
@@ -605,11 +664,8 @@ def initial_condition_is_true(
     connection: tuple[dict, bool, str], conversation_state: ConversationState
 ):
     conn, is_true, attribute = connection
-    context = conversation_state.context[attribute]
-    if is_true:
-        return any(conn["end_node"] == item["node"] for item in context)
-    else:
-        return not any(conn["end_node"] == item["node"] for item in context)
+    in_context = conversation_state.context[attribute].contains(conn["end_node"])
+    return in_context == is_true
 
 
 def filter_logic_connections(
@@ -646,21 +702,28 @@ def filter_logic_connections(
         elif relationship == "THEN":
             then_conns.append(conn)
         else:
-            logger.warning(f"Atypical connection for logicGate <{logic_gate}>: {conn}")
+            logger.warning(
+                "Atypical connection for logicGate <%s>: %s", logic_gate, conn
+            )
 
     if not initial_conn:
-        logger.error(f"No initial connection found for LogicGate: <{logic_gate}>")
+        logger.error("No initial connection found for LogicGate: <%s>", logic_gate)
 
     if not then_conns:
-        logger.error(f'No "THEN" connection found for LogicGate: <{logic_gate}>')
-
-    formatted_and_conns = "\nAnd: ".join([str(and_conn) for and_conn in and_conns])
-    formatted_then_conns = "\nThen: ".join([str(then_conn) for then_conn in then_conns])
+        logger.error('No "THEN" connection found for LogicGate: <%s>', logic_gate)
 
-    logger.info(
-        f"LogicGate <{logic_gate}> connections: \nInitial: {initial_conn} "
-        f"\nAnd: {formatted_and_conns} \nThen: {formatted_then_conns}"
-    )
+    if logger.isEnabledFor(logging.INFO):
+        formatted_and_conns = "\nAnd: ".join([str(and_conn) for and_conn in and_conns])
+        formatted_then_conns = "\nThen: ".join(
+            [str(then_conn) for then_conn in then_conns]
+        )
+        logger.info(
+            "LogicGate <%s> connections: \nInitial: %s \nAnd: %s \nThen: %s",
+            logic_gate,
+            initial_conn,
+            formatted_and_conns,
+            formatted_then_conns,
+        )
     return initial_conn, and_conns, then_conns
 
 
@@ -702,8 +765,8 @@ def process_logic_connections(
 
 
 def process_logic_relationships(
-    session: Session, relations_map: dict, conversation_state: ConversationState
-) -> list[str]:
+    session: GraphBackend, relations_map: dict, conversation_state: ConversationState
+) -> Traversal[list[str]]:
     if not relations_map.get("IF"):
         return []
 
@@ -711,12 +774,12 @@ def process_logic_relationships(
 
     for if_connection in relations_map["IF"]:
         logic_gate = if_connection["end_node"]
-        gate_connections = get_node_connections(
+        gate_connections = yield from get_node_connections(
             session, logic_gate, conversation_state, ROBEAU
         )
 
         if not gate_connections:
-            logger.info(f"No connections found for LogicGate: {logic_gate}")
+            logger.info("No connections found for LogicGate: %s", logic_gate)
             continue
 
         activated_connections = process_logic_connections(
@@ -724,7 +787,7 @@ def process_logic_relationships(
         )
 
         if not activated_connections:
-            logger.info(f"No connections activated for LogicGate: {logic_gate}")
+            logger.info("No connections activated for LogicGate: %s", logic_gate)
 
         end_nodes_reached = (
             [connection["end_node"] for connection in activated_connections]
@@ -735,23 +798,25 @@ def process_logic_relationships(
 
 
 def process_modifications_connections(
-    session: Session,
+    session: GraphBackend,
     connections: list[dict],
     process_method,
-):
+) -> Traversal[None]:
     for connection in connections:
         end_node = connection.get("end_node", "")
         labels = connection.get("labels", {}).get("end", [])
         data = connection.get("data", {}).get("end", {})
         duration = connection.get("params", {}).get("duration")
-        process_method(end_node, labels, data, duration, session)
+        traversal = process_method(end_node, labels, data, duration, session)
+        if traversal is not None:  # APPLIES and REVERTS need other nodes processed
+            yield from traversal
 
 
 def process_modifications_relationships(
-    session: Session,
-    relationships_map: dict[str, list[dict]],
+    session: GraphBackend,
+    relationships_map: dict[str, tuple[dict, ...]],
     conversation_state: ConversationState,
-):
+) -> Traversal[None]:
     relationship_methods = {
         "DELAYS": lambda end_node, labels, data, duration, session: conversation_state.delay_item(
             end_node, labels, data, duration
@@ -770,7 +835,9 @@ def process_modifications_relationships(
     for relationship, process_method in relationship_methods.items():
         connections = relationships_map.get(relationship, [])
         if connections:
-            process_modifications_connections(session, connections, process_method)
+            yield from process_modifications_connections(
+                session, connections, process_method
+            )
 
 
 def process_definitions_connections(connections: list[dict], method):
@@ -782,10 +849,10 @@ def process_definitions_connections(connections: list[dict], method):
 
 
 def process_definitions_relationships(
-    session: Session,
-    relationships_map: dict[str, list[dict]],
+    session: GraphBackend,
+    relationships_map: dict[str, tuple[dict, ...]],
     conversation_state: ConversationState,
-):
+) -> Traversal[None]:
     for relationship, connections in relationships_map.items():
         relationship_lower = relationship.lower()
         if relationship_lower in conversation_state.context:
@@ -795,7 +862,7 @@ def process_definitions_relationships(
                 labels = connection.get("labels", {}).get("end", [])
                 data = connection.get("data", {}).get("end", {})
                 if not node:
-                    logger.error(f"No end node for connection {connection}")
+                    logger.error("No end node for connection %s", connection)
                     continue
                 conversation_state.add_item(
                     node=node,
@@ -806,47 +873,42 @@ def process_definitions_relationships(
                 )
 
     if relationships_map["EXPECTS"]:
-        handle_transmission_input(session, EXPECTATIONS_SET, conversation_state)
-
-
-def select_random_connection(connections: list[dict] | dict) -> dict:
-    if isinstance(connections, dict):  # only one connection passed
-        logger.info(f"Only one connection passed: {connections}")
-        return connections
-
-    weights = [
-        connection.get("params", {}).get("randomWeight") for connection in connections
-    ]
-
-    if None in weights:
-        logger.warning(
-            f"Missing weight(s) for {connections}. Selecting random connection..."
+        yield from handle_transmission_input(
+            session, EXPECTATIONS_SET, conversation_state
         )
-        return random.choice(connections)
 
-    total_weight = sum(weights)
-    chosen_weight = random.uniform(0, total_weight)
-    current_weight = 0
 
-    for connection, weight in zip(connections, weights):
-        current_weight += weight
-        if current_weight >= chosen_weight:
-            return connection
+def select_random_connection(
+    connections: list[dict], pool: Optional[RandomPool], rng: random.Random
+) -> dict:
+    if pool is None:
+        logger.error(
+            "No random pool built for %s, returning a random choice as fallback.",
+            connections,
+        )
+        return rng.choice(connections)
 
-    logger.error(
-        "Failed to select a connection, returning a random choice as fallback."
-    )
-    return random.choice(connections)
+    return pool.sample(rng, connections)
 
 
-def select_random_connections(random_pool_groups: list[list[dict]]) -> list[dict]:
+def select_random_connections(
+    random_pool_groups: list[list[dict]],
+    random_pools: dict[tuple[str, int], RandomPool],
+    rng: random.Random,
+) -> list[dict]:
     selected_connections = []
 
     for pooled_group in random_pool_groups:
-        connection = select_random_connection(pooled_group)
+        first = pooled_group[0]
+        pool = random_pools.get(
+            (first["start_node"], first["params"].get("randomPoolId", 0))
+        )
+        connection = select_random_connection(pooled_group, pool, rng)
         pool_id = connection["params"].get("randomPoolId")
         end_node = connection["end_node"]
-        logger.info(f"Selected end_node for random pool Id {pool_id} is: <{end_node}>")
+        logger.info(
+            "Selected end_node for random pool Id %s is: <%s>", pool_id, end_node
+        )
         selected_connections.append(connection)
 
     return selected_connections
@@ -857,25 +919,29 @@ def define_random_pools(connections: list[dict]) -> list[list[dict]]:
 
     for connection in connections:
         random_pool_id = connection["params"].get("randomPoolId", 0)
-        grouped_data[random_pool_id].append(connection)
+        grouped_data[(connection["start_node"], random_pool_id)].append(connection)
 
     result = list(grouped_data.values())
 
-    if result:
+    if result and logger.isEnabledFor(logging.INFO):
         formatted_pools = "\n".join(
             f"\ngroup{index}:\n" + "\n".join(map(str, group))
             for index, group in enumerate(result)
         )
-        logger.info(f"Random pools defined: {formatted_pools}")
+        logger.info("Random pools defined: %s", formatted_pools)
 
     return result
 
 
 def process_random_connections(
-    random_connection: list[dict], conversation_state: ConversationState
+    random_connection: list[dict],
+    random_pools: dict[tuple[str, int], RandomPool],
+    conversation_state: ConversationState,
 ) -> list[dict]:
     random_pool_groups: list[list[dict]] = define_random_pools(random_connection)
-    selected_connections: list[dict] = select_random_connections(random_pool_groups)
+    selected_connections: list[dict] = select_random_connections(
+        random_pool_groups, random_pools, conversation_state.rng
+    )
     activate_connections(
         selected_connections, conversation_state, connection_type="random"
     )
@@ -887,32 +953,26 @@ def execute_attempt(
     node: str,
     conversation_state: ConversationState,
 ) -> bool:
-    if any(
-        node == item["node"] for item in conversation_state.context["unlocks"]
-    ) or any(node == item["node"] for item in conversation_state.context["primes"]):
+    if conversation_state.context.contains(node, "unlocks", "primes"):
         logger.info(
-            f"Successful attempt at connection: {list(connection.values())[0:3]}"
+            "Successful attempt at connection: %s", ConnectionSummary(connection)
         )
         return True
     else:
-        logger.info(f"Failed attempt at connection: {list(connection.values())[0:3]}")
+        logger.info("Failed attempt at connection: %s", ConnectionSummary(connection))
     return False
 
 
 def node_is_inaccessible(
     node: str, connection: dict, conversation_state: ConversationState
 ) -> bool:
-    connection_locked = any(
-        node == item["node"] for item in conversation_state.context["locks"]
-    )
-    connection_unprimed = any(
-        node == item["node"] for item in conversation_state.context["unprimes"]
-    )
+    connection_locked = conversation_state.context["locks"].contains(node)
+    connection_unprimed = conversation_state.context["unprimes"].contains(node)
 
     if connection_locked:
-        logger.info(f"Connection is locked: {list(connection.values())[0:3]}")
+        logger.info("Connection is locked: %s", ConnectionSummary(connection))
     if connection_unprimed:
-        logger.info(f"Connection is unprimed: {list(connection.values())[0:3]}")
+        logger.info("Connection is unprimed: %s", ConnectionSummary(connection))
 
     return connection_locked or connection_unprimed
 
@@ -942,14 +1002,22 @@ def evaluation_meets_criteria(
 
         if eval_min <= level <= eval_max:
             logger.info(
-                f"Connection meets criteria: {list(connection.values())[0:3]} "
-                f"(min {eval_min} <= {attitude}: {level} <= max {eval_max})"
+                "Connection meets criteria: %s (min %s <= %s: %s <= max %s)",
+                ConnectionSummary(connection),
+                eval_min,
+                attitude,
+                level,
+                eval_max,
             )
             return True
         else:
             logger.info(
-                f"Connection does not meet criteria: {list(connection.values())[0:3]} "
-                f"(min {eval_min} <= {attitude}: {level} <= max {eval_max})"
+                "Connection does not meet criteria: %s (min %s <= %s: %s <= max %s)",
+                ConnectionSummary(connection),
+                eval_min,
+                attitude,
+                level,
+                eval_max,
             )
             return False
 
@@ -958,6 +1026,7 @@ def evaluation_meets_criteria(
 
 def process_activation_connections(
     connections: list[dict],
+    random_pools: dict[tuple[str, int], RandomPool],
     conversation_state: ConversationState,
     connection_type: str,
     reset_primes: Optional[bool] = True,
@@ -987,7 +1056,7 @@ def process_activation_connections(
             regular_connections.append(connection)
 
     activated_connections.extend(
-        process_random_connections(random_connections, conversation_state)
+        process_random_connections(random_connections, random_pools, conversation_state)
     )
     activated_connections.extend(
         activate_connections(
@@ -1002,17 +1071,19 @@ def process_activation_connections(
 
 
 def process_activation_relationships(
-    relationships_map: dict[str, list[dict]],
+    relationships_map: dict[str, tuple[dict, ...]],
+    random_pools: dict[str, dict[tuple[str, int], RandomPool]],
     conversation_state: ConversationState,
     cutoff: Optional[bool] = False,
 ) -> list[str]:
-    priority_order = ["CHECKS", "EVALUATES", "ATTEMPTS", "TRIGGERS", "DEFAULTS"]
+    priority_order = ACTIVATION_PRIORITY_ORDER
     end_nodes_reached = []
 
     # Always process all ACTIVATES
     if relationships_map["ACTIVATES"]:
         activated_connections = process_activation_connections(
             relationships_map["ACTIVATES"],
+            random_pools["ACTIVATES"],
             conversation_state,
             connection_type="ACTIVATES",
             reset_primes=False,
@@ -1023,12 +1094,13 @@ def process_activation_relationships(
             )
 
     if cutoff:
-        priority_order = ["CUTSOFF"] + priority_order
+        priority_order = ("CUTSOFF",) + priority_order
 
     for key in priority_order:
         if relationships_map[key]:
             activated_connections = process_activation_connections(
                 relationships_map[key],
+                random_pools[key],
                 conversation_state,
                 connection_type=key,
             )
@@ -1042,32 +1114,36 @@ def process_activation_relationships(
     return end_nodes_reached
 
 
-def process_special_relationships(session, relationships_map, conversation_state):
+def process_special_relationships(
+    session, relationships_map, conversation_state
+) -> Traversal[None]:
     if relationships_map["REPLACES"]:
         replacing_node = relationships_map["REPLACES"][0]["start_node"]
         replaced_node = relationships_map["REPLACES"][0]["end_node"]
         logger.info(
-            f"<{replacing_node}> will now be processed as if it was <{replaced_node}>"
+            "<%s> will now be processed as if it was <%s>",
+            replacing_node,
+            replaced_node,
         )
-        process_node(
-            session,
+        yield NodeVisit(
             replaced_node,
-            conversation_state,
-            source=ADMIN,  # assures access to the node after the context switch in between the two nodes activation
+            ADMIN,  # assures access to the node after the context switch in between the two nodes activation
+            session=session,
+            conversation_state=conversation_state,
         )
 
 
 def process_relationships(
-    session: Session,
-    connections: list[dict],
+    session: GraphBackend,
+    connections: list[dict] | GroupedConnections,
     conversation_state: ConversationState,
     node: str,
     source: QuerySource,
     silent: Optional[bool] = False,
     cutoff: Optional[bool] = False,
-) -> list[str]:
+) -> Traversal[list[str]]:
 
-    def log_formatted_connections(relationships_map: dict[str, list[dict]]):
+    def log_formatted_connections(relationships_map: dict[str, tuple[dict, ...]]):
         conns_from_map = []
         cutoff_status = "(cutoff)" if cutoff else ""
         for connection in relationships_map.values():
@@ -1086,194 +1162,191 @@ def process_relationships(
         )
         if silent and conns_from_map:
             logger.info(
-                f"Processing SILENT connections {cutoff_status} (activation relationships were not applied) "
-                f"for node <{node}> ({source.name}):\n{formatted_silent_connections}"
+                "Processing SILENT connections %s (activation relationships were not applied) for node <%s> (%s):\n%s",
+                cutoff_status,
+                node,
+                source.name,
+                formatted_silent_connections,
             )
         elif conns_from_map:
             logger.info(
-                f"Processing connections for node <{node}> from source "
-                f"{source.name} {cutoff_status}:\n{formatted_connections}"
+                "Processing connections for node <%s> from source %s %s:\n%s",
+                node,
+                source.name,
+                cutoff_status,
+                formatted_connections,
             )
         elif not conns_from_map:
             logger.warning(
-                f"No connections found to process in: \n{formatted_connections}\n "
-                f"Must not be bound to a valid key in the relationships_map"
+                "No connections found to process in: \n%s\n Must not be bound to a valid key in the relationships_map",
+                formatted_connections,
             )
 
-    relationships_map: dict[str, list[dict]] = {
-        # Special
-        "REPLACES": [],
-        # Logic checks
-        "IF": [],
-        # Activations
-        "ACTIVATES": [],
-        "CHECKS": [],
-        "EVALUATES": [],
-        "ATTEMPTS": [],
-        "TRIGGERS": [],
-        "DEFAULTS": [],
-        "CUTSOFF": [],
-        # Definitions
-        "ALLOWS": [],
-        "PERMITS": [],
-        "LOCKS": [],
-        "UNLOCKS": [],
-        "EXPECTS": [],
-        "LISTENS": [],
-        "PRIMES": [],
-        "UNPRIMES": [],
-        "INITIATES": [],
-        # Modifications
-        "DISABLES": [],
-        "DELAYS": [],  # Unused right now but may be in the future
-        "APPLIES": [],
-        "REVERTS": [],
-    }
-
-    for connection in connections:
-        relationship = connection["relationship"]
-        if relationship in relationships_map:
-            relationships_map[relationship].append(connection)
+    # Backends group connections at load time, handing them over with their prebuilt relationships map and pools
+    if not isinstance(connections, GroupedConnections):
+        connections = GroupedConnections(connections)
+    relationships_map = connections.relationships_map
 
     conversation_state.log_conversation_state()
 
-    log_formatted_connections(relationships_map)
+    if logger.isEnabledFor(logging.INFO):
+        log_formatted_connections(relationships_map)
     end_nodes_reached = []
 
     if cutoff and not relationships_map["CUTSOFF"]:
-        handle_transmission_input(session, ANY_NON_SPECIFIC_CUTOFF, conversation_state)
+        yield from handle_transmission_input(
+            session, ANY_NON_SPECIFIC_CUTOFF, conversation_state
+        )
 
-    process_special_relationships(session, relationships_map, conversation_state)
+    yield from process_special_relationships(
+        session, relationships_map, conversation_state
+    )
 
     if not silent:
         end_nodes_reached.extend(
-            process_logic_relationships(session, relationships_map, conversation_state)
+            (
+                yield from process_logic_relationships(
+                    session, relationships_map, conversation_state
+                )
+            )
         )
         end_nodes_reached.extend(
             process_activation_relationships(
-                relationships_map, conversation_state, cutoff
+                relationships_map,
+                connections.random_pools,
+                conversation_state,
+                cutoff,
             )
         )
 
-    process_definitions_relationships(session, relationships_map, conversation_state)
-    process_modifications_relationships(session, relationships_map, conversation_state)
+    yield from process_definitions_relationships(
+        session, relationships_map, conversation_state
+    )
+    yield from process_modifications_relationships(
+        session, relationships_map, conversation_state
+    )
 
     return end_nodes_reached
 
 
 def handle_transmission_input(
-    session: Session,
+    session: GraphBackend,
     transmission_node: str,
     conversation_state: ConversationState,
-):
-    process_node(
-        session, transmission_node, conversation_state, SYSTEM, input_node=True
+) -> Traversal[None]:
+    yield NodeVisit(
+        transmission_node,
+        SYSTEM,
+        session=session,
+        conversation_state=conversation_state,
+        input_node=True,
     )
 
 
-def query_database(
-    session: Session,
-    text: str,
-    labels: list[str],
-    conversation_state: "ConversationState",
-) -> Optional[Result]:
+class GraphQuery(Effect):
+    def __init__(
+        self,
+        session: GraphBackend,
+        text: str,
+        labels: list[str],
+        listening_context: Optional[str],
+    ):
+        self.session = session
+        self.text = text
+        self.labels = labels
+        self.listening_context = listening_context
+
+    def run(self) -> list[dict] | None:
+        return self.session.get_connections(
+            self.text, self.labels, self.listening_context
+        )
 
-    queries = []
+    async def run_async(self) -> list[dict] | None:
+        return await self.session.get_connections_async(
+            self.text, self.labels, self.listening_context
+        )
 
-    for label in labels:
-        if label == "Whisper":
-            listening_context = conversation_state.listening_context
 
-            if listening_context:
-                queries.append(
-                    f"""
-                    MATCH (x:{label})-[r]->(y)
-                    WHERE x.context = $listening_context
-                    AND toLower(x.text) = toLower($text)
-                    RETURN x, r, y
-                    """
-                )
-            else:
-                logger.warning(f"Listening context is not set for Whisper: {text}")
-        else:
-            queries.append(
-                f"""
-                MATCH (x:{label})-[r]->(y)
-                WHERE toLower(x.text) = toLower($text)
-                RETURN x, r, y
-                """
-            )
+class AudioWait(Effect):
+    """Waits for the audio of the nodes reached to be done playing (or to fail) before moving on."""
 
-    if not queries:
-        logger.warning("No queries were constructed. Check the labels or context.")
-        return None
+    def __init__(self, response_nodes_reached: list[str], lane: AudioLane):
+        self.response_nodes_reached = response_nodes_reached
+        self.lane = lane
 
-    full_query = "\nUNION\n".join(queries)
-    # noinspection PyTypeChecker
-    result = session.run(
-        full_query, text=text, listening_context=conversation_state.listening_context
-    )
+    def run(self):
+        self.lane.wait_for_audio(self.response_nodes_reached)
 
-    return result if result.peek() else None
+
+def query_database(
+    session: GraphBackend,
+    text: str,
+    labels: list[str],
+    conversation_state: "ConversationState",
+) -> Traversal[list[dict] | None]:
+    return (
+        yield GraphQuery(session, text, labels, conversation_state.listening_context)
+    )
 
 
 def prompt_matches_allows(
-    session: Session, text: str, conversation_state: ConversationState
-) -> bool:
-    if any(
-        text.lower() == item["node"].lower()
-        for item in conversation_state.context["allows"]
-    ):
-        handle_transmission_input(session, ANY_MATCHING_PROMPT, conversation_state)
+    session: GraphBackend, text: str, conversation_state: ConversationState
+) -> Traversal[bool]:
+    if conversation_state.context["allows"].matches_text(text):
+        yield from handle_transmission_input(
+            session, ANY_MATCHING_PROMPT, conversation_state
+        )
         return True
     return False
 
 
 def prompt_matches_listens(
-    session: Session, text: str, conversation_state: ConversationState
-) -> bool:
-    if any(
-        text.lower() == item["node"].lower()
-        for item in conversation_state.context["listens"]
-    ):
-        handle_transmission_input(session, ANY_MATCHING_WHISPER, conversation_state)
+    session: GraphBackend, text: str, conversation_state: ConversationState
+) -> Traversal[bool]:
+    if conversation_state.context["listens"].matches_text(text):
+        yield from handle_transmission_input(
+            session, ANY_MATCHING_WHISPER, conversation_state
+        )
         return True
     return False
 
 
 def prompt_matches_permits(
-    session: Session, text: str, conversation_state: ConversationState
-) -> bool:
-    if any(
-        text.lower() == item["node"].lower()
-        for item in conversation_state.context["permits"]
-    ):
-        handle_transmission_input(session, ANY_MATCHING_PLEA, conversation_state)
+    session: GraphBackend, text: str, conversation_state: ConversationState
+) -> Traversal[bool]:
+    if conversation_state.context["permits"].matches_text(text):
+        yield from handle_transmission_input(
+            session, ANY_MATCHING_PLEA, conversation_state
+        )
         return True
     return False
 
 
-def prompt_is_not_understood(session: Session, conversation_state: ConversationState):
-    handle_transmission_input(session, NO_MATCHING_PROMPT, conversation_state)
+def prompt_is_not_understood(
+    session: GraphBackend, conversation_state: ConversationState
+) -> Traversal[None]:
+    yield from handle_transmission_input(
+        session, NO_MATCHING_PROMPT, conversation_state
+    )
 
 
 def conduct_prompt_matching(
-    session: Session,
+    session: GraphBackend,
     text: str,
     conversation_state: ConversationState,
     labels: list[str],
-) -> list[str]:
+) -> Traversal[list[str]]:
     matched = False
 
-    if prompt_matches_listens(session, text, conversation_state):
+    if (yield from prompt_matches_listens(session, text, conversation_state)):
         labels.append("Whisper")
         matched = True
 
-    if prompt_matches_permits(session, text, conversation_state):
+    if (yield from prompt_matches_permits(session, text, conversation_state)):
         labels.append("Plea")
         matched = True
 
-    if prompt_matches_allows(session, text, conversation_state):
+    if (yield from prompt_matches_allows(session, text, conversation_state)):
         if conversation_state.stubborn["state"]:
             pass  # no prompt matching when stubborn
         else:
@@ -1283,76 +1356,76 @@ def conduct_prompt_matching(
     if not matched:
         if conversation_state.stubborn["state"]:
             logger.debug("Stubborn context: Did not understand")
-            prompt_is_not_understood(session, conversation_state)
+            yield from prompt_is_not_understood(session, conversation_state)
 
         elif conversation_state.context["allows"]:
             logger.debug("Normal context: Did not understand")
-            prompt_is_not_understood(session, conversation_state)
+            yield from prompt_is_not_understood(session, conversation_state)
 
     return labels
 
 
 def prompt_meets_expectations(
-    session: Session, text: str, conversation_state: ConversationState
-) -> bool:
-    if any(
-        text.lower() == item["node"].lower()
-        for item in conversation_state.context["expects"]
-    ):
-        logger.info(f"<{text}> meets conversation expectations")
-        handle_transmission_input(session, EXPECTATIONS_SUCCESS, conversation_state)
+    session: GraphBackend, text: str, conversation_state: ConversationState
+) -> Traversal[bool]:
+    if conversation_state.context["expects"].matches_text(text):
+        logger.info("<%s> meets conversation expectations", text)
+        yield from handle_transmission_input(
+            session, EXPECTATIONS_SUCCESS, conversation_state
+        )
         return True
     else:
-        logger.info(f"<{text}> does not meet conversation expectations")
-        handle_transmission_input(session, EXPECTATIONS_FAILURE, conversation_state)
+        logger.info("<%s> does not meet conversation expectations", text)
+        yield from handle_transmission_input(
+            session, EXPECTATIONS_FAILURE, conversation_state
+        )
         return False
 
 
 def check_for_any_relevant_user_input(
-    session: Session, text: str, conversation_state: ConversationState
-):
-    def text_in_conversation_context() -> bool:
-        return any(
-            text.lower() == dictionary["node"].lower()
-            for list_of_dicts in conversation_state.context.values()
-            for dictionary in list_of_dicts
+    session: GraphBackend, text: str, conversation_state: ConversationState
+) -> Traversal[None]:
+    if conversation_state.context.matches_text(text):
+        yield from handle_transmission_input(
+            session, ANY_RELEVANT_USER_INPUT, conversation_state
         )
 
-    if text_in_conversation_context():
-        handle_transmission_input(session, ANY_RELEVANT_USER_INPUT, conversation_state)
-
 
 def handle_user_input_labelling(
-    session: Session,
+    session: GraphBackend,
     text: str,
     conversation_state: ConversationState,
     labels: list[str],
-):
-    check_for_any_relevant_user_input(session, text, conversation_state)
+) -> Traversal[list[str]]:
+    yield from check_for_any_relevant_user_input(session, text, conversation_state)
 
-    if conversation_state.context["expects"] and prompt_meets_expectations(
-        session, text, conversation_state
+    if conversation_state.context["expects"] and (
+        yield from prompt_meets_expectations(session, text, conversation_state)
     ):
         labels.append("Answer")
         return labels
 
     else:
-        labels = conduct_prompt_matching(session, text, conversation_state, labels)
+        labels = yield from conduct_prompt_matching(
+            session, text, conversation_state, labels
+        )
 
     return labels
 
 
 def define_labels(
-    session: Session,
+    session: GraphBackend,
     text: str,
     conversation_state: ConversationState,
     source: QuerySource,
-) -> list[str]:
+) -> Traversal[list[str]]:
 
     labels: list[str] = []
 
     if source == USER:
-        labels = handle_user_input_labelling(session, text, conversation_state, labels)
+        labels = yield from handle_user_input_labelling(
+            session, text, conversation_state, labels
+        )
         return labels
 
     elif source == GREETING:
@@ -1395,13 +1468,17 @@ def define_labels(
 
 
 def get_node_connections(
-    session: Session,
+    session: GraphBackend,
     text: str,
     conversation_state: ConversationState,
     source: QuerySource,
-) -> list[dict] | None:
+) -> Traversal[list[dict] | None]:
 
-    labels = define_labels(session, text, conversation_state, source)
+    labels = yield from traced(
+        conversation_state,
+        "define_labels",
+        define_labels(session, text, conversation_state, source),
+    )
 
     if not labels:
         labels = [
@@ -1409,36 +1486,14 @@ def get_node_connections(
         ]  # This will not return results from the database, but it will also not throw an error. We still want to
         # call get_node_data (instead of making an early return) in order to call relevant nested functions inside.
 
-    logger.info(f"Labels for fetching <{text}> connection are {labels}")
-
-    result = query_database(session, text, labels, conversation_state)
-
-    if not result:
-        return None
-
-    result_data = [
-        {
-            "start_node": dict(record["x"])["text"],
-            "relationship": record["r"].type,
-            "end_node": dict(record["y"])["text"],
-            "params": dict(record["r"]),
-            "labels": {
-                "start": list(record["x"].labels),
-                "end": list(record["y"].labels),
-            },
-            "data": {
-                "start": {k: v for k, v in dict(record["x"]).items() if k != "text"},
-                "end": {k: v for k, v in dict(record["y"]).items() if k != "text"},
-            },
-        }
-        for record in result
-    ]
+    logger.info("Labels for fetching <%s> connection are %s", text, labels)
 
-    return result_data
+    with trace_span(conversation_state, "query_database"):
+        return (yield from query_database(session, text, labels, conversation_state))
 
 
 def process_node(
-    session: Session,
+    session: GraphBackend,
     node: str,
     conversation_state: ConversationState,
     source: QuerySource,
@@ -1447,21 +1502,77 @@ def process_node(
     main_call: Optional[bool] = False,
     initiated: Optional[bool] = False,
     input_node: Optional[bool] = False,
-):
+) -> TraversalStats:
+    """Processes a node and every node it leads to, see TraversalExecutor for the budgets applied."""
+    executor = TraversalExecutor(
+        start_visit=start_node_visit,
+        logger=logger,
+        max_steps=MAX_TRAVERSAL_STEPS,
+        max_depth=MAX_TRAVERSAL_DEPTH,
+    )
+
+    tracer = conversation_state.tracer
+    utterance_trace = tracer.begin_utterance(node) if tracer and main_call else None
+
+    try:
+        return executor.run(
+            NodeVisit(
+                node,
+                source,
+                session=session,
+                conversation_state=conversation_state,
+                silent=silent,
+                cutoff=cutoff,
+                main_call=main_call,
+                initiated=initiated,
+                input_node=input_node,
+            )
+        )
+    finally:
+        if tracer and utterance_trace:
+            tracer.end_utterance(utterance_trace)
+
+
+def start_node_visit(visit: NodeVisit) -> Traversal[None]:
+    conversation_state: ConversationState = visit.kwargs["conversation_state"]
+    for listener in conversation_state.node_visit_listeners:
+        listener(visit)
+    return traced(
+        conversation_state,
+        "transmission_input" if visit.kwargs.get("input_node") else "process_node",
+        traverse_node(node=visit.node, source=visit.source, **visit.kwargs),
+        node=visit.node,
+        source=visit.source.name,
+    )
+
+
+def traverse_node(
+    session: GraphBackend,
+    node: str,
+    conversation_state: ConversationState,
+    source: QuerySource,
+    silent: Optional[bool] = False,
+    cutoff: Optional[bool] = False,
+    main_call: Optional[bool] = False,
+    initiated: Optional[bool] = False,
+    input_node: Optional[bool] = False,
+) -> Traversal[None]:
 
     log_empty_lines(logger=logger, lines=7 if main_call else 0)
 
     if input_node:
-        logger.info(f">>> Start of intermediary input process for: <{node}>")
+        logger.info(">>> Start of intermediary input process for: <%s>", node)
 
     logger.info(
-        f"Processing node: <{node}> from source {source.name}"
-        + (" (OG)" if main_call else "")
-        + (" (cutoff)" if cutoff else "")
-        + ("(initiation)" if initiated else "")
+        "Processing node: <%s> from source %s%s%s%s",
+        node,
+        source.name,
+        " (OG)" if main_call else "",
+        " (cutoff)" if cutoff else "",
+        "(initiation)" if initiated else "",
     )
 
-    connections = get_node_connections(
+    connections = yield from get_node_connections(
         session=session,
         text=node,
         conversation_state=conversation_state,
@@ -1470,59 +1581,64 @@ def process_node(
 
     if not connections:
         logger.info(
-            f"No connection obtained for node: <{node}> from source {source.name}"
+            "No connection obtained for node: <%s> from source %s", node, source.name
         )
         return
 
-    response_nodes_reached = process_relationships(
-        session=session,
-        connections=connections,
-        conversation_state=conversation_state,
-        node=node,
-        source=source,
-        silent=silent,
-        cutoff=cutoff,
+    response_nodes_reached = yield from traced(
+        conversation_state,
+        "process_relationships",
+        process_relationships(
+            session=session,
+            connections=connections,
+            conversation_state=conversation_state,
+            node=node,
+            source=source,
+            silent=silent,
+            cutoff=cutoff,
+        ),
     )
 
     for response_node in response_nodes_reached:
         if response_node in transmission_output_nodes:
             handle_transmission_output(response_node, conversation_state)
 
-        if processing_nodes_audio.is_set():
-            wait_for_audio_management(response_nodes_reached=response_nodes_reached)
+        if conversation_state.lane.processing_nodes_audio.is_set():
+            with trace_span(conversation_state, "audio_wait"):
+                yield AudioWait(response_nodes_reached, conversation_state.lane)
 
         log_empty_lines(logger=logger, lines=1)
         logger.info("Next node in the chain...\n")
 
-        process_node(
-            session,
+        yield NodeVisit(
             response_node,
-            conversation_state,
             ROBEAU,
+            session=session,
+            conversation_state=conversation_state,
             cutoff=conversation_state.cutoff,
         )
 
     logger.info(
-        f"End of process for node: <{node}> from source {source.name}"
-        + (" (OG)" if main_call else "")
+        "End of process for node: <%s> from source %s%s",
+        node,
+        source.name,
+        " (OG)" if main_call else "",
     )
 
     if input_node:
-        logger.info(f">>> End of intermediary process for input <{node}>\n\n\n")
+        logger.info(">>> End of intermediary process for input <%s>\n\n\n", node)
 
     log_empty_lines(logger=logger, lines=7 if main_call else 0)
 
 
 def run_update_conversation_state(
     conversation_state: ConversationState,
-    session: Session,
+    session: GraphBackend,
     stop_event: threading.Event,
     pause_event: threading.Event,
 ):
-    while not stop_event.is_set():
-        if not pause_event.is_set():
-            conversation_state.update_conversation_state(session)
-        time.sleep(0.5)
+    if not stop_event.is_set():
+        conversation_state.run_timers(session, pause_event)
 
 
 def robeau_is_listening(conversation_state: ConversationState):
@@ -1535,28 +1651,98 @@ def robeau_is_listening(conversation_state: ConversationState):
         return True
 
 
-def establish_connection():
-    start_time = time.time()
-    if NEO4J_URI:
-        driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
-    else:
-        raise ConnectionError("Failed to establish connection to Neo4j database")
+def determine_prompt_labels(conversation_state: ConversationState) -> list[str]:
+    """Labels of the nodes a user query can be matched to while Robeau is listening"""
+    labels = []
+    if conversation_state.context["listens"]:
+        labels.append("Whisper")
 
-    session = driver.session()
+    if conversation_state.context["expects"]:
+        labels.append("Answer")
 
-    session.run("RETURN 1").consume()  # Warmup query
-    connection_time = time.time() - start_time
+    if conversation_state.context["allows"]:
+        labels.append("Prompt")
 
-    print(f"Connection established in {connection_time:.3f} seconds")
-    print(driver.get_server_info())
-    return driver, session
+    if conversation_state.context["permits"]:
+        labels.append("Plea")
 
+    return labels
+
+
+def establish_connection(
+    backend_type: Literal["neo4j", "json", "compiled"] = "neo4j",
+    asynchronous: bool = False,
+) -> GraphBackend:
+    """Backend of the given type, not connected yet. `asynchronous` picks the Neo4j backend awaiting its lookups,
+    unless prefetching, whose subgraph fetches run in a worker thread of the loop either way.
+    """
+    if backend_type == "json":
+        return InMemoryGraphBackend.from_json(NEO4J_ALL_DATA_JSON_FILE_PATH, logger)
+    if backend_type == "compiled":
+        return TransitionTableGraphBackend.from_file(
+            ROBEAU_TRANSITION_TABLE_FILE_PATH, NEO4J_ALL_DATA_JSON_FILE_PATH, logger
+        )
 
-def initialize():
-    driver, session = establish_connection()
-    if not driver or not session:
+    if not NEO4J_URI:
         raise ConnectionError("Failed to establish connection to Neo4j database")
+
+    if ROBEAU_PREFETCH_DEPTH > 0:
+        return PrefetchingGraphBackend(
+            Neo4jGraphBackend(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, logger),
+            logger,
+            depth=ROBEAU_PREFETCH_DEPTH,
+        )
+    if asynchronous:
+        return AsyncNeo4jGraphBackend(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, logger)
+    return Neo4jGraphBackend(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, logger)
+
+
+def create_graph_session(
+    backend_type: Literal["neo4j", "json", "compiled"] | None = None,
+    asynchronous: bool = False,
+) -> GraphBackend:
+    """Backend set up as the settings ask, for the sync and the asyncio engines alike. It still has to be warmed
+    up, see open_graph_session and async_graph_engine.open_graph_session_async."""
+    session = establish_connection(backend_type or ROBEAU_GRAPH_BACKEND, asynchronous)  # type: ignore
+    if ROBEAU_CONNECTION_CACHE_SIZE > 0:
+        session = CachedGraphBackend(
+            session,
+            logger,
+            max_size=ROBEAU_CONNECTION_CACHE_SIZE,
+            version_file_path=NEO4J_GRAPH_VERSION_FILE_PATH,
+        )
+    return session
+
+
+def open_graph_session(
+    backend_type: Literal["neo4j", "json", "compiled"] | None = None
+) -> GraphBackend:
+    session = create_graph_session(backend_type)
+    session.warmup()
+    return session
+
+
+def attach_snapshotter(conversation_state: ConversationState):
+    """Restores the last snapshot of the conversation state, then keeps saving it until shutdown."""
+    if ROBEAU_SNAPSHOT_MAX_AGE <= 0:
+        return
+
+    snapshotter = ConversationSnapshotter(
+        conversation_state,
+        ROBEAU_SNAPSHOT_FILE_PATH,
+        logger,
+        interval=ROBEAU_SNAPSHOT_INTERVAL,
+        max_age=ROBEAU_SNAPSHOT_MAX_AGE,
+    )
+    snapshotter.restore()
+    snapshotter.start()
+    conversation_state.snapshotter = snapshotter
+
+
+def initialize(backend_type: Literal["neo4j", "json", "compiled"] | None = None):
+    session = open_graph_session(backend_type)
     conversation_state = ConversationState(logger_instance=logger)
+    attach_snapshotter(conversation_state)
     stop_event = threading.Event()
     pause_event = threading.Event()
     update_thread = threading.Thread(
@@ -1566,7 +1752,6 @@ def initialize():
     update_thread.start()
 
     return (
-        driver,
         session,
         conversation_state,
         stop_event,
@@ -1575,12 +1760,14 @@ def initialize():
     )
 
 
-def cleanup(driver, session, stop_event, update_thread):
+def cleanup(session, conversation_state, stop_event, update_thread):
     if session:
         session.close()
-    if driver:
-        driver.close()
     stop_event.set()
+    if conversation_state:
+        if conversation_state.snapshotter:
+            conversation_state.snapshotter.save()
+        conversation_state.stop_timers()
     update_thread.join()
 
 
@@ -1601,12 +1788,13 @@ def check_for_particular_query(user_query: str):
 def launch_specified_query(
     user_query: str,
     query_type: Literal["regular", "greeting", "forced"],
-    session: Session,
+    session: GraphBackend,
     conversation_state: ConversationState,
     silent: bool,
 ):
 
-    global node_thread
+    lane = conversation_state.lane
+    session.begin_utterance()
 
     thread_args = {
         "session": session,
@@ -1617,30 +1805,31 @@ def launch_specified_query(
     }
 
     if query_type == "regular":
-        node_thread = Thread(
+        lane.node_thread = Thread(
             target=process_node, kwargs={**thread_args, "source": USER}
         )
-        node_thread.start()
+        lane.node_thread.start()
 
     elif query_type == "greeting":
-        node_thread = Thread(
+        lane.node_thread = Thread(
             target=process_node, kwargs={**thread_args, "source": GREETING}
         )
-        node_thread.start()
+        lane.node_thread.start()
 
     elif query_type == "forced":
         # Used for testing to trigger any node without any restrictions
         upper_node = str(thread_args["node"]).upper()
         if upper_node in transmission_output_nodes:
             logger.info(
-                f"treating node {upper_node} from forced query as a transmission output"
+                "treating node %s from forced query as a transmission output",
+                upper_node,
             )
             handle_transmission_output(upper_node, conversation_state)
 
-        node_thread = Thread(
+        lane.node_thread = Thread(
             target=process_node, kwargs={**thread_args, "source": ADMIN}
         )
-        node_thread.start()
+        lane.node_thread.start()
 
 
 def launch_query(user_query, query_type, silent, session, conversation_state):
@@ -1667,14 +1856,14 @@ def handle_user_query(prompt_session, conversation_state, session):
     force, silent, user_query = check_for_particular_query(user_query)
 
     if conversation_state.unresponsive["state"]:
-        time_left = conversation_state.unresponsive["time_left"]
+        time_left = conversation_state.get_time_left(conversation_state.unresponsive)
         print(f"Robeau does not listen... time left: {time_left}")
         return
 
     if user_query == "stfu":
-        interrupt_robeau()
+        conversation_state.lane.interrupt()
 
-    elif node_thread and node_thread.is_alive():
+    elif conversation_state.lane.is_processing():
         print("Query refused, processing node: interrupt with <stfu> if needed")
 
     elif force:
@@ -1718,16 +1907,14 @@ def create_prompt_session():
 
 
 def main():
-    driver, session, conversation_state, stop_event, update_thread, pause_event = (
-        initialize()
-    )
+    session, conversation_state, stop_event, update_thread, pause_event = initialize()
 
     try:
         prompt_session = create_prompt_session()
         setup_typing_detector(pause_event)
         main_loop(prompt_session, conversation_state, session)
     finally:
-        cleanup(driver, session, stop_event, update_thread)
+        cleanup(session, conversation_state, stop_event, update_thread)
         keyboard.unhook_all()
 
 
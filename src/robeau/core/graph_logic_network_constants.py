@@ -10,6 +10,47 @@ class QuerySource(enum.Enum):
     ADMIN = auto()
 
 
+# Relationship types handled when processing a node, grouped by the step processing them
+RELATIONSHIP_TYPES = (
+    # Special
+    "REPLACES",
+    # Logic checks
+    "IF",
+    # Activations
+    "ACTIVATES",
+    "CHECKS",
+    "EVALUATES",
+    "ATTEMPTS",
+    "TRIGGERS",
+    "DEFAULTS",
+    "CUTSOFF",
+    # Definitions
+    "ALLOWS",
+    "PERMITS",
+    "LOCKS",
+    "UNLOCKS",
+    "EXPECTS",
+    "LISTENS",
+    "PRIMES",
+    "UNPRIMES",
+    "INITIATES",
+    # Modifications
+    "DISABLES",
+    "DELAYS",  # Unused right now but may be in the future
+    "APPLIES",
+    "REVERTS",
+)
+
+# Only the first of these activation relationships that activates something is processed
+ACTIVATION_PRIORITY_ORDER = ("CHECKS", "EVALUATES", "ATTEMPTS", "TRIGGERS", "DEFAULTS")
+
+# Budgets for the processing of one node chain (see TraversalExecutor)
+MAX_TRAVERSAL_STEPS = 1000  # Nodes processed in total
+MAX_TRAVERSAL_DEPTH = (
+    256  # Nodes being processed at the same time, nested in each other
+)
+
+
 # Query source aliases
 USER = QuerySource.USER
 ROBEAU = QuerySource.ROBEAU
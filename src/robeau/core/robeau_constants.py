@@ -10,6 +10,25 @@ ROBEAU_PROMPTS_JSON_FILE_PATH = os.path.join(
 ROBEAU_RESPONSES_JSON_FILE_PATH = os.path.join(
     PROJECT_DIR_PATH, "src/robeau/jsons/processed_for_robeau/robeau_responses.json"
 )
+ROBEAU_TRANSITION_TABLE_FILE_PATH = os.path.join(
+    PROJECT_DIR_PATH,
+    "src/robeau/jsons/processed_for_robeau/robeau_transition_table.json",
+)
+NEO4J_ALL_DATA_JSON_FILE_PATH = os.path.join(
+    PROJECT_DIR_PATH, "src/robeau/jsons/raw_from_neo4j/neo4j_all_data.json"
+)
+NEO4J_GRAPH_VERSION_FILE_PATH = os.path.join(
+    PROJECT_DIR_PATH, "src/robeau/jsons/raw_from_neo4j/neo4j_graph_version.json"
+)
+
+ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH = os.path.join(
+    PROJECT_DIR_PATH, "src/robeau/jsons/replay_transcripts/sample_conversation.json"
+)
+ROBEAU_TRACES_DIR_PATH = os.path.join(PROJECT_DIR_PATH, "temp/robeau_traces")
+ROBEAU_SNAPSHOT_FILE_PATH = os.path.join(
+    PROJECT_DIR_PATH, "temp/robeau_conversation_state.bin"
+)
+ROBEAU_ONNX_MODELS_DIR_PATH = os.path.join(PROJECT_DIR_PATH, "temp/robeau_onnx_models")
 
 # Labels used for different types of nodes in the neo4j database
 USER_LABELS = ["Prompt", "Whisper", "Plea", "Answer", "Greeting"]
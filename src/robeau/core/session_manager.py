@@ -0,0 +1,185 @@
+import os
+import threading
+from threading import Thread
+from typing import Literal, Optional
+
+from src.config.settings import ROBEAU_AUDIO_BACKEND, ROBEAU_TRACE
+from src.robeau.classes.audio_lane import AudioLane
+from src.robeau.classes.graph_backends import GraphBackend
+from src.robeau.classes.sbert_matcher import SBERTMatcher
+from src.robeau.classes.utterance_tracer import UtteranceTracer
+from src.robeau.core.graph_logic_network import (
+    ConversationState,
+    check_for_particular_query,
+    create_audio_player,
+    determine_prompt_labels,
+    launch_specified_query,
+    logger,
+    robeau_is_listening,
+    run_update_conversation_state,
+)
+from src.robeau.core.robeau_constants import ROBEAU_TRACES_DIR_PATH
+
+
+class RobeauSession:
+    """One conversation: its own conversation state (with its tracer and node visit listeners), lane (audio player,
+    audio events and node thread) and timers thread. The graph (through a backend of the conversation, see
+    GraphBackend.for_conversation) and the matcher are shared with the other sessions.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        graph_session: GraphBackend,
+        conversation_state: ConversationState,
+        matcher: Optional[SBERTMatcher] = None,
+    ):
+        self.name = name
+        self.graph_session = graph_session
+        self.conversation_state = conversation_state
+        self.matcher = matcher
+        self.stop_event = threading.Event()
+        self.pause_event = threading.Event()
+        self.timers_thread = threading.Thread(
+            target=run_update_conversation_state,
+            args=(conversation_state, graph_session, self.stop_event, self.pause_event),
+            name=f"Timers-{name}",
+            daemon=True,
+        )
+
+    @property
+    def lane(self) -> AudioLane:
+        return self.conversation_state.lane
+
+    def start(self):
+        self.timers_thread.start()
+
+    def launch_query(
+        self,
+        user_query: str,
+        query_type: Literal["regular", "greeting", "forced"],
+        silent: bool = False,
+    ) -> Optional[Thread]:
+        launch_specified_query(
+            user_query, query_type, self.graph_session, self.conversation_state, silent
+        )
+        return self.lane.node_thread
+
+    def match_query(self, user_query: str, labels: list[str]) -> Optional[str]:
+        """Node text the query matches among the labels, the query itself when the session has no matcher."""
+        if not self.matcher:
+            return user_query
+        matched, _ = self.matcher.check_for_best_matching_synonym(
+            user_query, labels=labels
+        )
+        if not matched:
+            logger.info(
+                "Session %s could not match <%s> with %s", self.name, user_query, labels
+            )
+        return matched
+
+    def handle_query(self, user_query: str) -> Optional[Thread]:
+        """Routes a query the way the interactive loop does, returns the node thread or None if it was refused or
+        matched no node."""
+        force, silent, user_query = check_for_particular_query(user_query)
+
+        if self.conversation_state.unresponsive["state"] or self.is_processing():
+            return None
+        if force:
+            return self.launch_query(user_query, "forced", silent)
+
+        if robeau_is_listening(self.conversation_state):
+            query_type = "regular"
+            labels = determine_prompt_labels(self.conversation_state)
+        else:
+            query_type = "greeting"
+            labels = ["Greeting"]
+
+        node = self.match_query(user_query, labels)
+        if not node:
+            return None
+        return self.launch_query(node, query_type, silent)
+
+    def is_processing(self) -> bool:
+        return self.lane.is_processing()
+
+    def interrupt(self):
+        self.lane.interrupt()
+
+    def wait(self, timeout: Optional[float] = None):
+        if self.lane.node_thread:
+            self.lane.node_thread.join(timeout)
+
+    def close(self):
+        self.stop_event.set()
+        self.conversation_state.stop_timers()
+        if self.timers_thread.is_alive():
+            self.timers_thread.join()
+
+
+class SessionManager:
+    """Runs several independent conversations (e.g. microphone, chat, test users) in one process.
+
+    The graph backend and the SBERT matcher are loaded once and shared, since the traversal and the matching only
+    read them; each session gets its own conversation state, lane and timers, so conversations never see each
+    other's context or wait on each other's audio. Sessions match the queries they handle through the matcher, or
+    take them as node texts already when there is none. With ROBEAU_TRACE set, each session also gets its own
+    tracer, writing to a directory of its name.
+    """
+
+    def __init__(
+        self,
+        graph_session: GraphBackend,
+        matcher: Optional[SBERTMatcher] = None,
+        audio_backend: Literal["pygame", "null"] = ROBEAU_AUDIO_BACKEND,  # type: ignore
+    ):
+        self.graph_session = graph_session
+        self.matcher = matcher
+        self.audio_backend = audio_backend
+        self.lock = threading.Lock()
+        self.sessions: dict[str, RobeauSession] = {}
+
+    def create_session(
+        self,
+        name: str,
+        audio_backend: Optional[Literal["pygame", "null"]] = None,
+    ) -> RobeauSession:
+        # Checked and registered under one lock, so that nothing is built for a name already taken
+        with self.lock:
+            if name in self.sessions:
+                raise ValueError(f"Session {name} already exists")
+
+            lane = AudioLane(
+                create_audio_player(audio_backend or self.audio_backend), logger
+            )
+            tracer = (
+                UtteranceTracer(logger, os.path.join(ROBEAU_TRACES_DIR_PATH, name))
+                if ROBEAU_TRACE
+                else None
+            )
+            session = RobeauSession(
+                name,
+                self.graph_session.for_conversation(),
+                ConversationState(logger_instance=logger, lane=lane, tracer=tracer),
+                self.matcher,
+            )
+            self.sessions[name] = session
+
+        session.start()
+        logger.info("Started session %s (%s running)", name, len(self.sessions))
+        return session
+
+    def get_session(self, name: str) -> Optional[RobeauSession]:
+        return self.sessions.get(name)
+
+    def close_session(self, name: str):
+        with self.lock:
+            session = self.sessions.pop(name, None)
+        if session:
+            session.close()
+            logger.info("Closed session %s", name)
+
+    def close(self):
+        for name in list(self.sessions):
+            self.close_session(name)
+        self.graph_session.close()
@@ -0,0 +1,239 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from logging import Logger
+from typing import Any, Awaitable, Callable, Generator, TypeVar
+
+from src.robeau.core.graph_logic_network_constants import QuerySource
+
+T = TypeVar("T")
+
+
+class NodeVisit:
+    """Request, yielded by a traversal step, to process another node before resuming."""
+
+    __slots__ = ("node", "source", "kwargs")
+
+    def __init__(self, node: str, source: QuerySource, **kwargs):
+        self.node = node
+        self.source = source
+        self.kwargs = kwargs
+
+    @property
+    def key(self) -> tuple[str, QuerySource]:
+        return self.node.lower(), self.source
+
+    def __repr__(self):
+        return f"NodeVisit(<{self.node}>, {self.source.name})"
+
+
+class Effect(ABC):
+    """Blocking operation, yielded by a traversal step, that the executor performs before resuming the step with
+    its result. Keeping them out of the steps lets the same traversal run on threads or on an asyncio loop.
+    """
+
+    @abstractmethod
+    def run(self) -> Any:
+        """Performs the operation on the calling thread, returns what the step is resumed with."""
+
+    async def run_async(self) -> Any:
+        return self.run()
+
+
+# A traversal step is a generator that yields the nodes it wants processed (or the effects it needs performed) and
+# returns its own result
+Traversal = Generator[NodeVisit | Effect, Any, T]
+
+
+class TraversalStats:
+    def __init__(self):
+        self.runs = 0
+        self.steps = 0
+        self.max_depth = 0
+        self.cycles_skipped = 0
+        self.over_budget_skips = 0
+        self.elapsed = 0.0
+
+    def add(self, other: "TraversalStats"):
+        self.runs += other.runs
+        self.steps += other.steps
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.cycles_skipped += other.cycles_skipped
+        self.over_budget_skips += other.over_budget_skips
+        self.elapsed += other.elapsed
+
+    @property
+    def time_per_step(self) -> float:
+        return self.elapsed / self.steps if self.steps else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "steps": self.steps,
+            "max_depth": self.max_depth,
+            "cycles_skipped": self.cycles_skipped,
+            "over_budget_skips": self.over_budget_skips,
+            "elapsed": self.elapsed,
+            "time_per_step": self.time_per_step,
+        }
+
+
+class TraversalExecutor:
+    """Runs a node traversal on an explicit stack of generators instead of Python recursion.
+
+    Each frame is the generator processing one node. When a frame yields a NodeVisit, the visited node gets its own
+    frame on top of the stack and the yielding frame resumes once it is done, which keeps the depth-first order of
+    the former recursive calls. When a frame yields an Effect instead, the effect is performed and its result sent
+    back into the frame. Visits are skipped (and logged) when they would exceed the step budget or the max
+    depth, or when the same (node, source) pair is already being processed further down the stack.
+    """
+
+    totals = TraversalStats()
+    totals_lock = threading.Lock()
+
+    def __init__(
+        self,
+        start_visit: Callable[[NodeVisit], Traversal[None]],
+        logger: Logger,
+        max_steps: int,
+        max_depth: int,
+    ):
+        self.start_visit = start_visit
+        self.logger = logger
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.stats = TraversalStats()
+        self.stats.runs = 1
+
+        self.stack: list[tuple[Traversal, tuple | None]] = []
+        self.active_keys: dict[tuple, int] = {}
+        self.start_time = 0.0
+
+    def _push(self, visit: NodeVisit):
+        key = visit.key
+
+        if self.active_keys.get(key):
+            self.stats.cycles_skipped += 1
+            self.logger.warning(
+                "Cycle detected, skipped %s: it is already being processed in this traversal",
+                visit,
+            )
+            return
+
+        if self.stats.steps >= self.max_steps:
+            self.stats.over_budget_skips += 1
+            self.logger.error(
+                "Step budget of %s exhausted, skipped %s", self.max_steps, visit
+            )
+            return
+
+        if len(self.stack) >= self.max_depth:
+            self.stats.over_budget_skips += 1
+            self.logger.error(
+                "Max depth of %s reached, skipped %s", self.max_depth, visit
+            )
+            return
+
+        self.stats.steps += 1
+        self.active_keys[key] = self.active_keys.get(key, 0) + 1
+        self.stack.append((self.start_visit(visit), key))
+        self.stats.max_depth = max(self.stats.max_depth, len(self.stack))
+
+    def _pop(self):
+        _, key = self.stack.pop()
+        if key is not None:
+            self.active_keys[key] -= 1
+
+    def _start(self, root: NodeVisit | Traversal):
+        if isinstance(root, NodeVisit):
+            self._push(root)
+        else:
+            self.stack.append((root, None))
+
+    def _advance(self, result: Any, error: BaseException | None) -> Effect | None:
+        """Resumes the top frame with the result (or error) of its last effect, until a frame yields an effect."""
+        while self.stack:
+            frame, _ = self.stack[-1]
+            try:
+                item = frame.throw(error) if error else frame.send(result)
+            except StopIteration:
+                self._pop()
+                item = None
+            result, error = None, None
+
+            if isinstance(item, NodeVisit):
+                self._push(item)
+            elif isinstance(item, Effect):
+                return item
+        return None
+
+    def _finish(self):
+        # Frames left on the stack after an error or a cancellation still get their finally blocks run
+        while self.stack:
+            frame, _ = self.stack[-1]
+            frame.close()
+            self._pop()
+
+        self.stats.elapsed = time.perf_counter() - self.start_time
+
+        with self.totals_lock:
+            self.totals.add(self.stats)
+
+        self.logger.info("Traversal stats: %s", self.stats.as_dict())
+
+    def run(self, root: NodeVisit | Traversal) -> TraversalStats:
+        self.start_time = time.perf_counter()
+        self._start(root)
+
+        try:
+            effect = self._advance(None, None)
+            while effect:
+                try:
+                    result, error = effect.run(), None
+                except Exception as e:
+                    result, error = None, e
+                effect = self._advance(result, error)
+        finally:
+            self._finish()
+
+        return self.stats
+
+
+class AsyncTraversalExecutor(TraversalExecutor):
+    """Runs the same traversals on an asyncio loop, awaiting their effects instead of blocking on them.
+
+    `async_handlers` maps effect types to coroutine functions performing them in place of Effect.run_async, for
+    effects relying on state owned by the caller (e.g. its audio events).
+    """
+
+    def __init__(
+        self,
+        start_visit: Callable[[NodeVisit], Traversal[None]],
+        logger: Logger,
+        max_steps: int,
+        max_depth: int,
+        async_handlers: dict[type, Callable[[Any], Awaitable[Any]]] | None = None,
+    ):
+        super().__init__(start_visit, logger, max_steps, max_depth)
+        self.async_handlers = async_handlers or {}
+
+    async def run_async(self, root: NodeVisit | Traversal) -> TraversalStats:
+        self.start_time = time.perf_counter()
+        self._start(root)
+
+        try:
+            effect = self._advance(None, None)
+            while effect:
+                handler = self.async_handlers.get(type(effect))
+                try:
+                    if handler:
+                        result, error = await handler(effect), None
+                    else:
+                        result, error = await effect.run_async(), None
+                except Exception as e:
+                    result, error = None, e
+                effect = self._advance(result, error)
+        finally:
+            self._finish()
+
+        return self.stats
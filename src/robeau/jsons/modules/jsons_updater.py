@@ -1,3 +1,4 @@
+from src.robeau.jsons.modules import neo4j_text_key_migration
 from src.robeau.jsons.modules.submodules import (
     neo4j_all_data_getter,
     neo4j_prompts_getter,
@@ -5,9 +6,13 @@ from src.robeau.jsons.modules.submodules import (
     neo4j_responses_getter,
     neo4j_responses_merger,
 )
+from src.robeau.scripts import graph_compiler
 
 
 def run_all():
+    print("Running neo4j_text_key_migration...")
+    neo4j_text_key_migration.main()
+
     print("Running neo4j_all_data_getter...")
     neo4j_all_data_getter.main()
 
@@ -23,6 +28,9 @@ def run_all():
     print("Running neo4j_responses_merger...")
     neo4j_responses_merger.main()
 
+    print("Running graph_compiler...")
+    graph_compiler.print_diagnostics(graph_compiler.compile_graph()["diagnostics"])
+
 
 if __name__ == "__main__":
     run_all()
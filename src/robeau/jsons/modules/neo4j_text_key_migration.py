@@ -0,0 +1,108 @@
+from neo4j import GraphDatabase
+
+from src.config.settings import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+from src.robeau.classes.graph_queries import (
+    QUERY_TEMPLATES,
+    QUERYABLE_LABELS,
+    subgraph_query,
+    unkeyed_condition,
+)
+
+# Plan operators reading nodes without an index, which a lookup of the templates shouldn't need
+SCAN_OPERATORS = ("AllNodesScan", "NodeByLabelScan")
+
+
+def get_plan_operators(plan: dict) -> list[str]:
+    """Operator types of an EXPLAIN plan and all its children, without their runtime suffix (@neo4j)"""
+    operators = [plan["operatorType"].split("@")[0]]
+    for child in plan.get("children", []):
+        operators.extend(get_plan_operators(child))
+    return operators
+
+
+class Neo4jTextKeyMigration:
+    """Stores the normalized text of every node as `text_key` and indexes it per label, so that connection lookups
+    are exact matches on an index instead of a toLower() scan over every node of the label. Safe to run again: only
+    nodes whose key is missing or stale are written and existing indexes are left as they are.
+    """
+
+    def __init__(self, uri, user, password):
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    def close(self):
+        self.driver.close()
+
+    def write_text_keys(self) -> int:
+        # Same normalization as normalize_node_text, which builds the $text_key parameter of the lookups
+        query = f"""
+        MATCH (n)
+        WHERE {unkeyed_condition("n")}
+        SET n.text_key = toLower(n.text)
+        RETURN count(n) AS updated
+        """
+        with self.driver.session() as session:
+            return session.execute_write(lambda tx: tx.run(query).single()["updated"])
+
+    def get_labels(self) -> list[str]:
+        with self.driver.session() as session:
+            labels = session.execute_read(
+                lambda tx: [record["label"] for record in tx.run("CALL db.labels()")]
+            )
+        return sorted(set(labels) | set(QUERYABLE_LABELS) | {"Whisper"})
+
+    def create_indexes(self) -> list[str]:
+        statements = {
+            f"{label.lower()}_text_key": f"FOR (n:`{label}`) ON (n.text_key)"
+            for label in self.get_labels()
+        }
+        statements["whisper_context"] = "FOR (n:Whisper) ON (n.context)"
+
+        with self.driver.session() as session:
+            for name, target in statements.items():
+                session.run(
+                    f"CREATE RANGE INDEX {name} IF NOT EXISTS {target}"
+                ).consume()
+            session.run("CALL db.awaitIndexes(300)").consume()
+
+        return list(statements)
+
+    def check_query_plans(self, prefetch_depth: int = 4) -> dict[str, list[str]]:
+        """EXPLAINs the connection templates and the subgraph query, returns the scans each plan still has"""
+        queries = {**QUERY_TEMPLATES, "subgraph": subgraph_query(prefetch_depth)}
+        parameters = {
+            "text_key": "",
+            "labels": QUERYABLE_LABELS,
+            "listening_context": "",
+        }
+
+        scans = {}
+        with self.driver.session() as session:
+            for name, query in queries.items():
+                plan = session.run(f"EXPLAIN {query}", parameters).consume().plan
+                operators = get_plan_operators(plan)  # type: ignore
+                scans[name] = [
+                    operator for operator in operators if operator in SCAN_OPERATORS
+                ]
+        return scans
+
+
+def main():
+    migration = Neo4jTextKeyMigration(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        updated = migration.write_text_keys()
+        print(f"Wrote text_key on {updated} node(s)")
+
+        indexes = migration.create_indexes()
+        print(f"Ensured range indexes: {', '.join(indexes)}")
+
+        for name, scans in migration.check_query_plans().items():
+            if scans:
+                print(f"Warning: the plan of the {name} query scans nodes: {scans}")
+            else:
+                print(f"The plan of the {name} query only seeks indexes")
+    finally:
+        migration.close()
+
+
+if __name__ == "__main__":
+    main()
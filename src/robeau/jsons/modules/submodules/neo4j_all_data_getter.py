@@ -1,6 +1,7 @@
 import json
 from neo4j import GraphDatabase
 from src.config.settings import NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER
+from src.robeau.classes.connection_cache import bump_graph_version
 
 
 class Neo4jToJson:
@@ -18,7 +19,7 @@ class Neo4jToJson:
 
     @staticmethod
     def _get_all_nodes(tx):
-        query = "MATCH (n) RETURN apoc.node.id(n) AS id, labels(n) AS labels, properties(n) AS properties"
+        query = "MATCH (n) RETURN apoc.node.id(n) AS id, labels(n) AS labels, apoc.map.removeKey(properties(n), 'text_key') AS properties"
         result = tx.run(query)
         nodes = []
         for record in result:
@@ -110,6 +111,14 @@ def compare_states(previous, current):
     return changes
 
 
+def has_changes(changes):
+    return any(
+        changes[change_type][element_type]
+        for change_type in ("added", "removed", "modified")
+        for element_type in ("nodes", "relationships")
+    )
+
+
 def log_changes(changes, log_file_path):
     log_entries = []
 
@@ -154,6 +163,7 @@ def main():
     backup_file_path = (
         "src/robeau/jsons/temp/outputs_from_get_data/OLD_neo4j_all_data.json"
     )
+    version_file_path = "src/robeau/jsons/raw_from_neo4j/neo4j_graph_version.json"
 
     neo4j_to_json = Neo4jToJson(uri, user, password)
     nodes, relationships = neo4j_to_json.get_nodes_and_relationships()
@@ -188,6 +198,12 @@ def main():
     print(f"Deletions saved to {deletions_file_path}")
     print(f"Log saved to {log_file_path}")
 
+    if has_changes(changes):
+        version = bump_graph_version(version_file_path)
+        print(
+            f"Graph changed, version stamp bumped to {version} in {version_file_path}"
+        )
+
 
 def write_json(file_path, data):
     with open(file_path, "w") as file:
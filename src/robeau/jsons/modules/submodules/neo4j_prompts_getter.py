@@ -32,6 +32,8 @@ def clean_node_data(node):
     node_data = node["n"]
     cleaned_node_data = {"id": node["id"]}
     for key, value in node_data.items():
+        if key == "text_key":  # Lookup key written by neo4j_text_key_migration
+            continue
         if isinstance(value, str):
             cleaned_node_data[key] = clean_text(value)
         else:
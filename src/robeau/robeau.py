@@ -1,19 +1,21 @@
 import asyncio
 import logging
 import re
+import threading
+from typing import Optional
 
-from neo4j import Session
-
+from src.config.settings import ROBEAU_ENGINE_MODE
 from src.core.constants import TERMINAL_WINDOW_SLOTS_DB_FILE_PATH
 from src.robeau.classes.sbert_matcher import SBERTMatcher  # type: ignore
+from src.robeau.classes.graph_backends import GraphBackend
+from src.robeau.core.async_graph_engine import AsyncGraphEngine, initialize_async
 from src.robeau.core.graph_logic_network import (
     ConversationState,
     cleanup,
+    determine_prompt_labels,
     initialize,
-    interrupt_robeau,
     launch_specified_query,
     robeau_is_listening,
-    robeau_is_talking,
 )
 from src.robeau.core.robeau_constants import (
     ROBEAU_PROMPTS_JSON_FILE_PATH as ROBEAU_PROMPTS,
@@ -32,17 +34,25 @@ logger = setup_logger(SCRIPT_NAME)
 sbert_matcher = SBERTMatcher(file_path=ROBEAU_PROMPTS, similarity_threshold=0.65)
 
 
-def check_greeting_in_message(msg: str):
-    """Check if first 2, 3, and 4 words segments are a greeting"""
+def check_greeting_in_message(msg: str) -> tuple[str | None, str | None]:
+    """Check if first 2, 3, and 4 words segments are a greeting, and which prompt the rest of the message matches.
+    The distinct segments are encoded in one matcher call, then only the rest of the message after the greeting
+    found, if any, is matched as a prompt.
+    """
     words = msg.split()
-    segments = [" ".join(words[:i]) for i in range(2, 5)]
-    for segment in segments:
-        greeting, _ = sbert_matcher.check_for_best_matching_synonym(
-            segment, show_details=True, labels=["Greeting"]
-        )
+    segments = list(dict.fromkeys(" ".join(words[:i]) for i in range(2, 5)))
+    greetings = sbert_matcher.match_many(segments, ["Greeting"], show_details=True)
+
+    for segment, (greeting, _) in zip(segments, greetings):
         if greeting and "hey robeau" in greeting.lower():
-            return segment
-    return None
+            remaining_message = remove_greeting_segment(msg, segment)
+            if not remaining_message:
+                return segment, None
+            prompt, _ = sbert_matcher.check_for_best_matching_synonym(
+                remaining_message, show_details=True, labels=["Prompt"]
+            )
+            return segment, prompt
+    return None, None
 
 
 def check_for_stop_command(message: str):
@@ -55,10 +65,12 @@ def check_for_stop_command(message: str):
     return stop_command, rudeness_points
 
 
+def remove_greeting_segment(message: str, greeting_segment: str) -> str:
+    return re.sub(re.escape(greeting_segment), "", message, count=1).strip()
+
+
 def extract_remaining_message(message: str, greeting_segment: str):
-    remaining_message = re.sub(
-        re.escape(greeting_segment), "", message, count=1
-    ).strip()
+    remaining_message = remove_greeting_segment(message, greeting_segment)
 
     if remaining_message:
         logger.info(
@@ -81,21 +93,26 @@ def log_matching_synonym(matched_message: str | None, message: str):
 class RobeauHandler:
     def __init__(
         self,
-        session: Session,
+        session: GraphBackend,
         conversation_state: ConversationState,
+        engine: Optional[AsyncGraphEngine] = None,
     ):
         self.stop_event = asyncio.Event()
         self.session = session
         self.conversation_state = conversation_state
+        self.engine = engine
         print("Waiting for greeting...")
 
     async def handle_message(self, message: str):
 
-        if robeau_is_talking.is_set():
+        if self.conversation_state.lane.robeau_is_talking.is_set():
             print("Robeau is talking.")
             stop_command, rudeness_points = check_for_stop_command(message)
             if stop_command:
-                interrupt_robeau()
+                if self.engine:
+                    await self.engine.interrupt()
+                else:
+                    self.conversation_state.lane.interrupt()
                 print(f"interrupted robeau with {rudeness_points} rudeness points")
             else:
                 print("No stop command detected over robeau's speech")
@@ -107,7 +124,7 @@ class RobeauHandler:
             self.process_message(message)
 
     def process_initial_greeting(self, message: str):
-        greeting_segment = check_greeting_in_message(message)
+        greeting_segment, matched_prompt = check_greeting_in_message(message)
         if not greeting_segment:
             print("Waiting for greeting...")
             return
@@ -116,14 +133,14 @@ class RobeauHandler:
 
         if remaining_message:
             self.greet(silent=True)
-            self.handle_remaining_message(remaining_message)
+            self.handle_remaining_message(remaining_message, matched_prompt)
         else:
             self.greet(silent=False)
 
-    def handle_remaining_message(self, remaining_message: str):
-        matched_message, _ = sbert_matcher.check_for_best_matching_synonym(
-            remaining_message, show_details=True, labels=["Prompt"]
-        )
+    def handle_remaining_message(
+        self, remaining_message: str, matched_message: str | None
+    ):
+        """Processes the prompt following a greeting, already matched along with it"""
         log_matching_synonym(matched_message, remaining_message)
         if matched_message:
             self.process_node_with_message(matched_message)
@@ -138,52 +155,46 @@ class RobeauHandler:
             self.process_node_with_message(matched_message)
 
     def determine_labels(self):
-        labels = []
-        if self.conversation_state.context["listens"]:
-            labels.append("Whisper")
+        return determine_prompt_labels(self.conversation_state)
 
-        if self.conversation_state.context["expects"]:
-            labels.append("Answer")
-
-        if self.conversation_state.context["allows"]:
-            labels.append("Prompt")
-
-        if self.conversation_state.context["permits"]:
-            labels.append("Plea")
-
-        return labels
+    def launch_query(self, user_query: str, query_type, silent: bool):
+        if self.engine:
+            self.engine.launch_query(user_query, query_type, silent)
+        else:
+            launch_specified_query(
+                user_query=user_query,
+                query_type=query_type,
+                session=self.session,
+                conversation_state=self.conversation_state,
+                silent=silent,
+            )
 
     def greet(self, silent=False):
-        launch_specified_query(
-            user_query="hey robeau",
-            query_type="greeting",
-            session=self.session,
-            conversation_state=self.conversation_state,
-            silent=silent,
-        )
+        self.launch_query("hey robeau", "greeting", silent)
 
     def process_node_with_message(self, matched_message: str):
-        launch_specified_query(
-            user_query=matched_message,
-            query_type="regular",
-            session=self.session,
-            conversation_state=self.conversation_state,
-            silent=False,
-        )
+        self.launch_query(matched_message, "regular", False)
 
 
 async def main():
     db_conn = None
-    driver = None
+    session = None
+    conversation_state = None
     stop_event = None
     update_thread = None
+    engine = None
 
     try:
         db_conn, _ = await setup_script(SCRIPT_NAME, TERMINAL_WINDOW_SLOTS_DB_FILE_PATH)
-        driver, session, conversation_state, stop_event, update_thread, pause_event = (
-            initialize()
-        )
-        handler = RobeauHandler(session, conversation_state)
+        if ROBEAU_ENGINE_MODE == "asyncio":
+            pause_event = threading.Event()
+            engine = await initialize_async(pause_event)
+            handler = RobeauHandler(engine.session, engine.conversation_state, engine)
+        else:
+            session, conversation_state, stop_event, update_thread, pause_event = (
+                initialize()
+            )
+            handler = RobeauHandler(session, conversation_state)
         recognize_task = asyncio.create_task(recognize_speech(handler, pause_event))
         await handler.stop_event.wait()
         await recognize_task
@@ -195,7 +206,10 @@ async def main():
     finally:
         if db_conn:
             await db_conn.close()
-        cleanup(driver, session, stop_event, update_thread)
+        if engine:
+            await engine.close()
+        elif update_thread:
+            cleanup(session, conversation_state, stop_event, update_thread)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+"""Recall and latency of the matcher's approximate (IVF) search against its exact search, on a synthetic synonym
+bank: --prompts random unit vectors, each with --rows / --prompts synonyms scattered around it, as mined paraphrases
+would be. Queries are new paraphrases of random prompts.
+
+Usage: python -m src.robeau.scripts.ann_benchmark [--rows 100000] [--prompts 2000] [--dimension 384] [--queries 500]
+       [--k 10] [--clusters N] [--probes 1 2 4 8 16 32] [--seed 0]
+
+No model is loaded, the vectors stand in for embeddings. Recall@1 is how often the approximate best row is the exact
+best row, recall@k the share of the exact top k found by the approximate top k.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from src.robeau.classes.ivf_index import IVFIndex, normalize_rows
+from src.robeau.classes.sbert_matcher import LabelEmbeddings
+
+
+def make_paraphrases(
+    centers: np.ndarray, prompt_ids: np.ndarray, spread: float, rng
+) -> np.ndarray:
+    noise = rng.standard_normal((len(prompt_ids), centers.shape[1])).astype(np.float32)
+    return normalize_rows(centers[prompt_ids] + spread * normalize_rows(noise))
+
+
+def make_bank(
+    rows: int, prompts: int, dimension: int, spread: float, rng
+) -> tuple[np.ndarray, np.ndarray]:
+    centers = normalize_rows(
+        rng.standard_normal((prompts, dimension)).astype(np.float32)
+    )
+    return centers, make_paraphrases(centers, np.arange(rows) % prompts, spread, rng)
+
+
+def time_searches(label_embeddings: LabelEmbeddings, queries: np.ndarray, k: int):
+    results = []
+    latencies = []
+    for query in queries:
+        start_time = time.perf_counter()
+        results.append(label_embeddings.top_k(query, k))
+        latencies.append((time.perf_counter() - start_time) * 1000)
+    return results, latencies
+
+
+def summarize(latencies: list[float]) -> dict:
+    return {
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Approximate vs exact search")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--prompts", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, help="Defaults to sqrt(rows)")
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument(
+        "--spread", type=float, default=0.8, help="Paraphrase noise, 0 is exact"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers, matrix = make_bank(
+        args.rows, args.prompts, args.dimension, args.spread, rng
+    )
+    queries = make_paraphrases(
+        centers, rng.integers(0, args.prompts, args.queries), args.spread, rng
+    )
+    texts = [str(row) for row in range(args.rows)]
+    label_embeddings = LabelEmbeddings(matrix, texts, texts, ["Synthetic"] * args.rows)
+
+    exact_results, exact_latencies = time_searches(label_embeddings, queries, args.k)
+    summary: dict = {"rows": args.rows, "exact": summarize(exact_latencies)}
+
+    start_time = time.perf_counter()
+    label_embeddings.ann = IVFIndex.build(matrix, args.clusters, seed=args.seed)
+    summary["build_s"] = time.perf_counter() - start_time
+    summary["clusters"] = len(label_embeddings.ann.centroids)
+
+    for probes in args.probes:
+        label_embeddings.ann_probes = probes
+        results, latencies = time_searches(label_embeddings, queries, args.k)
+        recall_at_1 = np.mean(
+            [
+                bool(found) and found[0][0] == expected[0][0]
+                for found, expected in zip(results, exact_results)
+            ]
+        )
+        recall_at_k = np.mean(
+            [
+                len({row for row, _ in found} & {row for row, _ in expected})
+                / len(expected)
+                for found, expected in zip(results, exact_results)
+            ]
+        )
+        summary[f"probes_{probes}"] = {
+            "recall_at_1": float(recall_at_1),
+            f"recall_at_{args.k}": float(recall_at_k),
+            **summarize(latencies),
+        }
+
+    print(f"Summary: {json.dumps(summary, indent=4)}")
+
+
+if __name__ == "__main__":
+    main()
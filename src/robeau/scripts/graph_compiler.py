@@ -0,0 +1,98 @@
+"""Compiles the exported graph (neo4j_all_data.json) into the transition table Robeau loads at startup with the
+"compiled" graph backend, and reports unreachable nodes, cycles and vocal nodes without playable audio.
+
+Usage: python -m src.robeau.scripts.graph_compiler [source] [--output table.json] [--strict]
+
+--strict exits with status 1 when there are unreachable nodes, missing audio or dangling relationships. Cycles are
+only reported, conversations loop back on purpose.
+"""
+
+import argparse
+import json
+import sys
+
+from src.robeau.classes.connection_cache import read_graph_version
+from src.robeau.classes.transition_table import (
+    compile_transition_table,
+    hash_file,
+    write_transition_table,
+)
+from src.robeau.core.robeau_constants import (
+    NEO4J_ALL_DATA_JSON_FILE_PATH,
+    NEO4J_GRAPH_VERSION_FILE_PATH,
+    ROBEAU_RESPONSES_JSON_FILE_PATH,
+    ROBEAU_TRANSITION_TABLE_FILE_PATH,
+)
+
+
+def compile_graph(
+    source_file_path: str = NEO4J_ALL_DATA_JSON_FILE_PATH,
+    output_file_path: str = ROBEAU_TRANSITION_TABLE_FILE_PATH,
+    responses_file_path: str = ROBEAU_RESPONSES_JSON_FILE_PATH,
+) -> dict:
+    with open(source_file_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    with open(responses_file_path, "r", encoding="utf-8") as f:
+        audio_mappings = json.load(f)["nodes"]
+
+    table = compile_transition_table(
+        data["nodes"],
+        data["relationships"],
+        audio_mappings,
+        source={
+            "sha256": hash_file(source_file_path),
+            "graph_version": read_graph_version(NEO4J_GRAPH_VERSION_FILE_PATH),
+        },
+    )
+    write_transition_table(table, output_file_path)
+
+    edge_count = sum(len(targets) for targets in table["edge_targets"])
+    print(
+        f"Compiled {len(table['node_text'])} nodes, {edge_count} edges of "
+        f"{len(table['edge_types'])} types and {len(table['strings'])} strings into {output_file_path}"
+    )
+    return table
+
+
+def print_diagnostics(diagnostics: dict):
+    for node in diagnostics["unreachable_nodes"]:
+        print(f"Unreachable: <{node['text']}> {node['labels']} (id {node['id']})")
+    for cycle in diagnostics["cycles"]:
+        print(f"Cycle: {' <-> '.join(f'<{text}>' for text in cycle)}")
+    for node in diagnostics["missing_audio"]:
+        print(f"Missing audio: <{node['text']}> {node['labels']}: {node['reason']}")
+    if diagnostics["dangling_relationships"]:
+        print(
+            f"Dangling relationships (skipped): {diagnostics['dangling_relationships']}"
+        )
+
+    print(
+        f"{len(diagnostics['unreachable_nodes'])} unreachable node(s), {len(diagnostics['cycles'])} cycle(s), "
+        f"{len(diagnostics['missing_audio'])} node(s) missing audio, "
+        f"{len(diagnostics['dangling_relationships'])} dangling relationship(s)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the Robeau transition table")
+    parser.add_argument("source", nargs="?", default=NEO4J_ALL_DATA_JSON_FILE_PATH)
+    parser.add_argument("--output", default=ROBEAU_TRANSITION_TABLE_FILE_PATH)
+    parser.add_argument("--responses", default=ROBEAU_RESPONSES_JSON_FILE_PATH)
+    parser.add_argument(
+        "--strict", action="store_true", help="Fail on diagnostics other than cycles"
+    )
+    args = parser.parse_args()
+
+    table = compile_graph(args.source, args.output, args.responses)
+    diagnostics = table["diagnostics"]
+    print_diagnostics(diagnostics)
+
+    if args.strict and any(
+        diagnostics[key]
+        for key in ("unreachable_nodes", "missing_audio", "dangling_relationships")
+    ):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Load test: N simulated users hold a scripted conversation at the same time, each in its own session of a
+SessionManager sharing one graph backend. Reports the processing latency of their utterances and the throughput.
+
+Usage: python -m src.robeau.scripts.load_test [transcript] [--users N] [--speed S] [--backend json|compiled|neo4j]
+       [--verbose]
+
+Transcripts are the replay_benchmark ones. Their delays are divided by --speed and waited for in real time, so
+the conversation state timers of each session run as they would live. Audio goes to NullAudioPlayers and the
+engine logger is raised to WARNING unless --verbose is passed.
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+
+from src.robeau.core import graph_logic_network as engine
+from src.robeau.core.robeau_constants import ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH
+from src.robeau.core.session_manager import RobeauSession, SessionManager
+from src.robeau.scripts.replay_benchmark import load_transcript, percentile
+
+
+def simulate_user(
+    session: RobeauSession,
+    transcript: list[dict],
+    speed: float,
+    start_barrier: threading.Barrier,
+    latencies: list[float],
+    refused: list[str],
+):
+    start_barrier.wait()
+    for entry in transcript:
+        time.sleep(entry.get("delay", 0.0) / speed)
+
+        start_time = time.perf_counter()
+        node_thread = session.handle_query(entry["query"].strip().lower())
+        if node_thread is None:
+            refused.append(entry["query"])
+            continue
+        node_thread.join()
+        latencies.append((time.perf_counter() - start_time) * 1000)
+
+
+def run_load_test(
+    manager: SessionManager, transcript: list[dict], users: int, speed: float
+) -> dict:
+    sessions = [
+        manager.create_session(f"user{index}", "null") for index in range(users)
+    ]
+    latencies: list[float] = []
+    refused: list[str] = []
+    start_barrier = threading.Barrier(users)
+
+    threads = [
+        threading.Thread(
+            target=simulate_user,
+            args=(session, transcript, speed, start_barrier, latencies, refused),
+            name=f"SimulatedUser-{session.name}",
+        )
+        for session in sessions
+    ]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+
+    for session in sessions:
+        manager.close_session(session.name)
+
+    if not latencies:
+        return {"users": users, "utterances": 0, "refused": len(refused)}
+
+    return {
+        "users": users,
+        "utterances": len(latencies),
+        "refused": len(refused),
+        "elapsed_s": elapsed,
+        "utterances_per_s": len(latencies) / elapsed,
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "max_ms": max(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent sessions load test")
+    parser.add_argument(
+        "transcript", nargs="?", default=ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH
+    )
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--speed", type=float, default=10.0)
+    parser.add_argument(
+        "--backend", choices=["json", "compiled", "neo4j"], default="json"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Keep engine logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        engine.logger.setLevel(logging.WARNING)
+
+    manager = SessionManager(
+        engine.open_graph_session(args.backend), audio_backend="null"
+    )
+    try:
+        summary = run_load_test(
+            manager, load_transcript(args.transcript), args.users, args.speed
+        )
+    finally:
+        manager.close()
+
+    print(f"Summary: {json.dumps(summary, indent=4)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Compares the SBERT matcher backends on the prompts file: startup time, per-utterance matching latency, peak
+resident memory and whether they match utterances to the same prompts.
+
+Usage: python -m src.robeau.scripts.matcher_benchmark [transcript] [--backends torch onnx] [--repeat N]
+       [--threshold T] [--model all-MiniLM-L6-v2]
+
+Each backend runs in its own subprocess, so that its memory isn't mixed with the other's. Queries are those of a
+replay transcript plus, for every prompt text of three words or more, the text without its first word (near
+misses rather than exact hits). The onnx backend needs the model exported by scripts/sbert_onnx_export.py.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.robeau.classes.sbert_matcher import SBERTMatcher, load_prompt_texts
+from src.robeau.core.robeau_constants import (
+    ROBEAU_PROMPTS_JSON_FILE_PATH as ROBEAU_PROMPTS,
+)
+from src.robeau.core.robeau_constants import ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH
+
+
+def get_peak_rss_mb() -> float:
+    if sys.platform == "win32":
+        import win32api
+        import win32process
+
+        counters = win32process.GetProcessMemoryInfo(win32api.GetCurrentProcess())
+        return counters["PeakWorkingSetSize"] / 2**20
+
+    import resource
+
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def build_queries(transcript_file_path: str) -> list[str]:
+    # Read here rather than with replay_benchmark.load_transcript, which would load the graph engine into the
+    # measured process
+    with open(transcript_file_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    queries = [entry if isinstance(entry, str) else entry["query"] for entry in entries]
+    for text in load_prompt_texts(ROBEAU_PROMPTS):
+        words = text.split()
+        if len(words) >= 3:
+            queries.append(" ".join(words[1:]))
+    return list(dict.fromkeys(queries))
+
+
+def run_backend(model_name: str, backend: str, queries: list[str], repeat: int) -> dict:
+    start_time = time.perf_counter()
+    matcher = SBERTMatcher(
+        model_name, file_path=ROBEAU_PROMPTS, backend=backend  # type: ignore
+    )
+    load_s = time.perf_counter() - start_time
+
+    latencies: list[float] = []
+    matches = []
+    for _ in range(repeat):
+        matches = []
+        for query in queries:
+            start_time = time.perf_counter()
+            best = matcher.find_best_matches(query, top_k=1)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+            matches.append(list(best[0]) if best else None)
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "peak_rss_mb": get_peak_rss_mb(),
+        "queries": len(queries),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "matches": matches,
+    }
+
+
+def run_in_subprocess(
+    model_name: str, backend: str, transcript: str, repeat: int
+) -> dict:
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "src.robeau.scripts.matcher_benchmark",
+            transcript,
+            "--worker",
+            backend,
+            "--repeat",
+            str(repeat),
+            "--model",
+            model_name,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The matcher prints its own progress first, the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare_matches(reference: dict, other: dict, threshold: float) -> dict:
+    same_prompt = same_decision = 0
+    max_similarity_delta = 0.0
+    for expected, actual in zip(reference["matches"], other["matches"]):
+        if not expected or not actual:
+            continue
+        same_prompt += (expected[0], expected[2]) == (actual[0], actual[2])
+        same_decision += (expected[3] >= threshold) == (actual[3] >= threshold)
+        max_similarity_delta = max(max_similarity_delta, abs(expected[3] - actual[3]))
+
+    queries = len(reference["matches"])
+    return {
+        "same_best_prompt": same_prompt / queries,
+        "same_threshold_decision": same_decision / queries,
+        "max_similarity_delta": max_similarity_delta,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SBERT matcher backends benchmark")
+    parser.add_argument(
+        "transcript", nargs="?", default=ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH
+    )
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.65,
+        help="Similarity Robeau accepts a match from, to compare decisions",
+    )
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_backend(
+            args.model, args.worker, build_queries(args.transcript), args.repeat
+        )
+        print(json.dumps(result))
+        return
+
+    results = [
+        run_in_subprocess(args.model, backend, args.transcript, args.repeat)
+        for backend in args.backends
+    ]
+    reference = results[0]
+    summary = {}
+    for result in results:
+        summary[result["backend"]] = {
+            key: value for key, value in result.items() if key != "matches"
+        }
+        if result is not reference:
+            summary[result["backend"]][f"parity_with_{reference['backend']}"] = (
+                compare_matches(reference, result, args.threshold)
+            )
+
+    print(f"Summary: {json.dumps(summary, indent=4)}")
+
+
+if __name__ == "__main__":
+    main()
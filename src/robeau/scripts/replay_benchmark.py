@@ -0,0 +1,208 @@
+"""Replays a scripted conversation through launch_specified_query against the exported graph (neo4j_all_data.json)
+and reports the processing latency and the node path of every utterance. No microphone, database or speakers are
+needed: audio goes to a NullAudioPlayer and the conversation state timers run on a virtual clock. The engine logger
+is raised to WARNING unless --verbose is passed, so that file logging doesn't dominate the measurements.
+
+Usage: python -m src.robeau.scripts.replay_benchmark [transcript] [--repeat N] [--seed S] [--output report.json]
+       [--verbose]
+
+A transcript is a JSON list of queries, each either a plain string or an object such as
+{"query": "hello", "delay": 2.5, "type": "regular"}. "delay" is the virtual time, in seconds, waited before the
+query (timers expiring meanwhile run first). "type" is regular, greeting or forced; when left out it is picked the
+way the interactive loop does.
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from src.robeau.classes.audio_lane import AudioLane
+from src.robeau.classes.audio_player import NullAudioPlayer
+from src.robeau.core import graph_logic_network as engine
+from src.robeau.core.robeau_constants import (
+    ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH,
+    ROBEAU_RESPONSES_JSON_FILE_PATH,
+)
+from src.robeau.core.traversal_executor import NodeVisit
+
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def load_transcript(file_path: str) -> list[dict]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    return [{"query": entry} if isinstance(entry, str) else entry for entry in entries]
+
+
+def advance_time(
+    conversation_state: engine.ConversationState, clock: VirtualClock, delay: float
+):
+    """Moves the virtual clock forward, running every expiration due on the way in deadline order."""
+    target = clock.now + delay
+    scheduler = conversation_state.scheduler
+
+    while (deadline := scheduler.next_deadline()) is not None and deadline <= target:
+        clock.now = max(clock.now, deadline)
+        scheduler.run_due()
+
+    clock.now = target
+
+
+def pick_query_type(query: str, conversation_state: engine.ConversationState):
+    force, silent, query = engine.check_for_particular_query(query)
+
+    if force:
+        return query, "forced", silent
+    if engine.robeau_is_listening(conversation_state):
+        return query, "regular", silent
+    return query, "greeting", silent
+
+
+def replay(session, transcript: list[dict], seed: int) -> list[dict]:
+    clock = VirtualClock()
+    lane = AudioLane(
+        NullAudioPlayer(ROBEAU_RESPONSES_JSON_FILE_PATH, engine.logger), engine.logger
+    )
+    conversation_state = engine.ConversationState(
+        engine.logger, clock=clock, lane=lane, seed=seed
+    )
+    conversation_state.timer_session = session
+
+    path: list[str] = []
+
+    def record_visit(visit: NodeVisit):
+        path.append(f"{visit.source.name}:{visit.node}")
+
+    conversation_state.node_visit_listeners.append(record_visit)
+    audio_player = lane.audio_player
+    results = []
+
+    try:
+        for entry in transcript:
+            path.clear()
+            advance_time(conversation_state, clock, entry.get("delay", 0.0))
+            timer_path = list(path)
+            path.clear()
+
+            query, query_type, silent = pick_query_type(
+                entry["query"].strip().lower(), conversation_state
+            )
+            query_type = entry.get("type", query_type)
+            result = {
+                "query": query,
+                "type": query_type,
+                "virtual_time": clock.now,
+                "timer_path": timer_path,
+            }
+
+            if conversation_state.unresponsive["state"]:
+                result.update(ignored=True, latency_ms=0.0, path=[], responses=[])
+                results.append(result)
+                continue
+
+            played_before = len(audio_player.played)
+            start_time = time.perf_counter()
+            engine.launch_specified_query(
+                query, query_type, session, conversation_state, silent
+            )
+            if lane.node_thread:
+                lane.node_thread.join()
+            latency = time.perf_counter() - start_time
+
+            result.update(
+                ignored=False,
+                latency_ms=latency * 1000,
+                path=list(path),
+                responses=audio_player.played[played_before:],
+            )
+            results.append(result)
+    finally:
+        conversation_state.stop_timers()
+
+    return results
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(runs: list[list[dict]]) -> dict:
+    latencies = [r["latency_ms"] for run in runs for r in run if not r["ignored"]]
+    if not latencies:
+        return {"runs": len(runs), "utterances": 0}
+
+    return {
+        "runs": len(runs),
+        "utterances": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies),
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "max_ms": max(latencies),
+        "nodes_visited": sum(len(r["path"]) for run in runs for r in run),
+        "total_ms_per_run": sum(latencies) / len(runs),
+    }
+
+
+def print_report(runs: list[list[dict]], summary: dict):
+    last_run = runs[-1]
+    for index, result in enumerate(last_run):
+        latencies = [run[index]["latency_ms"] for run in runs]
+        status = "ignored (unresponsive)" if result["ignored"] else ""
+        print(
+            f"\n[{result['virtual_time']:7.1f}s] <{result['query']}> ({result['type']}) "
+            f"median {percentile(latencies, 0.5):.3f} ms over {len(runs)} run(s) {status}"
+        )
+        if result["timer_path"]:
+            print(f"    timers: {' -> '.join(result['timer_path'])}")
+        if result["path"]:
+            print(f"    path: {' -> '.join(result['path'])}")
+        if result["responses"]:
+            print(f"    responses: {result['responses']}")
+
+    print(f"\nSummary: {json.dumps(summary, indent=4)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline conversation replay benchmark"
+    )
+    parser.add_argument(
+        "transcript", nargs="?", default=ROBEAU_REPLAY_TRANSCRIPT_FILE_PATH
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the full report to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep engine logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        engine.logger.setLevel(logging.WARNING)
+
+    transcript = load_transcript(args.transcript)
+    session = engine.open_graph_session("json")
+
+    try:
+        runs = [replay(session, transcript, args.seed) for _ in range(args.repeat)]
+    finally:
+        session.close()
+
+    summary = summarize(runs)
+    print_report(runs, summary)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "runs": runs}, f, indent=4)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
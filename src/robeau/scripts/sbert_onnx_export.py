@@ -0,0 +1,138 @@
+"""Exports the SBERT matcher model to ONNX, quantizes its weights to int8 and saves its tokenizer, so that
+SBERTMatcher can run with backend="onnx" (see ROBEAU_MATCHER_BACKEND) through onnxruntime on the CPU.
+
+Usage: python -m src.robeau.scripts.sbert_onnx_export [--model all-MiniLM-L6-v2] [--opset 14]
+
+Writes model.onnx (float32), model.int8.onnx, the tokenizer files and encoder_config.json to
+temp/robeau_onnx_models/<model>, then prints how close the embeddings of both graphs are to the torch ones on the
+prompts file texts.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import torch
+from onnxruntime.quantization import QuantType, quantize_dynamic
+from sentence_transformers import SentenceTransformer
+
+from src.robeau.classes.onnx_sentence_encoder import (
+    ENCODER_CONFIG_FILE_NAME,
+    ONNX_INT8_MODEL_FILE_NAME,
+    ONNX_MODEL_FILE_NAME,
+    OnnxSentenceEncoder,
+    get_model_dir,
+)
+from src.robeau.classes.sbert_matcher import load_prompt_texts
+from src.robeau.core.robeau_constants import (
+    ROBEAU_PROMPTS_JSON_FILE_PATH as ROBEAU_PROMPTS,
+)
+
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+class TokenEmbeddings(torch.nn.Module):
+    """The transformer of a SentenceTransformer, returning only its token embeddings (pooling is done outside)"""
+
+    def __init__(self, transformer: torch.nn.Module):
+        super().__init__()
+        self.transformer = transformer
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        return self.transformer(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+        )[0]
+
+
+def export_model(model_name: str, model_dir: str, opset: int) -> SentenceTransformer:
+    model = SentenceTransformer(model_name, device="cpu")
+    # Older sentence-transformers have a flag per pooling mode, newer ones a pooling_mode name
+    pooling = model[1].get_config_dict()
+    if not (
+        pooling.get("pooling_mode") == "mean" or pooling.get("pooling_mode_mean_tokens")
+    ):
+        raise ValueError(f"{model_name} doesn't mean pool, which the export assumes")
+
+    os.makedirs(model_dir, exist_ok=True)
+    tokenizer = model.tokenizer
+    sample = tokenizer(["hey robeau", "how are you"], padding=True, return_tensors="pt")
+    input_names = [name for name in INPUT_NAMES if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    wrapper = TokenEmbeddings(model[0].auto_model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            tuple(sample[name] for name in input_names),
+            os.path.join(model_dir, ONNX_MODEL_FILE_NAME),
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+
+    tokenizer.save_pretrained(model_dir)
+    with open(os.path.join(model_dir, ENCODER_CONFIG_FILE_NAME), "w") as f:
+        json.dump(
+            {
+                "model": model_name,
+                "dimension": model.get_sentence_embedding_dimension(),
+                "max_seq_length": model.max_seq_length,
+                "pad_token": tokenizer.pad_token,
+                "pad_token_id": tokenizer.pad_token_id,
+            },
+            f,
+            indent=4,
+        )
+    return model
+
+
+def quantize_model(model_dir: str):
+    quantize_dynamic(
+        os.path.join(model_dir, ONNX_MODEL_FILE_NAME),
+        os.path.join(model_dir, ONNX_INT8_MODEL_FILE_NAME),
+        weight_type=QuantType.QInt8,
+    )
+
+
+def check_parity(model: SentenceTransformer, model_dir: str, texts: list[str]):
+    reference = model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    for model_file_name in (ONNX_MODEL_FILE_NAME, ONNX_INT8_MODEL_FILE_NAME):
+        encoder = OnnxSentenceEncoder(model_dir, model_file_name)
+        embeddings = encoder.encode(texts, normalize_embeddings=True)
+        similarities = np.sum(reference * embeddings, axis=1)
+        # Newer torch exporters write the weights to an external <model>.data file
+        size = (
+            sum(
+                os.path.getsize(os.path.join(model_dir, file_name))
+                for file_name in os.listdir(model_dir)
+                if file_name.startswith(model_file_name)
+            )
+            / 2**20
+        )
+        print(
+            f"{model_file_name} ({size:.1f} MB): cosine to torch embeddings over {len(texts)} texts "
+            f"min {similarities.min():.4f}, mean {similarities.mean():.4f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the SBERT matcher to ONNX")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    model_dir = get_model_dir(args.model)
+    model = export_model(args.model, model_dir, args.opset)
+    quantize_model(model_dir)
+    print(f"Exported {args.model} to {model_dir}")
+
+    check_parity(model, model_dir, load_prompt_texts(ROBEAU_PROMPTS))
+
+
+if __name__ == "__main__":
+    main()
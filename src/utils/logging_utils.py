@@ -1,6 +1,9 @@
+import atexit
 import logging
 import os
+import queue
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
 from typing import Literal
 
 from src.core.constants import COMMON_LOGS_FILE_PATH, LOG_DIR_PATH
@@ -13,10 +16,30 @@ LOG_LEVELS = {
     "CRITICAL": logging.CRITICAL,
 }
 
+# "debug" writes every record synchronously, "production" only keeps warnings and above and writes them from a
+# background thread so that logging costs next to nothing on hot paths
+LOG_PRESETS: dict[str, dict] = {
+    "debug": {"level": "DEBUG", "queued": False},
+    "queued": {"level": "DEBUG", "queued": True},
+    "production": {"level": "WARNING", "queued": True},
+}
+
+queue_listeners: dict[str, QueueListener] = {}
+
+
+class BlankLinesFormatter(logging.Formatter):
+    """Writes records sent by log_empty_lines as they are, without the usual prefix."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "blank_lines", False):
+            return record.getMessage()
+        return super().format(record)
+
 
 def setup_logger(
     file_name: str,
     level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "DEBUG",
+    queued: bool = False,
 ) -> logging.Logger:
     script_log_file_path = os.path.join(LOG_DIR_PATH, f"{file_name}.log")
     common_log_file_path = COMMON_LOGS_FILE_PATH
@@ -31,26 +54,54 @@ def setup_logger(
         # Script-specific file handler with UTF-8 encoding
         script_fh = logging.FileHandler(script_log_file_path, encoding="utf-8")
         script_fh.setLevel(LOG_LEVELS[level])
-        formatter = logging.Formatter(
+        formatter = BlankLinesFormatter(
             "%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s"
         )
         script_fh.setFormatter(formatter)
-        logger.addHandler(script_fh)
 
         # Common file handler with UTF-8 encoding
         common_fh = logging.FileHandler(common_log_file_path, encoding="utf-8")
         common_fh.setLevel(LOG_LEVELS[level])
-        common_formatter = logging.Formatter(
+        common_formatter = BlankLinesFormatter(
             "%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s"
         )
         common_fh.setFormatter(common_formatter)
-        logger.addHandler(common_fh)
+
+        if queued:
+            # Records are handed over to a listener thread, which does the actual file writes
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            logger.addHandler(QueueHandler(log_queue))
+            listener = QueueListener(
+                log_queue, script_fh, common_fh, respect_handler_level=True
+            )
+            listener.start()
+            queue_listeners[file_name] = listener
+        else:
+            logger.addHandler(script_fh)
+            logger.addHandler(common_fh)
 
     return logger
 
 
+def setup_preset_logger(
+    file_name: str, preset: Literal["debug", "queued", "production"] = "debug"
+) -> logging.Logger:
+    if preset not in LOG_PRESETS:
+        raise ValueError(
+            f"Unknown log preset: {preset}, expected one of {list(LOG_PRESETS)}"
+        )
+    return setup_logger(file_name, **LOG_PRESETS[preset])
+
+
+@atexit.register
+def stop_queue_listeners():
+    """Flushes the records still queued, registered to run at exit."""
+    while queue_listeners:
+        _, listener = queue_listeners.popitem()
+        listener.stop()
+
+
 def log_empty_lines(logger: Logger, lines: int = 1):
-    for handler in logger.handlers:
-        if isinstance(handler, logging.FileHandler):
-            handler.stream.write(lines * "\n")
-            handler.flush()
+    # Sent as a record rather than written to the handler streams, so it follows the logger level and queue
+    if lines > 0 and logger.isEnabledFor(logging.INFO):
+        logger.info((lines - 1) * "\n", extra={"blank_lines": True})
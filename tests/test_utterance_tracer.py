@@ -0,0 +1,105 @@
+import asyncio
+import json
+import logging
+import tempfile
+import threading
+import unittest
+
+from src.robeau.classes.utterance_tracer import UtteranceTracer
+
+logger = logging.getLogger(__name__)
+
+
+def load_span_names(file_path: str) -> list[str]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        return [event["name"] for event in json.load(f)["traceEvents"]]
+
+
+class TestOverlappingUtterances(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.tracer = UtteranceTracer(logger, self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_utterance_traced_on_another_thread_meanwhile(self):
+        """A timer expiring on the scheduler thread while a user utterance is traced"""
+        user_trace = self.tracer.begin_utterance("hello")
+        assert user_trace
+        timer_file_paths = []
+
+        def expire():
+            timer_trace = self.tracer.begin_utterance("PROLONG STUBBORN")
+            assert timer_trace
+            with self.tracer.span("timer_node"):
+                pass
+            timer_file_paths.append(self.tracer.end_utterance(timer_trace))
+
+        with self.tracer.span("outer"):
+            with self.tracer.span("inner"):
+                thread = threading.Thread(target=expire)
+                thread.start()
+                thread.join()
+        user_file_path = self.tracer.end_utterance(user_trace)
+
+        self.assertEqual(load_span_names(user_file_path), ["inner", "outer"])
+        self.assertEqual(load_span_names(timer_file_paths[0]), ["timer_node"])
+        self.assertEqual(self.tracer.active, {})
+
+    def test_interleaved_tasks(self):
+        """Two conversations of the asyncio engine, on the same thread, each awaiting in the middle of its span"""
+
+        async def utterance(
+            text: str, own_span_open: asyncio.Event, other_span_open: asyncio.Event
+        ):
+            trace = self.tracer.begin_utterance(text)
+            assert trace
+            with self.tracer.span(f"{text}_span"):
+                own_span_open.set()
+                await other_span_open.wait()
+            return self.tracer.end_utterance(trace)
+
+        async def run_both():
+            first_open, second_open = asyncio.Event(), asyncio.Event()
+            return await asyncio.gather(
+                utterance("first", first_open, second_open),
+                utterance("second", second_open, first_open),
+            )
+
+        first_file_path, second_file_path = asyncio.run(run_both())
+
+        self.assertEqual(load_span_names(first_file_path), ["first_span"])
+        self.assertEqual(load_span_names(second_file_path), ["second_span"])
+        self.assertNotEqual(first_file_path, second_file_path)
+
+    def test_nested_utterance_is_part_of_the_current_one(self):
+        outer_trace = self.tracer.begin_utterance("outer")
+        assert outer_trace
+        with self.tracer.span("outer_span"):
+            self.assertIsNone(self.tracer.begin_utterance("nested"))
+            with self.tracer.span("nested_span"):
+                pass
+        file_path = self.tracer.end_utterance(outer_trace)
+
+        self.assertEqual(load_span_names(file_path), ["nested_span", "outer_span"])
+
+    def test_span_closed_after_its_utterance_ended(self):
+        """The span of a traversal dropped halfway is closed later, against the trace it was opened in"""
+        trace = self.tracer.begin_utterance("dropped")
+        assert trace
+        span = self.tracer.span("dropped_span")
+        span.__enter__()
+        self.tracer.end_utterance(trace)
+
+        next_trace = self.tracer.begin_utterance("next")
+        assert next_trace
+        span.__exit__(None, None, None)
+        file_path = self.tracer.end_utterance(next_trace)
+
+        self.assertEqual(load_span_names(file_path), [])
+        self.assertEqual(trace.stack, [])
+
+
+if __name__ == "__main__":
+    unittest.main()